@@ -0,0 +1,51 @@
+# demo/cave_benchmark.py
+
+"""
+    Times the list based cave pipeline against the numpy grid pipeline
+    used by MapSystem.build_map and checks both give the same cave.
+    Usage: py -m demos.cave_benchmark [width] [height]
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from source.generate import (add_boundry_to_matrix, array_to_matrix,
+                             cell_auto, flood_fill, generate_cave,
+                             generate_poisson_array, replace_cell_with_stairs)
+
+
+def generate_cave_matrix(width, height, steps=4):
+    matrix = array_to_matrix(
+        generate_poisson_array(width, height),
+        width, height,
+        filter=lambda x: x < 3 or x >= 8
+    )
+    matrix = add_boundry_to_matrix(matrix, bounds=1)
+    for i in range(steps):
+        matrix = cell_auto(matrix, deadlimit=5+(i-5))
+    matrix = flood_fill(matrix)
+    return replace_cell_with_stairs(matrix)
+
+def timed(generator, width, height, seed=0):
+    np.random.seed(seed)
+    random.seed(seed)
+    start = time.perf_counter()
+    cave = generator(width, height)
+    return time.perf_counter() - start, cave
+
+def main(width=200, height=200):
+    print(f"| {'size':>11} | {'pipeline':<8} | {'seconds':>8} |")
+    elapsed, matrix = timed(generate_cave_matrix, width, height)
+    print(f"| {width:>5}x{height:<5} | {'matrix':<8} | {elapsed:>8.3f} |")
+    elapsed, grid = timed(generate_cave, width, height)
+    print(f"| {width:>5}x{height:<5} | {'grid':<8} | {elapsed:>8.3f} |")
+    print("identical:", grid.tolist() == matrix)
+    elapsed, _ = timed(generate_cave, 1000, 1000)
+    print(f"| {1000:>5}x{1000:<5} | {'grid':<8} | {elapsed:>8.3f} |")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -133,6 +133,7 @@ class Engine:
         self.player = None
         self.entity = None
         self.entity_index = -1
+        self.entity_order = []
         self.system = None
         self.system_index = 0
         self.systems = []
@@ -151,15 +152,17 @@ class Engine:
         return self.entities.create()
 
     def reset_entity_index(self):
+        # ids are kept in a dict so they are copied once per pass
+        self.entity_order = list(self.entities)
         self.entity_index = 0
-        self.entity = self.entities.entity_ids[self.entity_index]
+        self.entity = self.entity_order[self.entity_index]
     
     def next_entity(self):
         self.entity_index += 1
-        if self.entity_index > len(self.entities.entity_ids) - 1:
+        if self.entity_index > len(self.entity_order) - 1:
             self.entity = None
         else:
-            self.entity = self.entities.entity_ids[self.entity_index]
+            self.entity = self.entity_order[self.entity_index]
 
     def add_player(self):
         if self.player:
@@ -0,0 +1,69 @@
+# demo/fov.py
+
+"""
+    Benchmarks the raycast and shadowcast field of view algorithms on the
+    HALL and STRESS maps. Each map is also run with random pillars so the
+    shadowcaster has shadows to recurse around.
+    Usage: py -m demos.fov [casts] [radius]
+"""
+
+import random
+import sys
+import time
+from collections import namedtuple
+
+from source.ecs.components import TileMap
+from source.generate import matrix
+from source.maps import HALL, STRESS
+from source.raycast import get_blocked, raycast, shadowcast
+
+Player = namedtuple('Player', 'x y')
+
+
+def build_tilemap(mapstring, pillars=0):
+    rows = matrix(mapstring)
+    tilemap = TileMap(len(rows[0]), len(rows))
+    for y, row in enumerate(rows):
+        for x, char in enumerate(row):
+            tilemap.set_tile(x, y, char, None, None, blocks=char == '#')
+    for _ in range(pillars):
+        x = random.randrange(1, tilemap.width - 1)
+        y = random.randrange(1, tilemap.height - 1)
+        tilemap.set_tile(x, y, '#', None, None, blocks=True)
+    return tilemap
+
+def benchmark(tilemap, casts, radius):
+    blocked = get_blocked(tilemap, 0, tilemap.width, 0, tilemap.height)
+    players = [
+        Player(*position)
+            for position in random.sample(
+                tilemap.coordinates(tilemap.floors()),
+                casts
+            )
+    ]
+    results = {}
+    for caster in (raycast, shadowcast):
+        lighted = 0
+        start = time.perf_counter()
+        for player in players:
+            lighted += len(
+                caster(blocked, tilemap.width, tilemap.height, player, radius)
+            )
+        elapsed = time.perf_counter() - start
+        results[caster.__name__] = (elapsed / casts * 1000, lighted / casts)
+    return results
+
+def main(casts=200, radius=10):
+    random.seed(0)
+    print(f"casts={casts} radius={radius}")
+    print(f"| {'map':<16} | {'caster':<10} | {'ms/cast':>8} | {'tiles':>7} |")
+    for name, mapstring in (('HALL', HALL), ('STRESS', STRESS)):
+        for pillars in (0, 1000):
+            tilemap = build_tilemap(mapstring, pillars)
+            label = f"{name}+pillars" if pillars else name
+            for caster, (ms, tiles) in benchmark(tilemap, casts, radius).items():
+                print(f"| {label:<16} | {caster:<10} | {ms:>8.3f} | {tiles:>7.1f} |")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,92 @@
+# demo/hpa_benchmark.py
+
+"""
+    Benchmarks hierarchical pathfinding against astar on maps.STRESS
+    (500x100) and maps.LARGE (100x80) with random pillars. Reports the
+    hierarchy build time, time and nodes expanded per path, path length
+    against the optimal astar path and the cost of an incremental update
+    after a door opens or closes.
+    Usage: py -m demos.hpa_benchmark [queries] [cluster size]
+"""
+
+import random
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from source.ecs.components import TileMap
+from source.generate import matrix
+from source.hpa import HierarchicalMap
+from source.maps import LARGE, STRESS
+from source.pathfind import astar, octile_int
+
+Node = namedtuple('Node', 'x y')
+
+
+def build_tilemap(mapstring, density=0.3):
+    rows = matrix(mapstring)
+    tilemap = TileMap(len(rows[0]), len(rows))
+    tilemap.chars[:] = np.array(rows)
+    tilemap.blocks[:] = tilemap.chars == '#'
+    inner = np.random.rand(tilemap.height - 2, tilemap.width - 2) < density
+    tilemap.blocks[1:-1, 1:-1] |= inner
+    tilemap.changed()
+    return tilemap
+
+def cost(start, path):
+    points = [start] + path
+    return sum(octile_int(a, b) for a, b in zip(points, points[1:]))
+
+def main(queries=30, size=16):
+    random.seed(0)
+    np.random.seed(0)
+    print(f"queries={queries} cluster size={size}")
+    for name, mapstring in (('STRESS', STRESS), ('LARGE', LARGE)):
+        tilemap = build_tilemap(mapstring)
+        start_time = time.perf_counter()
+        hierarchy = HierarchicalMap(tilemap, size)
+        build = time.perf_counter() - start_time
+        print(f"{name}: build {build * 1000:.1f} ms, {hierarchy}")
+
+        floors = sorted(tilemap.walkable_tiles())
+        pairs = [
+            tuple(Node(*p) for p in random.sample(floors, 2))
+                for _ in range(queries)
+        ]
+        ratios = []
+        for label, finder in (
+            ('astar', lambda s, e, stats: astar(
+                tilemap.walkable_tiles(), s, e, stats=stats)),
+            ('hpa', hierarchy.find_path),
+        ):
+            expanded = 0
+            elapsed = 0
+            for start, end in pairs:
+                stats = {}
+                start_time = time.perf_counter()
+                path = finder(start, end, stats=stats)
+                elapsed += time.perf_counter() - start_time
+                expanded += stats['expanded']
+                ratios.append(cost((start.x, start.y), path))
+            print(f"  {label:<6} {elapsed / queries * 1000:>8.2f} ms/path "
+                  f"{expanded // queries:>6} expanded")
+        optimal, found = ratios[:queries], ratios[queries:]
+        excess = [b / a for a, b in zip(optimal, found) if a]
+        print(f"  hpa path cost vs optimal: mean {sum(excess) / len(excess):.3f}"
+              f" max {max(excess):.3f}")
+
+        # toggle a tile like a door opening and closing
+        x, y = random.choice(floors)
+        elapsed = 0
+        for blocks in (True, False):
+            tilemap.set_tile(x, y, '+', None, 'closed door', blocks=blocks)
+            start_time = time.perf_counter()
+            hierarchy.sync()
+            elapsed += time.perf_counter() - start_time
+        print(f"  incremental update {elapsed / 2 * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,107 @@
+# demo/mapfile_benchmark.py
+
+"""
+    Compares file size and save/load time of the old pickle map saves with
+    the binary map files written by source.mapfile and the memory mapped
+    level store. Store loads also read an 80x25 viewport since that is all
+    of the level paged in from disk.
+    Usage: py -m demos.mapfile_benchmark [repeats]
+"""
+
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from source.ecs.components import (Information, Openable, Position, Tile,
+                                   TileMap)
+from source.generate import generate_cave
+from source.levelstore import LevelStore
+from source.mapfile import dump, encode, load
+
+
+def build_tilemap(width, height):
+    np.random.seed(0)
+    random.seed(0)
+    chars = generate_cave(width, height)
+    tilemap = TileMap(width, height)
+    tilemap.chars[:] = chars
+    tilemap.blocks[:] = chars == '#'
+    for color in ('grey', 'white', 'brown'):
+        tilemap.color_index(color)
+    tilemap.colors[:] = np.random.randint(1, 4, size=chars.shape)
+    tilemap.names[:] = tilemap.label_index('floor')
+    tilemap.visibility[:] = np.random.randint(0, 2, size=chars.shape)
+    # stairs and a door per 100 floors as tile entities
+    entities = []
+    for i, (x, y) in enumerate(tilemap.coordinates(tilemap.floors())[::100]):
+        opened = None if i < 2 else bool(i % 2)
+        info = 'stairs' if i < 2 else 'door'
+        entities.append((i, x, y, info, opened))
+    return tilemap, entities
+
+def save_pickle(path, tilemap, entities):
+    tiles = {}
+    for eid, x, y, info, opened in entities:
+        group = [Tile(), Position(x, y), Information(info)]
+        if opened is not None:
+            group.append(Openable(opened=opened))
+        tiles[eid] = group
+    with open(path, 'wb') as f:
+        pickle.dump(tilemap, f, pickle.HIGHEST_PROTOCOL)
+        pickle.dump(tiles, f, pickle.HIGHEST_PROTOCOL)
+
+def load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f), pickle.load(f)
+
+def store_saver(store):
+    def save(path, tilemap, entities):
+        store.save(0, encode(tilemap, entities, raw=True))
+    return save
+
+def store_loader(store):
+    def read(path):
+        tilemap, entities = store.load(0)
+        # what LevelPanel.render reads from the middle of the map
+        y, x = tilemap.height // 2, tilemap.width // 2
+        tilemap.chars[y:y + 25, x:x + 80].tolist()
+        tilemap.colors[y:y + 25, x:x + 80].tolist()
+        return tilemap, entities
+    return read
+
+def timed(function, *args, repeats=20):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function(*args)
+    return (time.perf_counter() - start) / repeats * 1000
+
+def main(repeats=20):
+    print(f"| {'size':>9} | {'format':<6} | {'bytes':>9} | {'save ms':>8} | {'load ms':>8} |")
+    with tempfile.TemporaryDirectory() as folder:
+        for width, height in ((58, 17), (200, 200), (1000, 1000)):
+            tilemap, entities = build_tilemap(width, height)
+            store = LevelStore(os.path.join(folder, 'levels.store'), new=True)
+            for name, save, read in (
+                ('pickle', save_pickle, load_pickle),
+                ('map', dump, load),
+                ('store', store_saver(store), store_loader(store))
+            ):
+                path = os.path.join(folder, f"map.{name}")
+                saving = timed(save, path, tilemap, entities, repeats=repeats)
+                loading = timed(read, path, repeats=repeats)
+                if name == 'store':
+                    size = store.index[0][1]
+                    store.close()
+                else:
+                    size = os.path.getsize(path)
+                print(f"| {width:>4}x{height:<4} | {name:<6} | {size:>9} | "
+                      f"{saving:>8.3f} | {loading:>8.3f} |")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
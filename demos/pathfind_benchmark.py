@@ -0,0 +1,88 @@
+# demo/pathfind_benchmark.py
+
+"""
+    Benchmarks pathfinders. Paths corner to corner across maps.ASTAR
+    (190x44), HALL and STRESS, and between random floor pairs on every map
+    in maps.dungeons. Reports nodes expanded, time per path and nodes
+    expanded per second for astar and jps.
+    Usage: py -m demos.pathfind_benchmark [runs]
+"""
+
+import random
+import sys
+import time
+from collections import namedtuple
+
+from source.generate import matrix
+from source.maps import ASTAR, HALL, STRESS, dungeons
+from source.pathfind import astar, jps
+
+Node = namedtuple('Node', 'x y')
+
+
+def walkable(mapstring, pillars=0):
+    rows = matrix(mapstring.strip('\n'))
+    tiles = {
+        (x, y)
+            for y, row in enumerate(rows)
+                for x, char in enumerate(row)
+                    if char not in '#+ '
+    }
+    width, height = max(len(row) for row in rows), len(rows)
+    for _ in range(pillars):
+        tiles.discard(
+            (random.randrange(2, width - 2), random.randrange(2, height - 2))
+        )
+    return tiles, width, height
+
+def benchmark(pathfinder, tiles, pairs, runs):
+    stats = {}
+    expanded = length = 0
+    start_time = time.perf_counter()
+    for _ in range(runs):
+        for start, end in pairs:
+            path = pathfinder(tiles, start, end, stats=stats)
+            expanded += stats['expanded']
+            length += len(path)
+    elapsed = time.perf_counter() - start_time
+    return length, expanded, elapsed
+
+def scenarios():
+    for label, mapstring, pillars in (
+        ('ASTAR', ASTAR, 0),
+        ('ASTAR+pillars', ASTAR, 1500),
+        ('HALL', HALL, 0),
+        ('STRESS', STRESS, 0),
+    ):
+        tiles, width, height = walkable(mapstring, pillars)
+        start, end = Node(1, 1), Node(width - 2, height - 2)
+        tiles.update(((start.x, start.y), (end.x, end.y)))
+        yield label, tiles, [(start, end)]
+    for name, (_, mapstring) in dungeons.items():
+        tiles, _, _ = walkable(mapstring)
+        floors = sorted(tiles)
+        pairs = [
+            tuple(Node(*p) for p in random.sample(floors, 2))
+                for _ in range(10)
+        ]
+        yield name, tiles, pairs
+
+def main(runs=5):
+    random.seed(0)
+    print(f"runs={runs}")
+    print(f"| {'map':<14} | {'finder':<6} | {'length':>6} | {'expanded':>8} "
+          f"| {'ms/path':>8} | {'nodes/sec':>10} |")
+    for label, tiles, pairs in scenarios():
+        paths = runs * len(pairs)
+        for pathfinder in (astar, jps):
+            length, expanded, elapsed = benchmark(
+                pathfinder, tiles, pairs, runs
+            )
+            print(f"| {label:<14} | {pathfinder.__name__:<6} "
+                  f"| {length // paths:>6} | {expanded // paths:>8} "
+                  f"| {elapsed / paths * 1000:>8.2f} "
+                  f"| {expanded / elapsed:>10.0f} |")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
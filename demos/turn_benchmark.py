@@ -0,0 +1,142 @@
+# demo/turn_benchmark.py
+
+"""
+    Reproducible benchmark of the game loop. For each map in maps.dungeons
+    an engine is built by ecs_setup on a headless terminal with a fixed
+    seed, a game is started, goblins and food are spawned and the player
+    takes scripted random steps. A turn is every TurnSystem.process call
+    from one player command to the next input request, so it includes the
+    ai, command, grave, decay, heal, mana and spawn systems.
+
+    Each map is played twice with the same seed: once timed and once with
+    tracemalloc on for the peak memory, so tracing does not skew the times.
+    Results are written as json. Passing the json of an earlier commit with
+    --compare prints the change in turn times:
+    Usage: py -m demos.turn_benchmark -o new.json --compare old.json
+"""
+
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+
+import click
+import numpy as np
+
+from source.__main__ import create_save_folder_if_not_exists, ecs_setup
+from source.keyboard import movement_keypresses
+from source.maps import dungeons
+from source.screens import GameScreen
+from source.term import HeadlessTerminal
+
+
+def setup(name, seed, units, items):
+    random.seed(seed)
+    np.random.seed(seed)
+    engine = ecs_setup(HeadlessTerminal(), dungeons[name])
+    engine.add_screen(GameScreen)
+    # the player should outlive the benchmark
+    health = engine.healths.find(engine.player)
+    health.cur_hp = health.max_hp = 10 ** 6
+    spaces = engine.spawn_system.find_valid_spaces()
+    random.shuffle(spaces)
+    for _ in range(min(units, len(spaces))):
+        engine.spawn_system.spawn_unit(spaces.pop())
+    for _ in range(min(items, len(spaces))):
+        engine.spawn_system.spawn_item(spaces.pop())
+    return engine
+
+def play(engine, turns, seed):
+    """Returns the seconds taken by each turn"""
+    script = random.Random(seed)
+    turn_system = engine.turn_system
+    # walk to the player's first turn
+    turn_system.process()
+    times = []
+    for _ in range(turns):
+        if engine.player is None:
+            break
+        engine.keypress = script.choice(movement_keypresses)
+        engine.requires_input = False
+        start = time.perf_counter()
+        # runs until the player is asked for input again
+        while turn_system.process() is not False and engine.player:
+            pass
+        times.append(time.perf_counter() - start)
+    engine.map_system.shutdown()
+    return times
+
+def benchmark(name, seed, turns, units, items, memory):
+    engine = setup(name, seed, units, items)
+    entities = len(engine.entities.entity_ids)
+    times = sorted(play(engine, turns, seed))
+    result = {
+        'turns': len(times),
+        'entities': entities,
+        'turns_per_sec': len(times) / sum(times) if times else 0,
+        'mean_ms': sum(times) / len(times) * 1e3 if times else 0,
+        'p50_ms': times[len(times) // 2] * 1e3 if times else 0,
+        'p99_ms': times[min(len(times) - 1, len(times) * 99 // 100)] * 1e3
+            if times else 0,
+        'peak_memory_kb': None,
+    }
+    if memory:
+        tracemalloc.start()
+        play(setup(name, seed, units, items), turns, seed)
+        result['peak_memory_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    return result
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+@click.command()
+@click.option('-t', '--turns', default=200)
+@click.option('-u', '--units', default=10, help="goblins spawned per map")
+@click.option('-i', '--items', default=10, help="food spawned per map")
+@click.option('-s', '--seed', default=0)
+@click.option('-m', '--maps', default=','.join(dungeons))
+@click.option('-o', '--output', default='saves/turn_benchmark.json')
+@click.option('-c', '--compare', default=None, help="json of an earlier run")
+@click.option('--memory/--no-memory', default=True)
+def main(turns, units, items, seed, maps, output, compare, memory):
+    create_save_folder_if_not_exists()
+    results = {
+        'commit': commit(),
+        'python': platform.python_version(),
+        'seed': seed,
+        'turns': turns,
+        'units': units,
+        'items': items,
+        'maps': {},
+    }
+    previous = {}
+    if compare:
+        with open(compare) as f:
+            previous = json.load(f)['maps']
+    print(f"{'map':<14}{'turns':>7}{'entities':>10}{'turns/s':>10}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'peak kb':>10}{'vs p50':>9}")
+    for name in maps.split(','):
+        result = benchmark(name, seed, turns, units, items, memory)
+        results['maps'][name] = result
+        change = ''
+        if previous.get(name, {}).get('p50_ms'):
+            change = f"{result['p50_ms'] / previous[name]['p50_ms']:.2f}x"
+        print(f"{name:<14}{result['turns']:>7}{result['entities']:>10}"
+              f"{result['turns_per_sec']:>10.1f}{result['p50_ms']:>9.3f}"
+              f"{result['p99_ms']:>9.3f}"
+              f"{str(result['peak_memory_kb']):>10}{change:>9}")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -26,7 +26,9 @@ from source.engine import Engine
 from source.graph import DungeonNode, WorldGraph, WorldNode
 from source.keyboard import blt_keyboard as keyboard
 from source.maps import dungeons
+from source.profiler import Profiler
 from source.screens import MainMenuScreen
+from source.term import HeadlessTerminal
 
 
 def build_shared_components(engine):
@@ -44,7 +46,7 @@ def build_shared_components(engine):
 
 def build_spells(engine):
     for spellname, (manacost, char, colors, desc) in spells.items():
-        spell_id = engine.entities.create()
+        spell_id = engine.entities.create('spells')
         # spell specific shareed cache
         Spell.identify[spell_id] = spellname
         # shared cache will hold all spell info that is needed to build a spell
@@ -68,13 +70,15 @@ def add_world(engine, *map_info):
     # create components per entity
     for map_type, map_string in map_info:
         engine.map_system.generate_map(map_type, map_string)
+    engine.map_system.prefetch()
 
 def ecs_setup(terminal, dungeon_info):
     engine = Engine(
         components=components,
         systems=systems,
         terminal=terminal,
-        keyboard=keyboard
+        keyboard=keyboard,
+        archetypes=True
     )
     for controller in controllers:
         engine.router.add_controller(controller.router, controller(engine))
@@ -89,11 +93,13 @@ def create_save_folder_if_not_exists():
     if not os.path.exists("saves"):
         os.mkdir("saves")
 
-def main(terminal, world):
+def main(terminal, world, profiler=None):
     seed = random.randint(0, 10000)
     random.seed(seed)
     dungeon_info = dungeons.get(world.lower(), 'small')
     engine = ecs_setup(terminal, dungeon_info=dungeon_info)
+    if profiler:
+        engine.profile(profiler)
     engine.run()
     return engine
 
@@ -106,10 +112,18 @@ def blt_setup():
     terminal.set("U+E400: ./source/images/shield.png, size=16x16")
 
 @click.command()
-@click.option('-t', '--term', default='blt')
+@click.option('-t', '--term', default='blt', type=click.Choice(['blt', 'headless']))
 @click.option('-w', '--world', default='shadowbarrow')
 @click.option('-d', '--debug', is_flag=True, default=False)
-def preload(term, world, debug):
+@click.option(
+    '-k', '--keys', default='ENTER',
+    help="headless input: key names like 'ENTER KP_6*20'"
+)
+@click.option(
+    '--trace', default='saves/trace.json',
+    help="chrome trace of the system calls written with --debug"
+)
+def preload(term, world, debug, keys, trace):
     """Things to do before running the engine"""
     # setup logger
     # logging.basicConfig(
@@ -120,12 +134,38 @@ def preload(term, world, debug):
     # logging.info("Started")
     # setup system folders and paths
     create_save_folder_if_not_exists()
-    # setup terminal
-    if term == "blt":
-        blt_setup()
-        engine = main(terminal, world)
+    profiler = None
+    engine = None
+    if debug:
+        # per turn reports are appended to a log next to the trace
+        profiler = Profiler(allocations=True)
+        turn_log = open(os.path.join("saves", "profile.log"), 'w')
+        profiler.turn_hook = lambda report: print(
+            f"turn {profiler.turns}\n{report}\n", file=turn_log
+        )
+    # the profile is still written if the game crashes
+    try:
+        # setup terminal
+        if term == "blt":
+            blt_setup()
+            engine = main(terminal, world, profiler)
+        elif term == "headless":
+            headless = HeadlessTerminal(keys=keys.split())
+            start = time.perf_counter()
+            engine = main(headless, world, profiler)
+            elapsed = time.perf_counter() - start
+            print(f"{headless.frames} frames in {elapsed:.3f}s "
+                  f"({elapsed / max(1, headless.frames) * 1000:.3f}ms/frame), "
+                  f"{headless.writes} writes")
+            print(headless.screen())
+    finally:
         if debug:
-            count_objects(engine)
+            turn_log.close()
+            profiler.dump_trace(trace)
+            print(profiler.report())
+            print(f"trace written to {trace}")
+            if engine:
+                count_objects(engine)
 
 if __name__ == "__main__":
     preload()
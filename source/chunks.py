@@ -0,0 +1,113 @@
+# chunks.py
+
+"""
+    Splits a tilemap into square chunks that are loaded when something asks
+    for them and unloaded once nothing has asked for them in a while.
+
+    The tile arrays of a map stay whole. What a chunk holds is up to the
+    listeners of its ChunkEvents. MapSystem uses them to keep entities only
+    for the doors and stairs near the camera, units and commands.
+    >>> chunks = ChunkTracker(map_id, tilemap.width, tilemap.height)
+    >>> chunks.subscribe(print)
+    >>> chunks.request(x0, x1, y0, y1)   # camera window
+    ChunkEvent(map_id=3, chunk=(0, 0), loaded=True)
+    >>> chunks.sweep()                   # once per frame
+
+    A chunk is unloaded by the first sweep after a sweep during which it was
+    not requested, so a chunk stays loaded for a full frame after the
+    camera or a unit moves away.
+"""
+
+from source.events import ChunkEvent
+
+CHUNK_SIZE = 32
+
+
+def chunk_of(x: int, y: int, size: int = CHUNK_SIZE) -> tuple:
+    return x // size, y // size
+
+def chunk_bounds(chunk: tuple, size: int = CHUNK_SIZE) -> tuple:
+    """Returns the x0, x1, y0, y1 tile window covered by a chunk"""
+    cx, cy = chunk
+    return cx * size, (cx + 1) * size, cy * size, (cy + 1) * size
+
+
+class ChunkTracker:
+    __slots__ = [
+        'map_id', 'width', 'height', 'size', 'margin', 'loaded',
+        'requested', 'listeners', 'loads', 'unloads'
+    ]
+
+    def __init__(
+            self,
+            map_id: int,
+            width: int,
+            height: int,
+            size: int = CHUNK_SIZE,
+            margin: int = 1
+        ):
+        self.map_id = map_id
+        self.width = width
+        self.height = height
+        self.size = size
+        # extra ring of chunks loaded around each request
+        self.margin = margin
+        self.loaded = set()
+        # chunks requested since the last sweep
+        self.requested = set()
+        self.listeners = []
+        self.loads = 0
+        self.unloads = 0
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(map_id={self.map_id}, "
+                f"loaded={len(self.loaded)}, loads={self.loads}, "
+                f"unloads={self.unloads})")
+
+    def subscribe(self, listener) -> None:
+        """listener is called with a ChunkEvent on every load and unload"""
+        self.listeners.append(listener)
+
+    def emit(self, chunk, loaded):
+        event = ChunkEvent(self.map_id, chunk, loaded)
+        for listener in self.listeners:
+            listener(event)
+
+    def chunks(self, x0: int, x1: int, y0: int, y1: int) -> set:
+        """Chunks overlapping the x0:x1, y0:y1 window plus the margin"""
+        columns = -(-self.width // self.size)
+        rows = -(-self.height // self.size)
+        cx0 = max(0, x0 // self.size - self.margin)
+        cx1 = min(columns, (max(x0, x1 - 1)) // self.size + 1 + self.margin)
+        cy0 = max(0, y0 // self.size - self.margin)
+        cy1 = min(rows, (max(y0, y1 - 1)) // self.size + 1 + self.margin)
+        return {
+            (cx, cy)
+                for cx in range(cx0, cx1)
+                    for cy in range(cy0, cy1)
+        }
+
+    def request(self, x0: int, x1: int, y0: int, y1: int) -> None:
+        """Loads every chunk of the window that is not already loaded"""
+        chunks = self.chunks(x0, x1, y0, y1)
+        self.requested |= chunks
+        for chunk in sorted(chunks - self.loaded):
+            self.loaded.add(chunk)
+            self.loads += 1
+            self.emit(chunk, True)
+
+    def request_around(self, x: int, y: int, radius: int) -> None:
+        self.request(x - radius, x + radius + 1, y - radius, y + radius + 1)
+
+    def sweep(self) -> None:
+        """Unloads chunks not requested since the last sweep"""
+        for chunk in sorted(self.loaded - self.requested):
+            self.loaded.discard(chunk)
+            self.unloads += 1
+            self.emit(chunk, False)
+        self.requested = set()
+
+    def clear(self) -> None:
+        """Unloads every chunk"""
+        self.requested = set()
+        self.sweep()
@@ -18,11 +18,8 @@ class GameMode(Enum):
     MAGIC = auto()
 
 def find_empty_spaces(engine):
-    return {
-        (position.x, position.y)
-            for _, position in join_drop_key(engine.tiles, engine.positions)
-                if not position.blocks
-    }
+    tilemap = engine.tilemaps.find(engine.world.id)
+    return tilemap.walkable_tiles()
 
 def dot() -> tuple:
     """Wrapper for a single point"""
@@ -91,6 +88,19 @@ def entity_component(eid, *managers):
     for m in managers:
         yield m.components[eid]
 
+def shared_archetypes(managers) -> object:
+    """
+        Returns the archetype storage used by every manager or None if the
+        managers do not share one.
+    """
+    archetypes = getattr(managers[0], 'archetypes', None)
+    if archetypes is None:
+        return None
+    for manager in managers[1:]:
+        if getattr(manager, 'archetypes', None) is not archetypes:
+            return None
+    return archetypes
+
 def j(first, *rest) -> set:
     keys = set(first.components)
     for d in rest:
@@ -102,6 +112,10 @@ def join(*managers) -> tuple:
     # at least two needed else returns dict items
     if len(managers) == 1:
         return managers.components.items()
+    archetypes = shared_archetypes(managers)
+    if archetypes is not None:
+        yield from archetypes.query(*(m.name for m in managers))
+        return
     for eid in j(*managers):
         yield eid, (m.components[eid] for m in managers)
 
@@ -115,6 +129,11 @@ def join_drop_key(*managers) -> tuple:
     # at least two needed else returns dict items
     if len(managers) == 1:
         return managers.components.values()
+    archetypes = shared_archetypes(managers)
+    if archetypes is not None:
+        for _, components in archetypes.query(*(m.name for m in managers)):
+            yield components
+        return
     for eid in j(*managers):
         yield (m.components[eid] for m in managers)
 
@@ -123,10 +142,14 @@ def join_conditional(*managers, key=True, conditions=None) -> tuple:
     if len(managers) == 1:
         return managers.components.items()
     # filter by id matching
-    keys = set.intersection(*map(set, (m.components for m in managers)))
-    for eid in keys:
+    archetypes = shared_archetypes(managers)
+    if archetypes is not None:
+        rows = archetypes.query(*(m.name for m in managers))
+    else:
+        keys = set.intersection(*map(set, (m.components for m in managers)))
+        rows = ((eid, [m.components[eid] for m in managers]) for eid in keys)
+    for eid, components in rows:
         # with conditional, additional filters by conditions
-        components = list(m.components[eid] for m in managers)
         skip = False
         for i, condition in conditions:
             if condition(components[i]):
@@ -34,6 +34,14 @@ def count_objects(engine):
         messages.append(f"{component.manager}, {', '.join(map(str, count))}")
     messages.append(f"managed: {count[0]}, shared: {count[1]}")
 
+    # entity populations tagged when created
+    entities = getattr(engine, 'entities', None)
+    if entities:
+        populations = ', '.join(
+            f"{tag}: {entities.count(tag)}" for tag in entities.populations
+        )
+        messages.append(f"entities: {len(entities.entity_ids)}, {populations}")
+
     # environment entities
     messages.append(f"tiles: {get_components(set('tiles positions visibilities renders infos'.split()))}")
     
@@ -43,6 +51,10 @@ def count_objects(engine):
     # items
     messages.append(f"items: {get_components(set('healths positions infos renders inventories'.split()))}")
 
+    # persistent queries and their hit rates
+    for query in getattr(engine, 'queries', {}).values():
+        messages.append(f"{query} hit rate: {query.hit_rate:.2f}")
+
     print("\n".join(messages))
 
 if __name__ == "__main__":
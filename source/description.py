@@ -58,8 +58,8 @@ spells = {
 env_char_to_name = {
     '.': 'floor',
     '#': 'wall',
-    '+': 'opened door',
-    '/': 'closed door',
+    '+': 'closed door',
+    '/': 'opened door',
     '<': 'up stairs',
     '>': 'down stairs',
     "'": 'flower'
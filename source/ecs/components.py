@@ -37,6 +37,8 @@ import enum
 import random
 from dataclasses import dataclass, field
 
+import numpy as np
+
 from source.common import squares
 from source.keyboard import keypress_to_direction
 
@@ -58,11 +60,10 @@ class Component(object):
         return cls.__name__.lower()
 
 class AI(Component):
-    __slots__ = ['behavior', 'path']
+    __slots__ = ['behavior']
     manager: str = 'ais'
     def __init__(self, behavior: str = 'wander'):
         self.behavior = behavior
-        self.path = None
     
 class Collision(Component):
     __slots__ = ['entity', 'x', 'x']
@@ -213,7 +214,9 @@ class Movement(Component):
         return cls(x, y)
 
 class Position(Component):
-    __slots__ = 'x', 'y', 'map_id', 'movement_type', 'blocks'
+    __slots__ = (
+        '_x', '_y', '_map_id', 'movement_type', 'blocks', 'entity', 'observer'
+    )
     manager: str = 'positions'
     class MovementType(enum.Enum):
         # no movement
@@ -235,11 +238,66 @@ class Position(Component):
         movement_type: int = MovementType.NONE,
         blocks: bool = True
     ):
-        self.x = x
-        self.y = y
-        self.map_id = map_id
+        # entity and observer are set by the position manager holding this
+        # position so coordinate changes can update its spatial index
+        self.entity = None
+        self.observer = None
+        self._x = x
+        self._y = y
+        self._map_id = map_id
         self.movement_type = movement_type
         self.blocks = blocks
+    def __repr__(self) -> str:
+        attributes = ", ".join(
+            f"{s}={getattr(self, s)}"
+                for s in ('x', 'y', 'map_id', 'movement_type', 'blocks')
+        )
+        return f"{self.__class__.__name__}({attributes})"
+    def __getstate__(self):
+        # observers are runtime links and are not saved with the position
+        return (self._x, self._y, self._map_id, self.movement_type, self.blocks)
+    def __setstate__(self, state):
+        self.entity = None
+        self.observer = None
+        if len(state) == 2:
+            # (None, slots) saved before positions had properties
+            slots = state[1]
+            state = tuple(
+                slots[name]
+                    for name in ('x', 'y', 'map_id', 'movement_type', 'blocks')
+            )
+        (self._x, self._y, self._map_id,
+         self.movement_type, self.blocks) = state
+    @property
+    def key(self) -> tuple:
+        return self._map_id, self._x, self._y
+    def moved(self, key):
+        if self.observer is not None:
+            self.observer.moved(self, key)
+    @property
+    def x(self) -> int:
+        return self._x
+    @x.setter
+    def x(self, x: int):
+        key = self.key
+        self._x = x
+        self.moved(key)
+    @property
+    def y(self) -> int:
+        return self._y
+    @y.setter
+    def y(self, y: int):
+        key = self.key
+        self._y = y
+        self.moved(key)
+    @property
+    def map_id(self) -> int:
+        return self._map_id
+    @map_id.setter
+    def map_id(self, map_id: int):
+        key = self.key
+        self._map_id = map_id
+        self.moved(key)
     def __eq__(self, other):
         return self.x == other.x and self.y == other.y
     def __add__(self, other):
@@ -292,12 +350,103 @@ class Tile:
         return Tile.instance
 
 class TileMap(Component):
-    __slots__ = 'width height map_type'.split()
+    """
+    Holds the dense tile layer of a map. Each property of a tile is a numpy
+    array indexed by [y, x]. Colors and names are stored as indices into the
+    palette and labels lists so each array stays one byte per tile.
+        chars      -> character drawn for the tile (' ' means no tile)
+        blocks     -> tile blocks movement and light
+        colors     -> index into palette
+        visibility -> 0: unexplored, 1: explored, 2: in view
+        openable   -> tile is a door
+        names      -> index into labels (shared information names)
+    generation is bumped whenever a tile starts or stops blocking so cached
+    results that depend on blockers (field of view, walkable tiles) know to
+    recompute. Code writing to blocks directly must call changed().
+    """
+    __slots__ = [
+        'width', 'height', 'map_type', 'chars', 'blocks', 'colors',
+        'visibility', 'openable', 'names', 'palette', 'labels',
+        'generation', 'fov', 'walkable_cache'
+    ]
     manager: str = 'tilemaps'
     def __init__(self, width: int, height: int, map_type='cave'):
         self.width = width
         self.height = height
         self.map_type = map_type
+        shape = (height, width)
+        self.chars = np.full(shape, ' ', dtype='<U1')
+        self.blocks = np.ones(shape, dtype=bool)
+        self.colors = np.zeros(shape, dtype=np.uint8)
+        self.visibility = np.zeros(shape, dtype=np.uint8)
+        self.openable = np.zeros(shape, dtype=bool)
+        self.names = np.zeros(shape, dtype=np.uint8)
+        self.palette = [None]
+        self.labels = [None]
+        self.generation = 0
+        # (key, lighted) of the last field of view cast on this map
+        self.fov = None
+        # (generation, walkable grid, walkable coordinates)
+        self.walkable_cache = None
+    def __repr__(self) -> str:
+        return (f"{self.__class__.__name__}(width={self.width}, "
+                f"height={self.height}, map_type={self.map_type})")
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+    def color_index(self, color: str) -> int:
+        if color not in self.palette:
+            self.palette.append(color)
+        return self.palette.index(color)
+    def label_index(self, name: str) -> int:
+        if name not in self.labels:
+            self.labels.append(name)
+        return self.labels.index(name)
+    def set_tile(self, x, y, char, color, name, blocks=None, openable=None):
+        self.chars[y, x] = char
+        self.colors[y, x] = self.color_index(color)
+        self.names[y, x] = self.label_index(name)
+        if blocks is not None and self.blocks[y, x] != blocks:
+            self.blocks[y, x] = blocks
+            self.changed()
+        if openable is not None:
+            self.openable[y, x] = openable
+    def changed(self) -> None:
+        """Call after changing anything that blocks light or movement"""
+        self.generation += 1
+    def char(self, x: int, y: int) -> str:
+        return str(self.chars[y, x])
+    def color(self, x: int, y: int) -> str:
+        return self.palette[self.colors[y, x]]
+    def name(self, x: int, y: int) -> str:
+        return self.labels[self.names[y, x]]
+    def exists(self) -> np.ndarray:
+        """Boolean grid of cells that hold a tile"""
+        return self.chars != ' '
+    def floors(self) -> np.ndarray:
+        """Boolean grid of tiles that do not block movement"""
+        return ~self.blocks & self.exists()
+    def walkable(self) -> np.ndarray:
+        """Cached floors() grid. Rebuilt only after generation changes"""
+        cache = self.walkable_cache
+        if cache is None or cache[0] != self.generation:
+            cache = self.walkable_cache = [self.generation, self.floors(), None]
+        return cache[1]
+    def walkable_tiles(self) -> frozenset:
+        """Cached (x, y) set of walkable tiles shared by pathfinders"""
+        grid = self.walkable()
+        if self.walkable_cache[2] is None:
+            self.walkable_cache[2] = frozenset(self.coordinates(grid))
+        return self.walkable_cache[2]
+    def coordinates(self, mask: np.ndarray) -> list:
+        """Returns (x, y) pairs for every true cell of a boolean grid"""
+        return [(x, y) for y, x in np.argwhere(mask).tolist()]
+    def find(self, char: str) -> tuple:
+        """Returns the first (x, y) holding char or None if not found"""
+        found = np.argwhere(self.chars == char)
+        if not len(found):
+            return None
+        y, x = found[0].tolist()
+        return x, y
 
 class Visibility(Component):
     __slots__ = ['level']
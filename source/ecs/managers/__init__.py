@@ -1,3 +1,8 @@
+from .archetype_manager import Archetype, ArchetypeManager
 from .component_manager import ComponentManager
 from .components_manager import ComponentsManager
 from .entity_manager import EntityManager
+from .position_manager import PositionManager
+from .query import Query
+from .scheduler import Scheduler
+from .spatial_index import SpatialIndex
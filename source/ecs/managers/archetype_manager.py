@@ -0,0 +1,165 @@
+# archetype_manager.py
+
+"""
+    Archetype storage shared by component managers.
+
+    Entities with the same set of components (their signature) are kept
+    together in one packed table. A query over several managers walks only
+    the tables whose signature contains every requested manager instead of
+    intersecting the key sets of each manager dictionary.
+
+        signature {positions, renders, visibilities}
+        +--------+-----------+---------+--------------+
+        | entity | positions | renders | visibilities |
+        +--------+-----------+---------+--------------+
+        |   12   | Position  | Render  | Visibility   |
+        |   13   | Position  | Render  | Visibility   |
+        +--------+-----------+---------+--------------+
+"""
+
+
+class Archetype:
+    """
+        Packed table of entities sharing one signature. Removed rows are
+        filled by the last row so the columns never hold gaps.
+    """
+
+    __slots__ = ['signature', 'entities', 'rows', 'columns']
+
+    def __init__(self, signature: frozenset):
+        self.signature = signature
+        self.entities: list = []
+        self.rows: dict = {}
+        self.columns: dict = {name: [] for name in signature}
+
+    def __repr__(self):
+        names = ', '.join(sorted(self.signature))
+        return f"{self.__class__.__name__}({names}, rows={len(self)})"
+
+    def __len__(self):
+        return len(self.entities)
+
+    def append(self, eid: int, components: dict) -> None:
+        """Adds a row for the entity. Components are keyed by manager name."""
+        self.rows[eid] = len(self.entities)
+        self.entities.append(eid)
+        for name, column in self.columns.items():
+            column.append(components[name])
+
+    def pop(self, eid: int) -> dict:
+        """Removes the entity row and returns its components by name."""
+        row = self.rows.pop(eid)
+        last = self.entities.pop()
+        components = {}
+        for name, column in self.columns.items():
+            component = column.pop()
+            if last != eid:
+                components[name] = column[row]
+                column[row] = component
+            else:
+                components[name] = component
+        if last != eid:
+            self.entities[row] = last
+            self.rows[last] = row
+        return components
+
+
+class ArchetypeManager:
+
+    __slots__ = ['archetypes', 'locations', 'matches']
+
+    def __init__(self):
+        # signature -> table
+        self.archetypes: dict = {}
+        # entity -> table currently holding the entity
+        self.locations: dict = {}
+        # query signature -> tables matching that query
+        self.matches: dict = {}
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(archetypes={len(self.archetypes)}"
+                f", entities={len(self.locations)})")
+
+    def archetype(self, signature: frozenset) -> Archetype:
+        """Returns the table for a signature, creating it if needed"""
+        archetype = self.archetypes.get(signature)
+        if archetype is None:
+            archetype = Archetype(signature)
+            self.archetypes[signature] = archetype
+            # keep cached query matches in sync with the new table
+            for query, tables in self.matches.items():
+                if query <= signature:
+                    tables.append(archetype)
+        return archetype
+
+    def add(self, eid: int, name: str, component: object) -> None:
+        """
+            Links a component to the entity. If the entity already has a
+            component from the same manager it is replaced in place,
+            otherwise the entity moves to the table of its new signature.
+        """
+        current = self.locations.get(eid)
+        if current is None:
+            components = {}
+            signature = frozenset((name,))
+        elif name in current.signature:
+            current.columns[name][current.rows[eid]] = component
+            return
+        else:
+            components = current.pop(eid)
+            signature = current.signature | {name}
+        components[name] = component
+        archetype = self.archetype(signature)
+        archetype.append(eid, components)
+        self.locations[eid] = archetype
+
+    def remove(self, eid: int, name: str) -> None:
+        """Unlinks a component and moves the entity to its new table"""
+        current = self.locations.get(eid)
+        if current is None or name not in current.signature:
+            return
+        components = current.pop(eid)
+        del components[name]
+        if not components:
+            del self.locations[eid]
+            return
+        archetype = self.archetype(current.signature - {name})
+        archetype.append(eid, components)
+        self.locations[eid] = archetype
+
+    def tables(self, names: tuple) -> list:
+        """Returns all tables that hold every component in names"""
+        query = frozenset(names)
+        tables = self.matches.get(query)
+        if tables is None:
+            tables = [
+                archetype
+                    for signature, archetype in self.archetypes.items()
+                        if query <= signature
+            ]
+            self.matches[query] = tables
+        return tables
+
+    def query(self, *names) -> tuple:
+        """
+            Yields entity, (component, ...) pairs in the order of names.
+            Rows are copied per table before yielding so callers can add or
+            remove components while iterating.
+        """
+        for archetype in self.tables(names):
+            if not archetype.entities:
+                continue
+            columns = [archetype.columns[name][:] for name in names]
+            yield from zip(archetype.entities[:], zip(*columns))
+
+if __name__ == "__main__":
+    from source.ecs.components import Position, Render, Visibility
+    a = ArchetypeManager()
+    for eid in range(4):
+        a.add(eid, 'positions', Position(eid, eid))
+        a.add(eid, 'renders', Render('.'))
+        if eid % 2:
+            a.add(eid, 'visibilities', Visibility())
+    print(a, list(a.archetypes.values()))
+    for eid, (position, visibility) in a.query('positions', 'visibilities'):
+        print(eid, position, visibility)
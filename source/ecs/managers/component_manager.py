@@ -4,12 +4,19 @@
 #  364.2 KiB with this class
 class ComponentManager:
 
-    __slots__ = ['ctype', 'components', 'shared']
+    __slots__ = [
+        'ctype', 'components', 'shared', 'name', 'archetypes', 'queries'
+    ]
 
-    def __init__(self, ctype, dicttype=dict):
+    def __init__(self, ctype, dicttype=dict, archetypes=None):
         self.ctype = ctype
         self.components = dicttype()
         self.shared = dict()
+        self.name = getattr(ctype, 'manager', ctype.__name__)
+        # optional archetype storage shared with the other engine managers
+        self.archetypes = archetypes
+        # persistent queries notified when entities are added or removed
+        self.queries = []
 
     def __str__(self):
         l = len(self.components.keys())
@@ -37,15 +44,42 @@ class ComponentManager:
             raise ValueError(
 f"Ctype: {self.ctype} Instance: {is_instance}, Inherited: {is_inherited} Incoming: {type(component)}"
 )
+        added = entity_id not in self.components
         self.components[entity_id] = component
+        if self.archetypes is not None:
+            self.archetypes.add(entity_id, self.name, component)
+        if added:
+            for query in self.queries:
+                query.on_add(entity_id)
+
+    def removed(self, eid: int) -> None:
+        """Notifies storages linked to this manager of a removed entity"""
+        if self.archetypes is not None:
+            self.archetypes.remove(eid, self.name)
+        for query in self.queries:
+            query.on_remove(eid)
 
     def remove(self, eid: int) -> bool:
         """Removes a key-value pair from the component dictionary."""
         if eid in self.components.keys():
             del self.components[eid]
+            self.removed(eid)
             return True
         return False
 
+    def popitem(self) -> tuple:
+        """Removes and returns the last added entity, component pair."""
+        eid, component = self.components.popitem()
+        self.removed(eid)
+        return eid, component
+
+    def clear(self) -> None:
+        """Removes every component from the component dictionary."""
+        if self.archetypes is not None or self.queries:
+            for eid in self.components:
+                self.removed(eid)
+        self.components.clear()
+
     def find(self, eid: int) -> object:
         """
             Returns the component value of an entity key that exists in the 
@@ -1,59 +1,164 @@
 # entitymanager.py
 
-"""Manager for entity objects"""
+"""
+    Manager for entity objects.
 
+    Entity ids are generational handles packed into an int so they still
+    work as dict keys: the low INDEX_BITS hold a slot index and the bits
+    above it the generation of that slot. Removing an entity frees its slot
+    and bumps the slot's generation, so the next entity created in the slot
+    gets a different id and handles kept to the removed entity are stale
+    (see alive). Free slots are reused oldest first.
+    >>> entities = EntityManager()
+    >>> goblin = entities.create('actors')
+    >>> entities.remove(goblin)
+    >>> entities.alive(goblin)
+    False
+    >>> entity_index(entities.create()) == entity_index(goblin)
+    True
+
+    Storages can use entity_index(entity_id) as a dense array index. It is
+    always below EntityManager.capacity.
+"""
+
+from collections import deque
 from dataclasses import dataclass
 
+# populations an entity can be tagged with when created
+TAGS = ('actors', 'items', 'tiles', 'spells', 'maps')
+# slots available before ids need more than 32 bits (mapfile stores u4)
+INDEX_BITS = 20
+INDEX_MASK = (1 << INDEX_BITS) - 1
+# generations wrap around after this many reuses of a slot
+GENERATIONS = 1 << 12
+
+
+def entity_id(index: int, generation: int = 0) -> int:
+    return generation << INDEX_BITS | index
+
+def entity_index(entity_id: int) -> int:
+    return entity_id & INDEX_MASK
+
+def entity_generation(entity_id: int) -> int:
+    return entity_id >> INDEX_BITS
+
 
 class EntityManager(object):
 
-    __slots__ = ['next_id', 'ids', 'entity_ids', 'removed']
+    __slots__ = ['generations', 'free', 'entity_ids', 'tags', 'populations']
     
     def __init__(self) -> None:
-        self.next_id: int = 0
-        self.ids: set = set()
-        self.removed: set = set()
-        self.entity_ids: list = []
+        # current generation of every slot ever used
+        self.generations: list = []
+        # slots of removed entities ready to be reused
+        self.free: deque = deque()
+        # live entity ids in creation order. dicts are used as ordered sets
+        # so removing an entity is O(1)
+        self.entity_ids: dict = {}
+        # entity id -> tag and tag -> entity ids in creation order
+        self.tags: dict = {}
+        self.populations: dict = {tag: {} for tag in TAGS}
 
     def __repr__(self) -> str:
-        return f"{self.__class__.__name__}(next_id={self.next_id})"
+        return (f"{self.__class__.__name__}(next_id={self.next_id}, "
+                f"entities={len(self)}, free={len(self.free)})")
 
     def __iter__(self) -> int:
         for entity_id in self.entity_ids:
             yield entity_id
 
-    def create(self) -> int:
-        """Reserves an integer value to be used as the entity key."""
-        entity_id = self.next_id
-        self.next_id += 1
-        # self.ids.add(entity_id)
-        self.entity_ids.append(entity_id)
-        return entity_id
+    def __len__(self) -> int:
+        return len(self.entity_ids)
+
+    def __contains__(self, entity_id: int) -> bool:
+        return entity_id in self.entity_ids
+
+    @property
+    def capacity(self) -> int:
+        """Number of slots in use or free. Every entity index is below it"""
+        return len(self.generations)
+
+    @property
+    def next_id(self) -> int:
+        """Entity id the next call to create will return"""
+        index = self.free[0] if self.free else len(self.generations)
+        generation = self.generations[index] if self.free else 0
+        return entity_id(index, generation)
+
+    def alive(self, entity_id: int) -> bool:
+        """False for removed entities even if their slot was reused"""
+        return entity_id in self.entity_ids
+
+    def create(self, tag: str = None) -> int:
+        """
+            Reserves an integer value to be used as the entity key. A tag
+            adds the entity to that population (see tagged).
+        """
+        if self.free:
+            index = self.free.popleft()
+        else:
+            index = len(self.generations)
+            if index > INDEX_MASK:
+                raise OverflowError("no entity slots left")
+            self.generations.append(0)
+        new_id = entity_id(index, self.generations[index])
+        self.entity_ids[new_id] = None
+        if tag:
+            self.tag(new_id, tag)
+        return new_id
+
+    def tag(self, entity_id: int, tag: str) -> None:
+        """Moves an entity into the population of tag"""
+        self.untag(entity_id)
+        self.populations.setdefault(tag, {})[entity_id] = None
+        self.tags[entity_id] = tag
+
+    def untag(self, entity_id: int) -> None:
+        tag = self.tags.pop(entity_id, None)
+        if tag:
+            del self.populations[tag][entity_id]
+
+    def tagged(self, tag: str) -> list:
+        """Returns the entities tagged with tag in the order they were tagged"""
+        return list(self.populations.get(tag, ()))
+
+    def count(self, tag: str) -> int:
+        return len(self.populations.get(tag, ()))
 
-    def add(self, entity_id: int) -> None:
+    def add(self, entity_id: int, tag: str = None) -> None:
         """
-            Adds an entity_id value to the list of used entity key values. If
-            the key is not already used then it set the next_id to the most
-            appropriate next id value. If the key is already used then it will
-            raise a ValueError exception.
+            Adds an entity_id value to the list of used entity key values,
+            e.g. an id read from a save. Its slot takes the generation of
+            entity_id. Slots skipped over are freed for create. If the slot
+            is already used then it will raise a ValueError exception.
         """
-        if entity_id in self.ids:
-            raise ValueError(f"Entity id({entity_id}) already exists")
-        self.ids.add(entity_id)
-        self.entity_ids.append(entity_id)
-        self.find_next_id()
-
-    def find_next_id(self) -> int:
-        """Loops until a new id not in the set of known ids is found"""
-        self.next_id = 0
-        while self.next_id in self.ids:
-            self.next_id += 1
+        index = entity_index(entity_id)
+        generation = entity_generation(entity_id)
+        if index < len(self.generations):
+            if index not in self.free:
+                raise ValueError(f"Entity id({entity_id}) already exists")
+            # rare enough that the O(n) removal from the free list is fine
+            self.free.remove(index)
+        else:
+            for skipped in range(len(self.generations), index):
+                self.generations.append(0)
+                self.free.append(skipped)
+            self.generations.append(0)
+        self.generations[index] = generation
+        self.entity_ids[entity_id] = None
+        if tag:
+            self.tag(entity_id, tag)
 
     def remove(self, entity_id: int) -> None:
-        """Moves id from known set of ids into a set of removed ids"""
-        self.ids -= {entity_id}
-        self.entity_ids.remove(entity_id)
-        self.removed.add(entity_id)
+        """Frees the slot of the entity and makes its id stale"""
+        if entity_id not in self.entity_ids:
+            raise ValueError(f"Entity id({entity_id}) does not exist")
+        del self.entity_ids[entity_id]
+        self.untag(entity_id)
+        index = entity_index(entity_id)
+        self.generations[index] = \
+            (entity_generation(entity_id) + 1) % GENERATIONS
+        self.free.append(index)
 
 if __name__ == "__main__":
     from source.debug import dprint
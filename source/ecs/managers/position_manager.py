@@ -0,0 +1,62 @@
+# position_manager.py
+
+"""Component manager for positions that keeps a spatial index in sync"""
+
+from .component_manager import ComponentManager
+from .spatial_index import SpatialIndex
+
+
+class PositionManager(ComponentManager):
+
+    __slots__ = ['index']
+
+    def __init__(self, ctype, dicttype=dict, archetypes=None):
+        super().__init__(ctype, dicttype, archetypes)
+        self.index = SpatialIndex()
+
+    def attach(self, eid: int, position: object) -> None:
+        position.entity = eid
+        position.observer = self
+        self.index.insert(eid, position.key, position)
+
+    def detach(self, eid: int, position: object) -> None:
+        self.index.delete(eid, position.key)
+        if position.observer is self:
+            position.entity = None
+            position.observer = None
+
+    def add(self, entity_id: int, component: object) -> None:
+        old = self.components.get(entity_id)
+        super().add(entity_id, component)
+        if old is not None:
+            self.detach(entity_id, old)
+        self.attach(entity_id, component)
+
+    def remove(self, eid: int) -> bool:
+        position = self.components.get(eid)
+        if position is not None:
+            self.detach(eid, position)
+        return super().remove(eid)
+
+    def popitem(self) -> tuple:
+        eid, position = super().popitem()
+        self.detach(eid, position)
+        return eid, position
+
+    def clear(self) -> None:
+        for eid, position in self.components.items():
+            self.detach(eid, position)
+        super().clear()
+
+    def moved(self, position: object, old: tuple) -> None:
+        """Called by a position after its x, y or map_id changed"""
+        self.index.move(position.entity, old, position.key, position)
+
+    def at(self, map_id: int, x: int, y: int) -> list:
+        return self.index.at(map_id, x, y)
+
+    def in_rect(self, map_id: int, x0: int, y0: int, x1: int, y1: int):
+        return self.index.in_rect(map_id, x0, y0, x1, y1)
+
+    def in_radius(self, map_id: int, x: int, y: int, radius: float):
+        return self.index.in_radius(map_id, x, y, radius)
@@ -0,0 +1,93 @@
+# query.py
+
+"""
+    Persistent join over a group of component managers.
+
+    A query is built once and registers itself with each manager it covers.
+    Managers notify their queries when an entity gains or loses a component
+    so the matching entity set never has to be recomputed from the full key
+    sets of each manager.
+    >>> q = Query(engine.visibilities, engine.positions)
+    >>> for eid, (visibility, position) in q:
+    ...     ...
+"""
+
+
+class Query:
+
+    __slots__ = [
+        'managers', 'entities', 'dirty', 'hits', 'misses', 'invalidations'
+    ]
+
+    def __init__(self, *managers):
+        self.managers = managers
+        first, *rest = managers
+        self.entities: set = set(first.components)
+        for manager in rest:
+            self.entities.intersection_update(manager.components)
+        for manager in managers:
+            manager.queries.append(self)
+        # hits count runs where the matching set was unchanged since the
+        # previous run. misses count runs after the set was invalidated.
+        self.dirty: bool = True
+        self.hits: int = 0
+        self.misses: int = 0
+        self.invalidations: int = 0
+
+    def __repr__(self):
+        names = ', '.join(manager.name for manager in self.managers)
+        return (f"{self.__class__.__name__}({names}, "
+                f"entities={len(self.entities)}, hits={self.hits}, "
+                f"misses={self.misses}, invalidations={self.invalidations})")
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __contains__(self, eid):
+        return eid in self.entities
+
+    def __iter__(self):
+        for eid in self.keys():
+            yield eid, tuple(m.components[eid] for m in self.managers)
+
+    @property
+    def hit_rate(self) -> float:
+        runs = self.hits + self.misses
+        return self.hits / runs if runs else 0.0
+
+    def keys(self) -> list:
+        """Returns a copy of the matching entities and records the run"""
+        if self.dirty:
+            self.misses += 1
+            self.dirty = False
+        else:
+            self.hits += 1
+        return list(self.entities)
+
+    def values(self) -> tuple:
+        for eid in self.keys():
+            yield tuple(m.components[eid] for m in self.managers)
+
+    def on_add(self, eid: int) -> None:
+        """Called by a manager after a new entity was added to it"""
+        if eid in self.entities:
+            return
+        for manager in self.managers:
+            if eid not in manager.components:
+                return
+        self.entities.add(eid)
+        self.dirty = True
+        self.invalidations += 1
+
+    def on_remove(self, eid: int) -> None:
+        """Called by a manager after an entity was removed from it"""
+        if eid in self.entities:
+            self.entities.remove(eid)
+            self.dirty = True
+            self.invalidations += 1
+
+    def close(self) -> None:
+        """Unregisters the query from its managers"""
+        for manager in self.managers:
+            manager.queries.remove(self)
+        self.entities.clear()
@@ -0,0 +1,104 @@
+# scheduler.py
+
+"""
+    Priority queue of the entities that take turns.
+
+    Only entities with an Input component are scheduled. The scheduler
+    registers with the inputs manager the same way a Query does, so actors
+    are added when they gain an Input and dropped when it is removed (e.g.
+    by GraveSystem) without scanning the entity list.
+    >>> scheduler = Scheduler(engine.inputs)
+    >>> entity = scheduler.peek()       # next actor or None
+    >>> scheduler.done(entity, delay)   # acts again delay ticks later
+
+    Times are integer ticks and a round lasts ROUND ticks. Actors that act
+    at the same tick go in the order they were scheduled, so with the
+    default delay of ROUND every actor acts once per round in the order of
+    the old entity list walk. Removed actors leave their heap entry behind.
+    Entries that no longer match the actor's key are skipped when they
+    reach the top.
+"""
+
+import heapq
+
+# ticks in a round. Also the delay of an actor with the default speed
+ROUND = 10
+
+
+class Scheduler:
+
+    __slots__ = [
+        'heap', 'keys', 'now', 'round_end', 'sequence', 'rounds'
+    ]
+
+    def __init__(self, inputs):
+        # (time, sequence, entity) entries, some of them stale
+        self.heap = []
+        # entity -> (time, sequence) of its live entry
+        self.keys = {}
+        self.now = 0
+        self.round_end = ROUND
+        self.sequence = 0
+        self.rounds = 0
+        for entity in sorted(inputs.components):
+            self.on_add(entity)
+        inputs.queries.append(self)
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(actors={len(self.keys)}, "
+                f"now={self.now}, rounds={self.rounds}, "
+                f"entries={len(self.heap)})")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, entity):
+        return entity in self.keys
+
+    def schedule(self, entity: int, time: int, sequence: int) -> None:
+        self.keys[entity] = (time, sequence)
+        heapq.heappush(self.heap, (time, sequence, entity))
+        # rebuild once stale entries outnumber the live ones
+        if len(self.heap) > 2 * len(self.keys) + 16:
+            self.heap = [
+                (time, sequence, entity)
+                    for entity, (time, sequence) in self.keys.items()
+            ]
+            heapq.heapify(self.heap)
+
+    def on_add(self, entity: int) -> None:
+        """New actors act at the current tick after those already waiting"""
+        self.sequence += 1
+        self.schedule(entity, self.now, self.sequence)
+
+    def on_remove(self, entity: int) -> None:
+        self.keys.pop(entity, None)
+
+    def peek(self) -> int:
+        """Returns the next actor without removing it or None if empty"""
+        heap = self.heap
+        while heap:
+            time, sequence, entity = heap[0]
+            if self.keys.get(entity) == (time, sequence):
+                return entity
+            heapq.heappop(heap)
+        return None
+
+    def round_over(self) -> bool:
+        """True once no actor is left to act before the round ends"""
+        entity = self.peek()
+        return entity is None or self.keys[entity][0] >= self.round_end
+
+    def next_round(self) -> None:
+        self.now = self.round_end
+        self.round_end += ROUND
+        self.rounds += 1
+
+    def done(self, entity: int, delay: int = ROUND) -> None:
+        """Reschedules an actor that finished its turn delay ticks later"""
+        key = self.keys.get(entity)
+        if key is None:
+            return
+        time, sequence = key
+        self.now = time
+        self.schedule(entity, time + delay, sequence)
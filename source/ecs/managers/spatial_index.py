@@ -0,0 +1,83 @@
+# spatial_index.py
+
+"""
+    Spatial hash of entities keyed by (map_id, x, y).
+
+    Each cell holds a dictionary of entity id to position so lookups of
+    everything standing on a tile are a single hash lookup instead of a scan
+    over every position component.
+"""
+
+import math
+
+
+class SpatialIndex:
+
+    __slots__ = ['cells']
+
+    def __init__(self):
+        self.cells: dict = {}
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(cells={len(self.cells)})"
+
+    def __len__(self):
+        return sum(len(cell) for cell in self.cells.values())
+
+    def insert(self, eid: int, key: tuple, position: object) -> None:
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = {}
+        cell[eid] = position
+
+    def delete(self, eid: int, key: tuple) -> None:
+        cell = self.cells.get(key)
+        if cell is None or eid not in cell:
+            return
+        del cell[eid]
+        if not cell:
+            del self.cells[key]
+
+    def move(self, eid: int, old: tuple, new: tuple, position: object):
+        self.delete(eid, old)
+        self.insert(eid, new, position)
+
+    def clear(self) -> None:
+        self.cells.clear()
+
+    def at(self, map_id: int, x: int, y: int) -> list:
+        """Returns a list of entity, position pairs on a single tile"""
+        cell = self.cells.get((map_id, x, y))
+        if cell is None:
+            return []
+        return list(cell.items())
+
+    def in_rect(self, map_id: int, x0: int, y0: int, x1: int, y1: int):
+        """
+            Yields entity, position pairs inside the rectangle where
+            x0 <= x < x1 and y0 <= y < y1. Small rectangles probe each tile,
+            large ones filter the occupied cells instead.
+        """
+        area = max(0, x1 - x0) * max(0, y1 - y0)
+        if area <= len(self.cells):
+            cells = self.cells
+            for y in range(y0, y1):
+                for x in range(x0, x1):
+                    cell = cells.get((map_id, x, y))
+                    if cell:
+                        yield from list(cell.items())
+        else:
+            for (m, x, y), cell in list(self.cells.items()):
+                if m == map_id and x0 <= x < x1 and y0 <= y < y1:
+                    yield from list(cell.items())
+
+    def in_radius(self, map_id: int, x: int, y: int, radius: float):
+        """Yields entity, position pairs within a euclidean radius"""
+        r = int(math.ceil(radius))
+        rr = radius * radius
+        for eid, position in self.in_rect(
+            map_id, x - r, y - r, x + r + 1, y + r + 1
+        ):
+            dx, dy = position.x - x, position.y - y
+            if dx * dx + dy * dy <= rr:
+                yield eid, position
@@ -212,7 +212,7 @@ class GameScreen(Screen):
                 break
             # render effects
             self.render_effects(tiles, position.map_id, cam_x, cam_y, x0, x1, y0, y1)
-            self.engine.effects.components.clear()
+            self.engine.effects.clear()
 
     def render_map(self, map_id, cam_x, cam_y, x0, x1, y0, y1):
         border(
@@ -10,9 +10,13 @@ from source.common import (direction_to_keypress, join, join_conditional,
 from source.ecs.components import (Collision, Information, Item, Movement,
                                    Render)
 from source.ecs.systems.system import System
+from source.goalmap import GoalMap
 from source.keyboard import keypress_to_direction, movement_keypresses
 from source.pathfind import pathfind
 
+# tiles around a unit whose chunks are kept loaded
+SIGHT = 10
+
 """
     def wander(self, entity):
         possible_spaces = []
@@ -29,6 +33,22 @@ from source.pathfind import pathfind
 """
 
 class AISystem(System):
+    def __init__(self, engine, logger=None) -> None:
+        super().__init__(engine, logger)
+        # goal maps shared by every ai. Each is rebuilt only when its goals
+        # or the blockers of the map change.
+        self.goal_maps = {
+            'player': GoalMap(),
+            'flee': GoalMap(inverted=True),
+        }
+
+    def follow(self, name, position, goals):
+        """Returns the next (dx, dy) step down the named goal map or None"""
+        tilemap = self.engine.tilemaps.find(position.map_id)
+        goal_map = self.goal_maps[name]
+        goal_map.update(position.map_id, tilemap, goals)
+        return goal_map.step(position.x, position.y)
+
     def update(self):
         units = join(
             self.engine.healths,
@@ -36,41 +56,20 @@ class AISystem(System):
             self.engine.infos,
             self.engine.ais
         )
-        # start = time.time()
-        tiles = {
-            (p.x, p.y)
-                for _, (p, v) in join(
-                    self.engine.positions,
-                    self.engine.visibilities
-                )
-                if v.level > 1
-        }
-        # print('join:', time.time() - start)
-        # start = time.time()
-        # tiles = {
-        #     (p.x, p.y)
-        #         for _, (p, v) in join_conditional(
-        #             self.engine.positions,
-        #             self.engine.visibilities,
-        #             conditions=((1, lambda x: x.level > 1),)
-        #         )
-        # }
-        # print('cond:', time.time() - start)
+        tilemap = self.engine.tilemaps.find(self.engine.world.id)
         # iterate all computers
         for eid, (h, p, i, ai) in units:
-            player_visible = (p.x, p.y) in tiles
+            # keep the tile entities within sight of each unit loaded
+            self.engine.map_system.request_around(p.map_id, p.x, p.y, SIGHT)
+            player_visible = (
+                p.map_id == self.engine.world.id
+                and tilemap.visibility[p.y, p.x] > 1
+            )
+            # attacking units follow the shared player goal map, which is
+            # rebuilt whenever the player moves
             if player_visible and ai.behavior != 'attack':
                 ai.behavior = 'attack'
                 # self.engine.logger.add(f"{i.name}({eid}) saw player and is moving to attack")
-            elif player_visible and ai.behavior == 'attack':
-                ai.path = None # overwrite path so it will be calculated on next run
-                # self.engine.logger.add(f"{i.name}({eid}) lost player during chase")
-            # player is not seen and monster was attacking but finished reaching path
-            # if not v and ai.behavior == 'attack':
-            #     # self.engine.logger.add(f"goblin moving towards {ai.path}")
-            #     if not ai.path:
-            #         # self.engine.logger.add(f"{i.name}({eid})({eid}) stopped attacking")
-            #         ai.behavior = 'wander'
         # self.engine.screen.logs_panel.render()
         # self.engine.screen.render()
 
@@ -91,24 +90,16 @@ class AISystem(System):
                 # self.engine.logger.add(f"{info.name}({entity.id}) wanders around")
                 movement = Movement.random_move()
             elif ai.behavior == 'attack':
-                if ai.path:
-                    path = ai.path.pop(0)
-                    # self.engine.logger.add(f"{ai.path}, {path}")
-                    movement = Movement(path[0] - position.x, path[1] - position.y)
-                    # self.engine.logger.add(f"{info.name}({entity.id}) saw player and is moving to attack on last path")
+                target = self.engine.positions.find(self.engine.player)
+                step = self.follow('player', position, [(target.x, target.y)])
+                if step:
+                    movement = Movement(*step)
                 else:
-                    target_position = self.engine.positions.find(self.engine.player)
-                    # s = time.time()
-                    ai.path = pathfind(self.engine, position, target_position)
-                    # print(time.time() - s)
-                    if not ai.path:
-                        ai.behavior = 'wander'
-                        # movement = Movement.random_move()
-                        # self.engine.logger.add(f"{info.name}({entity.id}) was attacking player but lost sight of him")
-                    # else:
-                    #     path = ai.path.pop(0)
-                    #     movement = Movement(path[0] - position.x, path[1] - position.y)
-                        # self.engine.logger.add(f"{info.name}({entity.id}) saw player and is moving to attack on recalc path")
+                    ai.behavior = 'wander'
+            elif ai.behavior == 'flee':
+                target = self.engine.positions.find(self.engine.player)
+                step = self.follow('flee', position, [(target.x, target.y)])
+                movement = Movement(*step) if step else Movement.random_move()
             elif ai.behavior == 'wait':
                 movement = Movement(0, 0)
         return direction_to_keypress(movement.x, movement.y)
@@ -25,17 +25,13 @@ class CommandSystem(System):
 
     def pick_item(self, entity):
         position = self.engine.positions.find(entity)
-        g = join(
-            self.engine.items,
-            self.engine.positions,
-            self.engine.infos
-        )
+        g = self.engine.positions.at(position.map_id, position.x, position.y)
         items = []
         items_picked_up = []
-        for eid, (item, item_position, info) in g:
-            if (position.x, position.y) == (item_position.x, item_position.y):
+        for eid, _ in g:
+            if self.engine.items.find(eid):
                 items_picked_up.append(eid)
-                items.append(info.name)
+                items.append(self.engine.infos.find(eid).name)
         if not items_picked_up:
             return False
         for item_id in items_picked_up:
@@ -5,6 +5,7 @@ from .command_move import *
 __all__ = [
     'open_door',
     'close_door',
+    'set_door',
     'go_up',
     'go_down'
     'melee_attack',
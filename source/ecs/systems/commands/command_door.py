@@ -9,25 +9,44 @@ from source.ecs.components import Movement
 from source.keyboard import keypress_to_direction
 
 
+def set_door(engine, x, y, opened):
+    """Opens or closes the door tile at x, y of the current map"""
+    tilemap = engine.tilemaps.find(engine.world.id)
+    name = 'opened door' if opened else 'closed door'
+    render = random.choice(engine.renders.shared[name])
+    tilemap.set_tile(x, y, render.char, render.color, name, blocks=not opened)
+    # keep the door entity in sync with the tile arrays
+    for door, _ in engine.positions.at(engine.world.id, x, y):
+        openable = engine.openables.find(door)
+        if openable:
+            openable.opened = opened
+            engine.infos.add(door, engine.infos.shared[name])
+
+def find_doors(engine, position, opened):
+    """Returns doors surrounding a position keyed by their direction"""
+    doors = {}
+    # door entities exist only in loaded chunks
+    engine.map_system.request_around(
+        position.map_id, position.x, position.y, 1
+    )
+    for x, y in squares(exclude_center=True):
+        for door, coordinate in engine.positions.at(
+            position.map_id,
+            position.x + x,
+            position.y + y
+        ):
+            openable = engine.openables.find(door)
+            if openable and openable.opened == opened:
+                doors[(x, y)] = (door, openable, coordinate)
+    return doors
+
 def open_door(engine, entity):
     """TODO: render log message when opening a door of multiple doors"""
     position = engine.positions.find(entity)
     turn_over = False
-    # get all coordinates surrounding current entity position
-    coordinates = [
-        (position.x + x, position.y + y)
-            for x, y in squares(exclude_center=True)
-    ]
-    g = join(engine.openables, engine.positions, engine.renders, engine.infos)
-    doors = {}
-    # compare coordinates against entities that can be opened that have a
-    # a position x, y value in the coordinates list.
-    for openable_id, (openable, coordinate, render, info) in g:
-        valid_coordinate = (coordinate.x, coordinate.y) in coordinates
-        if valid_coordinate and not openable.opened:
-            x = coordinate.x - position.x
-            y = coordinate.y - position.y
-            doors[(x, y)] = (openable_id, openable, coordinate, render, info)
+    # compare coordinates surrounding the current entity position against
+    # entities that can be opened.
+    doors = find_doors(engine, position, opened=False)
     door_to_open = None
     if not doors:
         engine.logger.add(f"No closed doors to open.")
@@ -50,16 +69,8 @@ def open_door(engine, entity):
         else:
             door_to_open = door
     if door_to_open:
-        door, openable, position, render, info = door_to_open
-        openable.opened = True
-        position.blocks = False
-        # replace info
-        engine.infos.add(door, engine.infos.shared['opened door'])
-        # replace the render
-        engine.renders.add(
-            door,
-            random.choice(engine.renders.shared['opened door'])
-        )
+        door, openable, position = door_to_open
+        set_door(engine, position.x, position.y, opened=True)
         engine.logger.add(f"You open the door.")
         turn_over = True
     return turn_over
@@ -68,20 +79,9 @@ def close_door(engine, entity):
     """TODO: cannot close door when unit is standing on the cell"""
     position = engine.positions.find(entity)
     turn_over = False
-    # get all coordinates surrounding current entity position
-    coordinates = [
-        (position.x + x, position.y + y)
-            for x, y in squares(exclude_center=True)
-    ]
-    g = join(engine.openables, engine.positions, engine.renders)
-    doors = {}
-    # compare coordinates against entities that can be closed that have a
-    # a position x, y value in the coordinates list.
-    for closeable_id, (closeable, coordinate, render) in g:
-        if (coordinate.x, coordinate.y) in coordinates and closeable.opened:
-            x = coordinate.x - position.x
-            y = coordinate.y - position.y
-            doors[(x, y)] = (closeable_id, closeable, coordinate, render)
+    # compare coordinates surrounding the current entity position against
+    # entities that can be closed.
+    doors = find_doors(engine, position, opened=True)
     door_to_close = None
     if not doors:
         engine.logger.add(f"No opened door to close.")
@@ -102,13 +102,8 @@ def close_door(engine, entity):
         else:
             door_to_close = door
     if door_to_close:
-        door, closeable, position, render = door_to_close
-        closeable.opened = False
-        position.blocks = True
-        engine.renders.add(
-            door, 
-            random.choice(engine.renders.shared['closed wooden door'])
-        )
+        door, closeable, position = door_to_close
+        set_door(engine, position.x, position.y, opened=False)
         engine.logger.add(f"You close the door.")
         turn_over = True
     return turn_over
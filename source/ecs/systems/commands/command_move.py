@@ -7,16 +7,15 @@ import textwrap
 from source.common import join, join_drop_key
 from source.ecs.components import (Collision, Destroyed, MeleeHitEffect,
                                    Position)
-from source.ecs.systems.commands import open_door
+from source.ecs.systems.commands import set_door
 
 
 # helper functions
 def check_for_floor_items(engine, position):
     items = []
-    query = join(engine.items, engine.positions, engine.infos)
-    for eid, (_, tile, info) in query:
-        if position == tile:
-            items.append(info.name)
+    for eid, _ in engine.positions.at(position.map_id, position.x, position.y):
+        if engine.items.find(eid):
+            items.append(engine.infos.find(eid).name)
     if items:
         if len(items) > 2:
             all_but_last_items = ', a'.join(items[:len(items)-1])
@@ -29,11 +28,15 @@ def check_for_floor_items(engine, position):
 
 def check_tile_info(engine, position):
     describeables = list()
-    for p, i in join_drop_key(engine.positions, engine.infos):
-        if (position.x == p.x and
-            position.y == p.y and
-            i.name is not 'floor'
-        ):
+    tilemap = engine.tilemaps.find(engine.world.id)
+    name = tilemap.name(position.x, position.y)
+    if name and name != 'floor':
+        describeables.append(name)
+    for eid, p in engine.positions.at(engine.world.id, position.x, position.y):
+        if engine.tiles.find(eid):
+            continue
+        i = engine.infos.find(eid)
+        if i:
             describeables.append(i.name)
     if describeables:
         engine.logger.add(', '.join(describeables))
@@ -52,47 +55,29 @@ def move(engine, entity, movement) -> bool:
     if not (0 <= x < tilemap.width and 0 <= y < tilemap.height):
         return collide(engine, entity, -1)
 
-    # check unit collisions for specific movment types
+    # check environment and unit collisions for specific movment types
     if position.movement_type == Position.MovementType.GROUND:
+        if tilemap.blocks[y, x]:
+            # if tile is a closed door, open door and move positions
+            if tilemap.openable[y, x]:
+                set_door(engine, x, y, opened=True)
+                position.x += movement.x
+                position.y += movement.y
+                engine.logger.add("You open the door and enter the doorway")
+                return True
+            if entity == engine.player:
+                engine.logger.add(f'You walk into a {tilemap.name(x, y)}.')
+            return False
         # check unit collisions
-        for entity_id, entity_position in engine.positions:
-            if (entity_position.x == x and
-                entity_position.y == y and
-                entity_position.map_id == engine.world.id and 
-                entity_id != entity and
-                entity_position.blocks is True
-            ):
-                # if door is an unlocked door, open door and move positions
-                entity_openable = engine.openables.find(entity_id)
-                if entity_openable:
-                    # replace info
-                    engine.infos.add(
-                        entity_id,
-                        engine.infos.shared['opened door']
-                    )
-                    engine.renders.add(
-                        entity_id,
-                        random.choice(engine.renders.shared['opened door'])
-                    )
-                    entity_openable = True
-                    entity_position.blocks = False
-                    position.x += movement.x
-                    position.y += movement.y
-                    engine.logger.add(
-                        "You open the door and enter the doorway"
-                    )
-                    return True
+        for entity_id, entity_position in engine.positions.at(
+            engine.world.id, x, y
+        ):
+            if entity_id != entity and entity_position.blocks is True:
                 return collide(engine, entity, entity_id)
 
     if position.movement_type == Position.MovementType.VISIBLE:
-        g = join_drop_key(engine.positions, engine.visibilities)
-        for entity_position, visible in g:
-            if (entity_position.x == x and
-                entity_position.y == y and
-                entity_position.map_id == engine.world.id and
-                visible.level < 2
-            ):
-                return False
+        if tilemap.visibility[y, x] < 2:
+            return False
 
     # no collisions. move to the new position
     position.x += movement.x
@@ -5,6 +5,7 @@
 import random
 
 from source.common import join, join_drop_key, squares
+from source.ecs.components import Position
 from source.maps import MapType
 
 
@@ -13,16 +14,7 @@ def go_up(engine, entity):
     went_up = False
     position = engine.positions.find(entity)
     tilemap = engine.tilemaps.find(position.map_id)
-    g = join_drop_key(engine.tiles, engine.positions, engine.renders)
-    for _, tile_position, render in g:
-        if (tile_position.map_id == engine.world.id
-            and tile_position == position
-            and render.char == '<'):
-            break
-        else:
-            tile_position = None
-        
-    if not tile_position:
+    if tilemap.char(position.x, position.y) != '<':
         engine.logger.add('Could not go up since not on stairs')
         return went_up
 
@@ -33,16 +25,13 @@ def go_up(engine, entity):
     else:
         engine.logger.add('no parent node.')
 
-    for _, (_, tile_position, render) in join(
-        engine.tiles,
-        engine.positions,
-        engine.renders
-    ):
-        if (tile_position.map_id == engine.world.id
-            and render.char == '>'):
-            break
-    
-    position = tile_position.copy(
+    tilemap = engine.tilemaps.find(engine.world.id)
+    x, y = tilemap.find('>')
+
+    position = Position(
+        x,
+        y,
+        map_id=engine.world.id,
         movement_type=position.movement_type,
         blocks=position.blocks
     )
@@ -56,18 +45,7 @@ def go_down(engine, entity):
     position = engine.positions.find(entity)
     tilemap = engine.tilemaps.find(eid=position.map_id)
     
-    # should only return 1 tile/render pair
-    g = join_drop_key(engine.tiles, engine.positions, engine.renders)
-    for _, tile_position, render in g:
-        # tile from current map / same map position as entity / is down stairs
-        if (tile_position.map_id == engine.world.id
-            and tile_position == position
-            and render.char == '>'):
-            break
-        else:
-            tile_position = None
-    
-    if not tile_position:
+    if tilemap.char(position.x, position.y) != '>':
         engine.logger.add('Could not go down since not on stairs')
         return went_down
     
@@ -82,25 +60,24 @@ def go_down(engine, entity):
     else:
         engine.map_system.regenerate_map(old_id)
 
-    for _, (_, tile_position, render) in join(
-        engine.tiles,
-        engine.positions,
-        engine.renders
-    ):
-        # tile from current map / is up stairs
-        if (tile_position.map_id == engine.world.id
-            and render.char == '<'):
-            break
-
-    if not tile_position:
+    # up stairs on the child map
+    tilemap = engine.tilemaps.find(engine.world.id)
+    stairs = tilemap.find('<')
+    if not stairs:
         engine.logger.add('Could not go down since child map has no up stairs')
         return went_down
-    
+
     # send entity to the position of stairs on child map
-    position = tile_position.copy(
+    x, y = stairs
+    position = Position(
+        x,
+        y,
+        map_id=engine.world.id,
         movement_type=position.movement_type,
         blocks=position.blocks
     )
     engine.positions.remove(engine.player)
     engine.positions.add(engine.player, position)
+    # start building the next level while this one is played
+    engine.map_system.prefetch()
     return True
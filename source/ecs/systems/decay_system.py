@@ -1,6 +1,7 @@
 # decay_system
 
 from source.common import join
+from source.ecs.components import Destroyed
 
 from .system import System
 
@@ -16,4 +17,5 @@ class DecaySystem(System):
         for entity in remove:
             info = self.engine.infos.find(entity)
             self.engine.logger.add(f"{info.name} decays")
-            self.engine.grave_system.process(entity)
+            self.engine.destroyed.add(entity, Destroyed())
+        self.engine.grave_system.process()
@@ -1,18 +1,28 @@
 # energy_system
 
+from source.ecs.managers.scheduler import ROUND
+
 from .system import System
 
 
 class EnergySystem(System):
-    def process(self):
-        for eid, energy in self.engine.energies:
-            energy.amount += energy.gain
-            if energy.amount >= energy.full:
-                energy.ready = True
-    def update(self, entity):
-        energy = self.engine.energies(entity)
-        turns = 0
-        while energy.amount >= energy.full:
-            energy.amount -= energy.full
-            turns += 1
-        return turns
+    def stalled(self, entity) -> bool:
+        """True for entities that gain no energy, e.g. while paralysed"""
+        turn = self.engine.turns.find(entity)
+        return turn is not None and turn.tick_amount <= 0
+
+    def delay(self, entity) -> int:
+        """
+            Ticks until the entity acts again. A Turn component gains
+            tick_amount energy per tick and spends full_amount per action.
+            Energy left over is kept so fractional speeds even out. Entities
+            without one act once per round and stalled ones are checked
+            again next round.
+        """
+        turn = self.engine.turns.find(entity)
+        if not turn or turn.tick_amount <= 0:
+            return ROUND
+        needed = turn.full_amount - turn.curr_amount
+        ticks = max(1, -(-needed // turn.tick_amount))
+        turn.curr_amount += ticks * turn.tick_amount - turn.full_amount
+        return ticks
@@ -19,19 +19,14 @@ class GraveSystem(System):
 
     def color_environment(self, entity):
         position = self.engine.positions.find(entity)
-        tiles = join(
-            self.engine.tiles,
-            self.engine.positions, 
-            self.engine.renders,
-            self.engine.infos
-        )
+        tilemap = self.engine.tilemaps.find(position.map_id)
+        x, y = position.x, position.y
+        # doors and stairs keep their look
+        if not tilemap or tilemap.openable[y, x] or tilemap.char(x, y) in '<>':
+            return
         environment = 'bloodied floor'
-        for entity, (_, tile, render, info) in tiles:
-            if position.x == tile.x and position.y == tile.y:
-                render = random.choice(self.engine.renders.shared[environment])
-                self.engine.renders.add(entity, render)
-                info = self.engine.infos.shared[environment]
-                self.engine.infos.add(entity, info)
+        render = random.choice(self.engine.renders.shared[environment])
+        tilemap.set_tile(x, y, render.char, render.color, environment)
 
     def drop_body(self, entity):
         # get entity info
@@ -41,7 +36,7 @@ class GraveSystem(System):
 
         # build entity corpse
         name = f"{info.name} corpse"
-        body = self.engine.entities.create()
+        body = self.engine.entities.create('items')
         self.engine.items.add(body, Item('food'))
         for r in self.engine.renders.shared[name]:
             if r.color == render.color:
@@ -72,11 +67,10 @@ class GraveSystem(System):
             self.engine.positions.add(item, item_position)
 
     def remove_from_inventory(self, entity):
-        inventory = None
         for eid, inventory in self.engine.inventories:
-            if entity.id in inventory.items:
+            if entity in inventory.items:
+                inventory.items.remove(entity)
                 break
-        inventory.items.remove(entity.id)
 
     def remove_entity(self, entity):
         if entity == self.engine.player:
@@ -94,6 +88,6 @@ class GraveSystem(System):
 
     def process(self):
         while self.engine.destroyed.components:
-            key, _ = self.engine.destroyed.components.popitem()
+            key, _ = self.engine.destroyed.popitem()
             self.remove_entity(key)
-        self.engine.destroyed.components.clear()
+        self.engine.destroyed.clear()
@@ -5,86 +5,218 @@
 Map system is not called every turn but only on map change events
 
 TileMap to Tiles:
-    Each tilemap is assigned an entity id. The tilemap entity id is used as a
-    key in each tile of the map. Each tile is referenced in an N number of
-    components which relate to the tile. They are found using the tile entity 
-    id.
-            +---------+    +------+    +-------------+
-            | TileMap | -> | Tile | -> | Component 1 |
-            +---------+    +------+    +-------------+
-                            :                ...
-                            :          +-------------+
-                            + - - - -> | Component N |
-                                       +-------------+
-
-Tiles:
+    Each tilemap is assigned an entity id. The tiles of the map are not
+    entities but cells in the numpy arrays held by the TileMap component
+    (chars, blocks, colors, visibility, openable, names). Only tiles that
+    need to be addressed by other systems (doors, stairs) also get an entity
+    so they can be found through the component managers.
+            +---------+    +--------------+
+            | TileMap | -> | tile arrays  |  every tile
+            +---------+    +--------------+
+                 :         +------+    +-------------+
+                 + - - - > | Tile | -> | Component N |  doors, stairs
+                           +------+    +-------------+
+
+Tile entities:
+    Door and stair entities only exist while their chunk is loaded. Chunks
+    are requested by the camera window, units and commands (see
+    source.chunks) and tile entities keep their id while the map is live.
     TileID        -> instance (int)
     Tile          -> singleton (maybe enum(int))
     Position      -> instance
-    Visibility    -> instance
-    Render        -> instance
     Information   -> shared
     Openable      -> instance
+
+Level seeds:
+    Generated caves are seeded from the world seed and the id of their
+    parent map. As soon as a map without a child is entered its child cave
+    is built ahead of time in a spawned worker process, and adopted when the player
+    takes the down stairs. Building it on demand with the same seed gives
+    the same cave.
+
+Saving:
+    Maps left behind are encoded with source.mapfile and kept in a least
+    recently used cache of levels. Levels evicted from the cache are
+    appended to a single memory mapped level store (source.levelstore) by a
+    background thread. Loading a level not in the cache waits only if that
+    level is still being written. Map files and old pickle saves are still
+    read if a level is in neither.
 """
 
-import pickle
+import multiprocessing
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
 
+from source import mapfile
+from source.chunks import ChunkTracker, chunk_bounds, chunk_of
 from source.common import join
 from source.description import env_char_to_name
 from source.ecs.components import (Information, Item, Openable, Position,
                                    Render, Tile, TileMap, Visibility)
-from source.generate import (add_boundry_to_matrix, array_to_matrix,
-                             build_cave, cell_auto, dimensions, flood_fill,
-                             generate_poisson_array, matrix,
-                             replace_cell_with_stairs, string)
+from source.generate import (array_to_matrix, build_cave, dimensions,
+                             generate_poisson_array, matrix, seeded_cave,
+                             string)
 from source.graph import DungeonNode, WorldGraph
+from source.levelstore import LevelStore
 
 from .system import System
 
 
+STORE_PATH = 'saves/levels.store'
+DOORS = '+/'
+# tiles that are also entities while their chunk is loaded
+TILE_ENTITIES = DOORS + '<>'
+
+
+def map_path(map_id):
+    return f'saves/map_{map_id}.map'
+
+
 class MapSystem(System):
+    cave_size = (58, 17)
+
+    def __init__(self, engine, logger=None) -> None:
+        super().__init__(engine, logger)
+        self.seed = random.getrandbits(32)
+        # worker pool is started on first use. pending holds the seed and
+        # future of the cave being built ahead of time.
+        self.executor = None
+        self.pending = None
+        # levels evicted from the cache are appended to the level store
+        self.store = LevelStore(STORE_PATH, new=True)
+        self.writer = mapfile.MapWriter(self.store.save)
+        # recently left levels kept in memory. See level_stats
+        self.levels = mapfile.LevelCache()
+        # chunks of the current map and the tile entities of loaded chunks
+        self.chunks = None
+        self.chunk_tiles = {}
+        self.tile_ids = {}
+
+    def level_seed(self, parent_id):
+        """Seed of the cave generated below the parent map"""
+        parent_id = -1 if parent_id is None else parent_id
+        return (self.seed * 1000003 + parent_id + 1) % 2 ** 32
+
+    def prefetch(self):
+        """Starts building the child cave of the current map in a worker"""
+        node = self.engine.world.node
+        if node.child_id is not None:
+            return
+        seed = self.level_seed(node.entity_id)
+        if self.pending:
+            if self.pending[0] == seed:
+                return
+            self.pending[1].cancel()
+            self.pending = None
+        try:
+            if not self.executor:
+                # forking would copy the locks the MapWriter thread may
+                # hold and deadlock the worker. Spawned workers start clean
+                self.executor = ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            future = self.executor.submit(seeded_cave, seed, *self.cave_size)
+        except (OSError, RuntimeError, NotImplementedError):
+            # no process support. Caves are built when needed instead
+            self.executor = None
+            return
+        self.pending = seed, future
+
+    def adopt(self, seed) -> list:
+        """Returns the cave built ahead of time for seed or builds it now"""
+        if self.pending and self.pending[0] == seed:
+            future = self.pending[1]
+            self.pending = None
+            try:
+                return future.result()
+            except (OSError, BrokenProcessPool):
+                self.executor = None
+        return seeded_cave(seed, *self.cave_size)
+
+    def level_stats(self) -> dict:
+        """Hits, misses, evictions and bytes held by the level cache"""
+        return self.levels.stats()
+
+    def shutdown(self):
+        """Waits for maps still being saved and stops the worker pool"""
+        self.writer.flush()
+        self.store.close()
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.pending = None
+
     def save_map(self, map_id):
         tilemap = self.engine.tilemaps.find(eid=map_id)
-        tiles = {}
+        entities = []
         for eid, tile in self.engine.tiles:
-            group = [tile]
-            group.append(self.engine.positions.find(eid=eid))
-            group.append(self.engine.renders.find(eid=eid))
-            group.append(self.engine.infos.find(eid=eid))
-            group.append(self.engine.visibilities.find(eid=eid))
+            position = self.engine.positions.find(eid=eid)
+            info = self.engine.infos.find(eid=eid)
             openable = self.engine.openables.find(eid=eid)
-            if openable:
-                group.append(openable)
-            tiles[eid] = group
-        with open(f'saves/map_{map_id}.pickle', 'wb') as f:
-            pickle.dump(tilemap, f, pickle.HIGHEST_PROTOCOL)
-            pickle.dump(tiles, f, pickle.HIGHEST_PROTOCOL)
-    
+            opened = openable.opened if openable else None
+            entities.append((eid, position.x, position.y, info.name, opened))
+        # the encoded bytes are a snapshot so the map can change or be
+        # deleted while it is cached or saved. Only levels pushed out of the
+        # cache are written to disk.
+        data = mapfile.encode(tilemap, entities)
+        for evicted_id, evicted in self.levels.put(map_id, data):
+            node = self.engine.world[evicted_id]
+            self.writer.save(
+                evicted_id, evicted, node.parent_id, node.child_id
+            )
+
     def load_map(self, map_id):
-        with open(f'saves/map_{map_id}.pickle', 'rb') as f:
-            tilemap = pickle.load(f)
-            tileinfo = pickle.load(f)
+        data = self.levels.get(map_id)
+        self.writer.wait(map_id)
+        if data is not None:
+            tilemap, entities = mapfile.decode(data)
+        elif map_id in self.store:
+            tilemap, entities = self.store.load(map_id)
+        else:
+            path = map_path(map_id)
+            legacy = f'saves/map_{map_id}.pickle'
+            if not os.path.exists(path) and os.path.exists(legacy):
+                mapfile.convert(legacy, path)
+            tilemap, entities = mapfile.load(path)
         self.engine.tilemaps.add(map_id, tilemap)
-        for tile, components in tileinfo.items():
-            for component in components:
-                getattr(self.engine, component.manager).add(tile, component)
+        self.track(map_id, tilemap)
+        # saved entities belong to chunks that were loaded when leaving.
+        # Their ids were freed by delete_map so they get new ones
+        for _, x, y, info, opened in entities:
+            eid = self.engine.entities.create('tiles')
+            self.add_tile_entity(map_id, eid, x, y, info, opened)
+            chunk = chunk_of(x, y, self.chunks.size)
+            self.chunks.loaded.add(chunk)
+            self.chunk_tiles.setdefault(chunk, []).append(eid)
+            self.tile_ids[(x, y)] = eid
 
     def delete_map(self, map_id):
+        if self.chunks:
+            self.chunks.clear()
+            self.chunks = None
         # clear dictionaries to improve speedup
         self.engine.tilemaps.remove(eid=map_id)
         for eid, tile in self.engine.tiles:
             self.engine.positions.remove(eid=eid)
-            self.engine.renders.remove(eid=eid)
             self.engine.infos.remove(eid=eid)
-        self.engine.visibilities.components.clear()
-        self.engine.openables.components.clear()
-        self.engine.tiles.components.clear()
+        self.engine.openables.clear()
+        self.engine.tiles.clear()
+        # door and stair ids are kept while the map is live, including
+        # those of unloaded chunks
+        for tile_id in self.tile_ids.values():
+            self.engine.entities.remove(tile_id)
+        self.chunk_tiles = {}
+        self.tile_ids = {}
 
-    def build_map(self, map_type, map_string) -> (object, object):
+    def build_map(self, map_type, map_string, seed=None) -> (object, object):
         """
             Width x Height is determined by map_string dimensions if it exists.
-            Otherwise, a random map is generated and used instead.
+            Otherwise, a random map is generated from seed and used instead.
 
             Currently, predetermined levels are town maps only.
             Empty map strings leads to the construction of cave maps.
@@ -107,82 +239,120 @@ class MapSystem(System):
                         if dungeon[y][x] == '.':
                             dungeon[y][x] = matrix[y][x]
         else:
-            w, h = 58, 17
-            tilemap = TileMap(w, h, map_type)
-            random_array = generate_poisson_array(w, h)
-            no_stairs = array_to_matrix(
-                random_array,
-                w, h,
-                filter=lambda x: x < 3 or x >= 8
-            )
-            no_stairs = add_boundry_to_matrix(no_stairs, bounds=1)
-            for i in range(4):
-                no_stairs = cell_auto(no_stairs, deadlimit=5+(i-5))
-            no_stairs = flood_fill(no_stairs)
-            dungeon = replace_cell_with_stairs(no_stairs)
+            tilemap = TileMap(*self.cave_size, map_type)
+            dungeon = self.adopt(seed)
             print(string(dungeon))
         return tilemap, dungeon
 
-    def convert_dungeon_to_ecs(self, map_id, map_type, dungeon):
-        # add tiles and tile specific attribute components
+    def convert_dungeon_to_ecs(self, map_id, map_type, dungeon, seed=None):
+        # fill the tile arrays of the tilemap from the dungeon characters
+        rng = np.random if seed is None else np.random.RandomState(seed)
+        tilemap = self.engine.tilemaps.find(map_id)
         maptype = self.engine.tilemaptypes.shared[map_type]
         environment = ".#+/'"
         blocked = environment[1:3]
         doors = environment[2:4]
-        for y, row in enumerate(dungeon):
-            for x, char in enumerate(row):
-                if char == ' ':
-                    continue
-                # shared components
-                tile_id = self.engine.entities.create()
-                # tile
-                self.engine.tiles.add(tile_id, Tile())
-                # visibility
-                self.engine.visibilities.add(tile_id, Visibility())
-                # position
-                self.engine.positions.add(tile_id, Position(
-                    x, y,
-                    map_id=map_id,
-                    movement_type=Position.MovementType.NONE,
-                    blocks=char in blocked
-                ))
-                # info
-                info = self.engine.infos.shared[env_char_to_name[char]]
-                self.engine.infos.add(tile_id, info)
-                # render
-                if char in ".'":
-                    colors = maptype.floors
-                elif char == '#':
-                    colors = maptype.walls
-                elif char in doors:
-                    colors = maptype.doors
-                else:
-                    colors = maptype.stairs
-                render = Render(char, random.choice(colors))
-                self.engine.renders.add(tile_id, render)
-                # openable
-                if char in doors:
-                    # This is a unique case (possibly more in the future) in
-                    # that this tile creates a map entity with Openable.
-                    openable = Openable(opened=char=='/')
-                    self.engine.openables.add(tile_id, openable)
-                # elif c == "'" and random.randint(0, 3) == 0:
-                #     # This is a unique case (possibly more in the future) in
-                #     # that this tile creates both a map and item entity:
-                #     flower = self.engine.entities.create()
-                #     self.engine.items.add(flower, Item('crafting'))
-                #     self.engine.positions.add(flower, Position(
-                #         x, y,
-                #         map_id=map_id,
-                #         movement_type=Position.MovementType.NONE,
-                #         blocks=False
-                #     ))
-                #     r = random.choice(self.engine.renders.shared['flower'])
-                #     self.engine.renders.add(flower, r)
-                #     self.engine.infos.add(
-                #         flower,
-                #         self.engine.infos.shared['flower']
-                #     )
+        width, height = tilemap.width, tilemap.height
+        chars = tilemap.chars
+        for y, row in enumerate(dungeon[:height]):
+            row = list(row[:width])
+            chars[y, :len(row)] = row
+        tilemap.blocks[:] = np.isin(chars, list(blocked)) | (chars == ' ')
+        tilemap.openable[:] = np.isin(chars, list(doors))
+        tilemap.changed()
+        # names
+        for char, name in env_char_to_name.items():
+            tilemap.names[chars == char] = tilemap.label_index(name)
+        # colors are picked at random from the map type color lists
+        for tile_chars, colors in (
+            (".'", maptype.floors),
+            ('#', maptype.walls),
+            (doors, maptype.doors),
+            ('<>', maptype.stairs)
+        ):
+            cells = np.isin(chars, list(tile_chars))
+            indices = np.array(
+                [tilemap.color_index(color) for color in colors],
+                dtype=np.uint8
+            )
+            tilemap.colors[cells] = indices[
+                rng.randint(len(colors), size=int(cells.sum()))
+            ]
+        # doors and stairs near the camera and units get entities
+        self.track(map_id, tilemap)
+
+    def track(self, map_id, tilemap):
+        """Starts streaming the tile entities of the map by chunks"""
+        self.chunks = ChunkTracker(map_id, tilemap.width, tilemap.height)
+        self.chunks.subscribe(self.stream_chunk)
+        self.chunk_tiles = {}
+        self.tile_ids = {}
+
+    def request(self, map_id, x0, x1, y0, y1):
+        """Loads the chunks of the map overlapping the window"""
+        if self.chunks and self.chunks.map_id == map_id:
+            self.chunks.request(x0, x1, y0, y1)
+
+    def request_around(self, map_id, x, y, radius):
+        """Loads the chunks of the map within radius tiles of x, y"""
+        if self.chunks and self.chunks.map_id == map_id:
+            self.chunks.request_around(x, y, radius)
+
+    def stream(self, map_id, x0, x1, y0, y1):
+        """
+            Called once per frame with the camera window. Loads its chunks
+            and unloads chunks nothing asked for since the last frame.
+        """
+        if self.chunks and self.chunks.map_id == map_id:
+            self.chunks.request(x0, x1, y0, y1)
+            self.chunks.sweep()
+
+    def stream_chunk(self, event):
+        """Creates or removes the door and stair entities of a chunk"""
+        if not event.loaded:
+            for tile_id in self.chunk_tiles.pop(event.chunk, []):
+                self.remove_tile_entity(tile_id)
+            return
+        tilemap = self.engine.tilemaps.find(event.map_id)
+        x0, x1, y0, y1 = chunk_bounds(event.chunk, self.chunks.size)
+        window = tilemap.chars[y0:y1, x0:x1]
+        tiles = self.chunk_tiles.setdefault(event.chunk, [])
+        for y, x in np.argwhere(np.isin(window, list(TILE_ENTITIES))).tolist():
+            x, y = x + x0, y + y0
+            # entities keep their id when their chunk is loaded again
+            tile_id = self.tile_ids.get((x, y))
+            if tile_id is None:
+                tile_id = self.tile_ids[(x, y)] = \
+                    self.engine.entities.create('tiles')
+            char = tilemap.char(x, y)
+            opened = char == '/' if char in DOORS else None
+            self.add_tile_entity(
+                event.map_id, tile_id, x, y, env_char_to_name[char], opened
+            )
+            tiles.append(tile_id)
+
+    def add_tile_entity(self, map_id, tile_id, x, y, name, opened=None):
+        self.engine.tiles.add(tile_id, Tile())
+        self.engine.positions.add(tile_id, Position(
+            x, y,
+            map_id=map_id,
+            movement_type=Position.MovementType.NONE,
+            blocks=False
+        ))
+        self.engine.infos.add(tile_id, self.engine.infos.shared[name])
+        if opened is not None:
+            # This is a unique case (possibly more in the future) in
+            # that this tile creates a map entity with Openable.
+            self.engine.openables.add(tile_id, Openable(opened=opened))
+
+    def remove_tile_entity(self, tile_id):
+        for manager in (
+            self.engine.tiles,
+            self.engine.positions,
+            self.engine.infos,
+            self.engine.openables
+        ):
+            manager.remove(tile_id)
 
     def add_map_to_world(self, map_id):
         # create world graph if ran the first time
@@ -202,15 +372,19 @@ class MapSystem(System):
             })
 
     def generate_map(self, map_type, map_string=None):
+        seed = None
+        if not map_string:
+            parent_id = self.engine.world.id if self.engine.world else None
+            seed = self.level_seed(parent_id)
         # clear dictionaries to improve speedup
         if self.engine.world:
             self.save_map(self.engine.world.id)
             self.delete_map(self.engine.world.id)
-        map_id = self.engine.entities.create()
+        map_id = self.engine.entities.create('maps')
         # get map info component and map geography
-        tilemapinfo, dungeon = self.build_map(map_type, map_string)
+        tilemapinfo, dungeon = self.build_map(map_type, map_string, seed)
         self.engine.tilemaps.add(map_id, tilemapinfo)
-        self.convert_dungeon_to_ecs(map_id, map_type, dungeon)
+        self.convert_dungeon_to_ecs(map_id, map_type, dungeon, seed)
         self.add_map_to_world(map_id)
 
     def regenerate_map(self, map_id):
@@ -7,11 +7,16 @@ import random
 from source.common import join, join_drop_key
 from source.ecs import (AI, Armor, Cursor, Decay, Equipment, HealEffect,
                         Health, Information, Input, Inventory, Item, Mana,
-                        Position, Render, Spell, Spellbook, Weapon)
+                        Position, Render, Spell, Spellbook, Turn, Weapon)
 from source.maps import MapType
 
 from .system import System
 
+# energy gained per tick. A Turn spends 1000 per action, so 100 acts once a
+# round
+PLAYER_SPEED = 100
+GOBLIN_SPEED = 100
+
 
 class SpawnSystem(System):
     def __init__(self, engine, logger=None) -> None:
@@ -21,50 +26,34 @@ class SpawnSystem(System):
         self.current_tick = self.respawn_rate
 
     def find_valid_spaces(self) -> list:
-        tiles = {
-            (position.x, position.y)
-                for _, position, visible in join_drop_key(
-                    self.engine.tiles,
-                    self.engine.positions,
-                    self.engine.visibilities
-                )
-                if visible.level < 2 and not position.blocks
-        }
+        tilemap = self.engine.tilemaps.find(self.engine.world.id)
+        tiles = set(
+            tilemap.coordinates(tilemap.walkable() & (tilemap.visibility < 2))
+        )
         units = {
             (position.x, position.y)
-                for _, position in join_drop_key(
+                for _, position in self.engine.query(
                     self.engine.inputs,
                     self.engine.positions
-                )
+                ).values()
         }
-        return tiles - units
+        return list(tiles - units)
 
     def find_valid_space(self) -> (int, int):
         return self.find_valid_spaces().pop()
 
     def find_empty_spaces(self) -> list:
-        return {
-            (position.x, position.y)
-                for _, position in join_drop_key(
-                    self.engine.tiles,
-                    self.engine.positions
-                )
-                if not position.blocks
-        }
+        tilemap = self.engine.tilemaps.find(self.engine.world.id)
+        return tilemap.walkable_tiles()
 
     def find_unlit_spaces(self) -> set:
-        return {
-            (position.x, position.y)
-                for (_, position, visible) in join_drop_key(
-                    self.engine.tiles,
-                    self.engine.positions,
-                    self.engine.visibilities
-                )
-                if visible.level > 1 and not position.blocks
-        }
+        tilemap = self.engine.tilemaps.find(self.engine.world.id)
+        return set(
+            tilemap.coordinates(tilemap.walkable() & (tilemap.visibility > 1))
+        )
     
     def spawn_player(self) -> int:
-        self.engine.player = player = self.engine.entities.create()
+        self.engine.player = player = self.engine.entities.create('actors')
         # add components
         self.engine.inputs.add(player, Input())
         self.engine.positions.add(
@@ -80,10 +69,11 @@ class SpawnSystem(System):
         self.engine.manas.add(player, Mana(10, 20))
         self.engine.infos.add(player, Information("Hero"))
         self.engine.inputs.add(player, Input(needs_input=True))
+        self.engine.turns.add(player, Turn(tick_amount=PLAYER_SPEED))
 
         # create armor items for player to equip
         # head
-        helmet = self.engine.entities.create()
+        helmet = self.engine.entities.create('items')
         self.engine.items.add(helmet, Item('armor', ('head',)))
         self.engine.renders.add(helmet, Render('['))
         self.engine.infos.add(
@@ -92,7 +82,7 @@ class SpawnSystem(System):
         )
         self.engine.armors.add(helmet, Armor(2))
         # body
-        platemail = self.engine.entities.create()
+        platemail = self.engine.entities.create('items')
         self.engine.items.add(platemail, Item('armor', ('body',)))
         self.engine.renders.add(platemail, Render('['))
         self.engine.infos.add(
@@ -104,7 +94,7 @@ class SpawnSystem(System):
         )
         self.engine.armors.add(platemail, Armor(5))
         # feet
-        ironboots = self.engine.entities.create()
+        ironboots = self.engine.entities.create('items')
         self.engine.items.add(ironboots, Item('armor', ('feet',)))
         self.engine.renders.add(ironboots, Render('['))
         self.engine.infos.add(
@@ -114,7 +104,7 @@ class SpawnSystem(System):
         self.engine.armors.add(ironboots, Armor(3))
 
         # create a weapon for player
-        spear = self.engine.entities.create()
+        spear = self.engine.entities.create('items')
         self.engine.items.add(spear, Item('weapon', ('hand', 'missiles')))
         self.engine.renders.add(
             spear,
@@ -124,7 +114,7 @@ class SpawnSystem(System):
         self.engine.weapons.add(spear, Weapon(4, 3))
         
         # create some missiles for player
-        stone = self.engine.entities.create()
+        stone = self.engine.entities.create('items')
         self.engine.items.add(stone, Item('weapon', ('hand', 'missiles')))
         self.engine.renders.add(stone, Render('*'))
         self.engine.infos.add(stone, Information(
@@ -147,8 +137,8 @@ class SpawnSystem(System):
         i = Inventory()
         self.engine.inventories.add(player, Inventory())
 
-        # add a spellbook with a spell
-        spellbook = Spellbook(spells=[0, 1])
+        # add a spellbook with the built spells
+        spellbook = Spellbook(spells=self.engine.entities.tagged('spells'))
         self.engine.spellbooks.add(player, spellbook)
         return player
 
@@ -160,7 +150,7 @@ class SpawnSystem(System):
 
     def spawn_unit(self, space) -> None:
         # create unit entity
-        computer = self.engine.entities.create()
+        computer = self.engine.entities.create('actors')
         self.engine.inputs.add(computer, Input())
         self.engine.positions.add(
             computer,
@@ -171,6 +161,7 @@ class SpawnSystem(System):
             )
         )
         self.engine.ais.add(computer, AI())
+        self.engine.turns.add(computer, Turn(tick_amount=GOBLIN_SPEED))
         render = random.choice(self.engine.renders.shared['goblin'])
         self.engine.renders.add(computer, render)
         info = self.engine.infos.shared['goblin']
@@ -178,7 +169,7 @@ class SpawnSystem(System):
         self.engine.healths.add(computer, Health(2, 2))
         
         # add items to inventory
-        item = self.engine.entities.create()
+        item = self.engine.entities.create('items')
         self.engine.items.add(item, Item('weapon', ('hand', 'missile')))
         r = random.choice(self.engine.renders.shared['spear'])
         self.engine.renders.add(item, r)
@@ -186,7 +177,7 @@ class SpawnSystem(System):
         self.engine.inventories.add(computer, Inventory(items=[item]))
 
     def spawn_item(self, space) -> None:
-        item = self.engine.entities.create()
+        item = self.engine.entities.create('items')
         self.engine.positions.add(item, Position(
             *space,
             map_id=self.engine.world.id,
@@ -21,5 +21,17 @@ class System(object):
     def system_name(cls):
         return f"{cls.classname().replace('system', '')}_system"
 
+    def instrument(self, profiler) -> None:
+        """
+            Replaces the process and update methods of this instance with
+            ones timed by profiler. See source.profiler
+        """
+        for method in ('process', 'update'):
+            if hasattr(self, method):
+                self.__setattr__(method, profiler.wrap(
+                    f"{self.system_name()}.{method}",
+                    getattr(self, method)
+                ))
+
     def process(self):
         raise NotImplementedError("Implement base system process method")
@@ -1,21 +1,25 @@
 # turn_system.py
 
+from source.ecs.managers import Scheduler
+from source.ecs.managers.scheduler import ROUND
 from source.ecs.systems import System
 from source.screens import DeathScreen
 
 class TurnSystem(System):
+    def __init__(self, engine, logger=None) -> None:
+        super().__init__(engine, logger)
+        # only entities with an input component are visited
+        self.scheduler = Scheduler(engine.inputs)
+
     def process(self):
-        while True:
-            entity = self.engine.entity
-            # end of entity list
-            if entity is None:
-                self.engine.reset_entity_index()
-                break
-            takes_turn = self.engine.inputs.find(entity)
-            # skip entities that do not take a turn
-            if not takes_turn:
-                self.engine.next_entity()
+        scheduler = self.scheduler
+        while not scheduler.round_over():
+            entity = scheduler.peek()
+            if self.engine.energy_system.stalled(entity):
+                # skipped without acting until it gains energy again
+                scheduler.done(entity, ROUND)
                 continue
+            takes_turn = self.engine.inputs.find(entity)
             # if requires input from user then return early indicating input
             if takes_turn.needs_input:
                 if self.engine.requires_input:
@@ -33,10 +37,11 @@ class TurnSystem(System):
             if not self.engine.player:
                 self.engine.add_screen(DeathScreen)
                 return True
-            # per turn processes
+            scheduler.done(entity, self.engine.energy_system.delay(entity))
+            # per turn processes. Removed actors are dropped by the scheduler
             self.engine.grave_system.process()
-            self.engine.next_entity()
         # end of all entities turn processes
+        scheduler.next_round()
         self.engine.decay_system.process()
         self.engine.heal_system.process()
         self.engine.manaregen_system.process()
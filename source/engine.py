@@ -10,8 +10,9 @@ from collections import OrderedDict
 from source.common import GameMode, join
 from source.ecs.components import (Collision, Effect, Information, Movement,
                                    Openable, Position, components)
-from source.ecs.managers import ComponentManager, EntityManager
-from source.ecs.systems import RenderSystem
+from source.ecs.managers import (ArchetypeManager, ComponentManager,
+                                 EntityManager, PositionManager, Query)
+from source.ecs.systems import RenderSystem, System
 from source.logger import Logger
 from source.router import Router
 from source.screens import EmptyScreen
@@ -20,32 +21,43 @@ from source.stack import Stack
 
 class Engine(object):
 
-    def __init__(self, components, systems, terminal=None, keyboard=None):
+    def __init__(
+            self,
+            components,
+            systems,
+            terminal=None,
+            keyboard=None,
+            archetypes=False
+        ):
         self.running: bool = True
         self.logger = Logger()
         self.debugger = Logger()
-        # set to an invalid value. All entity ids are positive integers (>0)
-        self.entity: int = -1
         
         self.add_terminal(terminal)
         self.keyboard: dict = keyboard
 
         self.world = None
         self.entities = EntityManager()
+        # shared archetype storage used by join queries if enabled
+        self.archetypes = ArchetypeManager() if archetypes else None
+        # persistent queries keyed by the names of the managers they join
+        self.queries: dict = {}
         self.init_managers(components)
         self.init_systems(systems)
 
         self.screens: Stack = Stack()
         self.router: Router = Router()
         
-        self.entity: int = None
-        self.entity_index: int = 0
         self.requires_input: bool = True
         self.keypress: str = None
 
         self.mode = GameMode.NORMAL
+        # screens draw everything again instead of only what changed
+        self.full_redraw: bool = True
         self.entities_in_view: set = set()
         self.tiles_in_view: set = set()
+        # set by profile() to time system calls
+        self.profiler = None
 
     def __repr__(self):
         attributes = []
@@ -70,10 +82,16 @@ class Engine(object):
                     ComponentManager(component),
                     OrderedDict
                 )
+            elif component is Position:
+                # positions are indexed by (map_id, x, y) for tile lookups
+                self.__setattr__(
+                    component.manager,
+                    PositionManager(component, archetypes=self.archetypes)
+                )
             else:
                 self.__setattr__(
                     component.manager,
-                    ComponentManager(component)
+                    ComponentManager(component, archetypes=self.archetypes)
                 )
 
     def init_systems(self, systems):
@@ -87,8 +105,33 @@ class Engine(object):
                 system = system_type(self)
             self.__setattr__(name, system)
 
+    def profile(self, profiler) -> None:
+        """Times every process and update call of the engine systems"""
+        self.profiler = profiler
+        for value in list(self.__dict__.values()):
+            if isinstance(value, System):
+                value.instrument(profiler)
+
+    def query(self, *managers) -> Query:
+        """
+            Returns the persistent query joining the given managers. The
+            query is built on first use and then kept up to date by the
+            managers as components are added or removed.
+        """
+        key = tuple(manager.name for manager in managers)
+        query = self.queries.get(key)
+        if query is None:
+            query = Query(*managers)
+            self.queries[key] = query
+        return query
+
     def get_input(self):
-        return self.terminal.read()
+        value = self.terminal.read()
+        if value == self.terminal.TK_RESIZED:
+            self.width = self.terminal.state(self.terminal.TK_WIDTH)
+            self.height = self.terminal.state(self.terminal.TK_HEIGHT)
+            self.full_redraw = True
+        return value
 
     def keypress_from_input(self, value):
         keys = self.keyboard.get(value, None)
@@ -127,10 +170,12 @@ class Engine(object):
 
     def add_screen(self, screen):
         self.screens.push(screen(self, self.terminal))
+        self.full_redraw = True
 
     def remove_screen(self, screens=1):
         for _ in range(screens):
             self.screens.pop()
+        self.full_redraw = True
 
     def change_mode(self, mode):
         if mode == self.mode:
@@ -147,17 +192,6 @@ class Engine(object):
                 )
             )
 
-    def reset_entity_index(self):
-        self.entity_index = 0
-        self.entity = self.entities.entity_ids[self.entity_index]
-
-    def next_entity(self):
-        self.entity_index += 1
-        if self.entity_index > len(self.entities.entity_ids) - 1:
-            self.entity = None
-        else:
-            self.entity = self.entities.entity_ids[self.entity_index]
-
     def update_ai_behaviors(self):
         self.ai_system.update()
 
@@ -173,10 +207,15 @@ class Engine(object):
             if self.requires_input:
                 self.input_system.process()
             processed = self.screen.process()
+        if self.profiler:
+            self.profiler.end_turn()
 
     def run(self):
         if not self.screens:
             self.add_screen(EmptyScreen)
-        self.entity = self.entities.entity_ids[self.entity_index]
-        while self.running:
-            self.process()
+        try:
+            while self.running:
+                self.process()
+        finally:
+            # saves still being written must finish before exiting
+            self.map_system.shutdown()
@@ -26,3 +26,10 @@ class CommandEvent(Event):
         self.keypress = keypress
         self.command = command
         self.command_handler = command_handler
+
+class ChunkEvent(Event):
+    __slots__ = ["map_id", "chunk", "loaded"]
+    def __init__(self, map_id, chunk, loaded):
+        self.map_id = map_id
+        self.chunk = chunk
+        self.loaded = loaded
@@ -23,7 +23,7 @@ def find_empty_space(engine):
 def create_unit(engine, name):
     unit_data = dict()
 
-    entity = engine.entities.create()
+    entity = engine.entities.create('actors')
     engine.ais.add(entity, AI())
     engine.inputs.add(entity, Input(is_player=False))
     engine.infos.add(entity, Information(name))
@@ -47,7 +47,7 @@ def create_unit(engine, name):
     engine.healths.add(entity, health)
 
 def create_player():
-    player = engine.entities.create()
+    player = engine.entities.create('actors')
     engine.player = player
     engine.inputs.add(player, Input())
     if not spaces:
@@ -70,7 +70,7 @@ def create_player():
 
     # create armor for player
     # head
-    helmet = engine.entities.create()
+    helmet = engine.entities.create('items')
     engine.items.add(helmet, Item('armor', ('head',)))
     engine.renders.add(helmet, Render('['))
     engine.infos.add(
@@ -79,7 +79,7 @@ def create_player():
     )
     engine.armors.add(helmet, Armor(2))
     # body
-    platemail = engine.entities.create()
+    platemail = engine.entities.create('items')
     engine.items.add(platemail, Item('armor', ('body',)))
     engine.renders.add(platemail, Render('['))
     engine.infos.add(
@@ -91,7 +91,7 @@ def create_player():
     )
     engine.armors.add(platemail, Armor(5))
     # feet
-    ironboots = engine.entities.create()
+    ironboots = engine.entities.create('items')
     engine.items.add(ironboots, Item('armor', ('feet',)))
     engine.renders.add(ironboots, Render('['))
     engine.infos.add(
@@ -101,14 +101,14 @@ def create_player():
     engine.armors.add(ironboots, Armor(3))
 
     # create a weapon for player
-    spear = engine.entities.create()
+    spear = engine.entities.create('items')
     engine.items.add(spear, Item('weapon', ('hand', 'missiles')))
     engine.renders.add(spear, random.choice(engine.renders.shared['spear']))
     engine.infos.add(spear, engine.infos.shared['spear'])
     engine.weapons.add(spear, Weapon(4, 3))
     
     # create some missiles for player
-    stone = engine.entities.create()
+    stone = engine.entities.create('items')
     engine.items.add(stone, Item('weapon', ('hand', 'missiles')))
     engine.renders.add(stone, Render('*'))
     engine.infos.add(stone, Information(
@@ -6,6 +6,7 @@ Holds functions for map generation
 
 import math
 import random
+from collections import deque
 from copy import deepcopy
 
 import numpy as np
@@ -237,6 +238,179 @@ def flood_fill(matrix:list) -> list:
             matrix[y][x] = '#'
     return matrix
 
+# -- numpy grid versions --
+# Same steps as the list based functions above but working on 2d arrays of
+# characters. Given the same seeds they produce identical maps.
+def array_to_grid(
+        array: list,
+        width: int,
+        height: int,
+        filter: object,
+        chars: tuple = ('#', '.')
+    ) -> np.ndarray:
+    # filter is written for single values so apply it once per unique value
+    values = [value for value in np.unique(array) if filter(value)]
+    mask = np.isin(np.asarray(array)[:width * height], values)
+    return np.where(mask, chars[0], chars[1]).reshape(height, width)
+
+def add_boundry_to_grid(grid: np.ndarray, bounds=2) -> np.ndarray:
+    grid[:, :bounds] = '#'
+    grid[:, grid.shape[1] - bounds:] = '#'
+    grid[:bounds, :] = '#'
+    grid[grid.shape[0] - bounds:, :] = '#'
+    return grid
+
+def cell_auto_grid(
+        grid: np.ndarray,
+        alivelimit: int=4,
+        deadlimit: int=5
+    ) -> np.ndarray:
+    """
+        Neighbor walls are counted by summing the wall mask rolled in each
+        direction. Like cell_auto, neighbors past the first row or column
+        wrap around and cells in the last row or column are left as is.
+    """
+    walls = (grid == '#').astype(np.int8)
+    neighbors = np.zeros(grid.shape, dtype=np.int8)
+    for i, j in squares(exclude_center=True):
+        neighbors += np.roll(walls, (-j, -i), axis=(0, 1))
+    copy = grid.copy()
+    inner = np.zeros(grid.shape, dtype=bool)
+    inner[:-1, :-1] = True
+    copy[inner & (grid == '#') & (neighbors < deadlimit)] = '.'
+    copy[inner & (grid == '.') & (neighbors > alivelimit)] = '#'
+    return copy
+
+def label_grid(mask: np.ndarray) -> np.ndarray:
+    """
+        Labels 4-connected components of a boolean grid. Each cell gets the
+        flat index of the first cell (row major) of its component or -1 if
+        it is not part of the mask. Horizontal runs of cells are joined
+        first, then runs touching vertically are merged with union find:
+        roots hook onto the smaller root and paths are compressed until no
+        edge joins two different roots.
+    """
+    height, width = mask.shape
+    flat = mask.ravel()
+    # a run starts on a masked cell whose left neighbor is not masked
+    starts = mask.copy()
+    starts[:, 1:] &= ~mask[:, :-1]
+    starts = starts.ravel()
+    run = np.cumsum(starts) - 1
+    first = np.flatnonzero(starts)
+    # runs in neighboring rows sharing a column are connected
+    down = (mask[:-1, :] & mask[1:, :]).ravel()
+    cells = np.flatnonzero(down)
+    a, b = run[cells], run[cells + width]
+    parent = np.arange(len(first))
+    while True:
+        ra, rb = parent[a], parent[b]
+        differ = ra != rb
+        if not differ.any():
+            break
+        a, b, ra, rb = a[differ], b[differ], ra[differ], rb[differ]
+        np.minimum.at(parent, np.maximum(ra, rb), np.minimum(ra, rb))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+    labels = np.full(height * width, -1)
+    labels[flat] = first[parent[run[flat]]]
+    return labels.reshape(height, width)
+
+def flood_fill_grid(grid: np.ndarray) -> np.ndarray:
+    """Fills every floor region except the largest one with walls"""
+    floors = grid == '.'
+    labels = label_grid(floors)
+    sizes = np.bincount(labels[floors])
+    if not len(sizes):
+        return grid
+    largest = np.flatnonzero(sizes == sizes.max())
+    keep = largest[0]
+    if len(largest) > 1:
+        # flood_fill keeps the tied region it found first. It starts each
+        # region from set.pop() so rebuild the same set to get that order
+        height, width = grid.shape
+        found = set(largest.tolist())
+        for x, y in {
+            (x, y)
+                for x in range(width) for y in range(height)
+                    if floors[y, x]
+        }:
+            if labels[y, x] in found:
+                keep = labels[y, x]
+                break
+    grid[floors & (labels != keep)] = '#'
+    return grid
+
+def replace_cell_with_stairs_grid(
+        grid: np.ndarray,
+        upstairs: tuple=None,
+        downstairs: tuple=None
+    ) -> np.ndarray:
+    if upstairs and downstairs and upstairs == downstairs:
+        raise ValueError("Upstairs value cannot be the same as downstairs.")
+    # same column major order as replace_cell_with_stairs
+    floors = np.argwhere(grid.T == '.')
+    if len(floors) < 3:
+        raise Exception("No room for both down and up stairs")
+    last, second = shuffled_tail(len(floors))
+    if not upstairs:
+        upstairs = floors[last].tolist()
+    grid[upstairs[1], upstairs[0]] = '<'
+    if not downstairs:
+        downstairs = floors[second].tolist()
+    grid[downstairs[1], downstairs[0]] = '>'
+    return grid
+
+def shuffled_tail(length: int) -> tuple:
+    """
+        Returns the indices random.shuffle leaves in the last two places of
+        a list of the given length. Like random.shuffle it draws
+        randrange(i + 1) for i from length - 1 down to 1, so the random
+        state ends up the same, but only the first two swaps are followed
+        and no list is built. Takes about 0.25s for the 500k floors of a
+        1000x1000 cave.
+    """
+    last = random.randrange(length)
+    if length == 2:
+        # the item not swapped into the last place is left in the first
+        return last, 1 - last
+    second = random.randrange(length - 1)
+    # the rest of the draws only reorder the other places
+    deque(map(random.randrange, range(length - 2, 1, -1)), maxlen=0)
+    # the first swap moved the last index to where the first pick was
+    return last, length - 1 if second == last else second
+
+def generate_cave(width: int, height: int, steps: int=4) -> np.ndarray:
+    """Random cave pipeline used by MapSystem.build_map on numpy grids"""
+    grid = array_to_grid(
+        generate_poisson_array(width, height),
+        width, height,
+        filter=lambda x: x < 3 or x >= 8
+    )
+    grid = add_boundry_to_grid(grid, bounds=1)
+    for i in range(steps):
+        grid = cell_auto_grid(grid, deadlimit=5+(i-5))
+    grid = flood_fill_grid(grid)
+    return replace_cell_with_stairs_grid(grid)
+
+def seeded_cave(seed: int, width: int, height: int) -> list:
+    """
+        generate_cave seeded by seed so the same seed always builds the same
+        cave, whether called here or in a worker process. The global random
+        states are restored afterwards.
+    """
+    states = random.getstate(), np.random.get_state()
+    random.seed(seed)
+    np.random.seed(seed)
+    try:
+        return generate_cave(width, height).tolist()
+    finally:
+        random.setstate(states[0])
+        np.random.set_state(states[1])
+
 def burrow_passage(width: int, height: int, matrix: list=None) -> list:
     if not matrix:
         matrix = [['#' for _ in range(width)] for _ in range(height)]
@@ -0,0 +1,185 @@
+# goalmap.py
+
+"""
+    Dijkstra goal maps (flow fields) over a tilemap.
+
+    A goal map holds the walking cost from every tile to the nearest goal.
+    It is built once and shared by every unit heading to the same goals so
+    each unit picks its next step by looking at its 8 neighbors instead of
+    running its own search.
+    >>> field = dijkstra(tilemap.walkable(), [(player.x, player.y)])
+    >>> step = descend(field, goblin.x, goblin.y)
+
+    Costs use the same integer octile steps as astar (10 straight, 14
+    diagonal). Unreachable and blocked tiles hold infinity.
+
+    GoalMap expands its search lazily: a step only settles tiles up to the
+    cost of the tile the unit stands on, so a goal change costs the area
+    within reach of the farthest unit that asks instead of the whole map.
+"""
+
+import heapq
+from math import inf
+
+import numpy as np
+
+from source.pathfind import octile_int
+
+STEPS = tuple(
+    (x, y, octile_int((0, 0), (x, y)))
+        for x in range(-1, 2)
+            for y in range(-1, 2)
+                if (x, y) != (0, 0)
+)
+
+FLEE_COEFFICIENT = -1.2
+
+
+class Search:
+    """
+        Heap based dijkstra over the walkable tiles. Tiles are settled in
+        cost order by settle(), which can stop as soon as a given tile is
+        settled and carry on from there on the next call.
+        sources holds (x, y, cost) starting tiles.
+    """
+
+    __slots__ = ['width', 'height', 'walkable', 'costs', 'settled', 'heap']
+
+    def __init__(self, walkable, sources):
+        self.height, self.width = walkable.shape
+        # flat python lists index faster than numpy arrays one at a time
+        self.walkable = walkable.ravel().tolist()
+        self.costs = [inf] * len(self.walkable)
+        self.settled = [False] * len(self.walkable)
+        self.heap = []
+        for x, y, cost in sources:
+            index = y * self.width + x
+            self.walkable[index] = True
+            if cost < self.costs[index]:
+                self.costs[index] = cost
+                self.heap.append((cost, index))
+        heapq.heapify(self.heap)
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(width={self.width}, "
+                f"height={self.height}, frontier={len(self.heap)})")
+
+    def settle(self, x: int = None, y: int = None) -> None:
+        """Expands until x, y is settled, or every tile without x, y"""
+        width, height = self.width, self.height
+        walkable, costs, settled, heap = \
+            self.walkable, self.costs, self.settled, self.heap
+        target = None if x is None else y * width + x
+        if target is not None and settled[target]:
+            return
+        while heap:
+            cost, index = heapq.heappop(heap)
+            if settled[index]:
+                continue
+            settled[index] = True
+            y, x = divmod(index, width)
+            for dx, dy, step in STEPS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < width and 0 <= ny < height:
+                    neighbor = ny * width + nx
+                    if walkable[neighbor] and cost + step < costs[neighbor]:
+                        costs[neighbor] = cost + step
+                        heapq.heappush(heap, (cost + step, neighbor))
+            if index == target:
+                return
+
+    def field(self) -> np.ndarray:
+        """Costs found so far. Complete once settle() ran without a tile"""
+        return np.array(self.costs).reshape(self.height, self.width)
+
+    def descend(self, x: int, y: int):
+        """descend() over the list of costs. x, y must be settled"""
+        width, height, costs = self.width, self.height, self.costs
+        best, step = costs[y * width + x], None
+        for dx, dy, _ in STEPS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height:
+                cost = costs[ny * width + nx]
+                if cost < best:
+                    best, step = cost, (dx, dy)
+        return step
+
+
+def dijkstra(walkable, goals):
+    """Builds a distance field toward one or more (x, y) goals"""
+    search = Search(walkable, [(x, y, 0) for x, y in goals])
+    search.settle()
+    return search.field()
+
+def flee_sources(field, coefficient=FLEE_COEFFICIENT):
+    """Every reachable tile starts at its scaled, negated distance"""
+    ys, xs = np.nonzero(np.isfinite(field))
+    costs = (field[ys, xs] * coefficient).tolist()
+    return zip(xs.tolist(), ys.tolist(), costs)
+
+def flee(field, walkable, coefficient=FLEE_COEFFICIENT):
+    """
+        Inverts a distance field so descending it leads away from the
+        goals. Searching again from the inverted costs lets units route
+        toward open space instead of into dead ends closest to where they
+        stand.
+    """
+    search = Search(walkable, flee_sources(field, coefficient))
+    search.settle()
+    return search.field()
+
+def descend(field, x, y):
+    """
+        Returns the (dx, dy) step toward the cheapest neighbor or None if
+        no neighbor is cheaper than the current tile
+    """
+    height, width = field.shape
+    best, step = field[y, x], None
+    for dx, dy, _ in STEPS:
+        nx, ny = x + dx, y + dy
+        if 0 <= nx < width and 0 <= ny < height and field[ny, nx] < best:
+            best, step = field[ny, nx], (dx, dy)
+    return step
+
+
+class GoalMap:
+    """
+        Distance search cached against its map, goals and the blocker
+        generation of the tilemap. update() only starts a new search when
+        one of them changed since the last call and step() expands it just
+        far enough for the unit asking.
+    """
+
+    __slots__ = ['inverted', 'key', 'search', 'builds']
+
+    def __init__(self, inverted: bool = False):
+        self.inverted = inverted
+        self.key = None
+        self.search = None
+        self.builds = 0
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(inverted={self.inverted}, "
+                f"key={self.key}, builds={self.builds})")
+
+    def update(self, map_id, tilemap, goals) -> None:
+        goals = tuple(goals)
+        key = (map_id, id(tilemap), tilemap.generation, goals)
+        if key != self.key:
+            walkable = tilemap.walkable()
+            if self.inverted:
+                # fleeing needs the full distance field to invert
+                field = dijkstra(walkable, goals)
+                search = Search(walkable | np.isfinite(field),
+                                flee_sources(field))
+            else:
+                search = Search(walkable, [(x, y, 0) for x, y in goals])
+            self.key, self.search = key, search
+            self.builds += 1
+
+    def step(self, x, y):
+        """Next (dx, dy) step for a unit at x, y or None if at a minimum"""
+        if self.search is None:
+            return None
+        self.search.settle(x, y)
+        return self.search.descend(x, y)
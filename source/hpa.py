@@ -0,0 +1,441 @@
+# hpa.py
+
+"""
+    Hierarchical pathfinding (HPA*) over tilemaps and world levels.
+
+    A tilemap is split into square clusters. Where two neighboring clusters
+    share an open border an entrance is placed: a pair of tiles, one on
+    each side, joined by a single step. Entrances of the same cluster are
+    joined by precomputed paths that stay inside the cluster. A query
+    connects its start and end to the entrances of their clusters, runs
+    A* over this small abstract graph and stitches the stored paths
+    together, so only the start and end clusters are searched per query.
+
+    The hierarchy keeps a copy of the walkable grid. When the tilemap
+    generation changes (doors opening or closing through set_door, or
+    anything else calling TileMap.changed) only the clusters holding
+    changed tiles and the borders around them are rebuilt.
+
+    WorldPlanner keeps one hierarchy per map and chains paths between
+    levels of the WorldGraph through their stair tiles.
+"""
+
+import math
+from collections import namedtuple
+from heapq import heappop, heappush
+
+import numpy as np
+
+from source.goalmap import STEPS
+from source.pathfind import astar, octile_int
+
+Point = namedtuple('Point', 'x y')
+
+
+# -- helper functions --
+def cluster_search(cells, source):
+    """Dijkstra from source over cells. Returns costs and parents"""
+    costs = {source: 0}
+    parents = {}
+    heap = [(0, source)]
+    while heap:
+        g, node = heappop(heap)
+        if g > costs[node]:
+            continue
+        x, y = node
+        for dx, dy, cost in STEPS:
+            neighbor = (x + dx, y + dy)
+            if neighbor not in cells:
+                continue
+            new_g = g + cost
+            if new_g < costs.get(neighbor, math.inf):
+                costs[neighbor] = new_g
+                parents[neighbor] = node
+                heappush(heap, (new_g, neighbor))
+    return costs, parents
+
+def trace(parents, source, target):
+    """Path from source to target excluding source"""
+    path = []
+    while target != source:
+        path.append(target)
+        target = parents[target]
+    path.reverse()
+    return path
+
+def runs(mask):
+    """Yields (first, last) index pairs of consecutive true values"""
+    first = None
+    for i, value in enumerate(mask):
+        if value and first is None:
+            first = i
+        elif not value and first is not None:
+            yield first, i - 1
+            first = None
+    if first is not None:
+        yield first, len(mask) - 1
+
+
+class HierarchicalMap:
+
+    __slots__ = [
+        'tilemap', 'size', 'generation', 'grid', 'borders', 'nodes',
+        'edges', 'paths', 'rebuilds'
+    ]
+
+    # open runs at least this long get an entrance at each end
+    LONG_ENTRANCE = 6
+
+    def __init__(self, tilemap, size: int = 16):
+        self.tilemap = tilemap
+        self.size = size
+        self.generation = None
+        self.grid = None
+        # (cluster, cluster) -> [(tile, tile)] entrances on that border
+        self.borders: dict = {}
+        # cluster -> set of entrance tiles
+        self.nodes: dict = {}
+        # tile -> {tile: cost} and (tile, tile) -> path excluding first tile
+        self.edges: dict = {}
+        self.paths: dict = {}
+        # number of clusters rebuilt since creation
+        self.rebuilds = 0
+        self.build()
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(size={self.size}, "
+                f"clusters={len(self.nodes)}, nodes={len(self.edges)}, "
+                f"rebuilds={self.rebuilds})")
+
+    @property
+    def shape(self) -> tuple:
+        columns = -(-self.tilemap.width // self.size)
+        rows = -(-self.tilemap.height // self.size)
+        return columns, rows
+
+    def cluster(self, x: int, y: int) -> tuple:
+        return x // self.size, y // self.size
+
+    def clusters(self):
+        columns, rows = self.shape
+        for cy in range(rows):
+            for cx in range(columns):
+                yield cx, cy
+
+    def cells(self, cluster) -> set:
+        """Walkable tiles of a cluster"""
+        cx, cy = cluster
+        x0, y0 = cx * self.size, cy * self.size
+        window = self.grid[y0:y0 + self.size, x0:x0 + self.size]
+        return {(x + x0, y + y0) for y, x in np.argwhere(window).tolist()}
+
+    def neighbors(self, cluster):
+        """Border keys between a cluster and its four neighbors"""
+        columns, rows = self.shape
+        cx, cy = cluster
+        if cx > 0:
+            yield (cx - 1, cy), cluster
+        if cy > 0:
+            yield (cx, cy - 1), cluster
+        if cx + 1 < columns:
+            yield cluster, (cx + 1, cy)
+        if cy + 1 < rows:
+            yield cluster, (cx, cy + 1)
+
+    # -- building --
+    def build(self) -> None:
+        """Builds every border and cluster from scratch"""
+        self.grid = self.tilemap.walkable().copy()
+        self.generation = self.tilemap.generation
+        self.borders.clear()
+        self.nodes.clear()
+        self.edges.clear()
+        self.paths.clear()
+        borders = {
+            border
+                for cluster in self.clusters()
+                    for border in self.neighbors(cluster)
+        }
+        for border in borders:
+            self.build_border(border)
+        for cluster in self.clusters():
+            self.build_cluster(cluster)
+
+    def sync(self) -> bool:
+        """
+            Rebuilds the clusters holding tiles whose walkability changed
+            since the last sync. Returns True if anything was rebuilt.
+        """
+        if self.generation == self.tilemap.generation:
+            return False
+        grid = self.tilemap.walkable()
+        if grid.shape != self.grid.shape:
+            self.build()
+            return True
+        changed = np.argwhere(grid != self.grid).tolist()
+        self.grid = grid.copy()
+        self.generation = self.tilemap.generation
+        dirty = {self.cluster(x, y) for y, x in changed}
+        borders = {
+            border for cluster in dirty for border in self.neighbors(cluster)
+        }
+        # clusters across a border only need rebuilding if its entrances moved
+        affected = {
+            cluster
+                for border in borders
+                    if self.build_border(border)
+                        for cluster in border
+        }
+        for cluster in affected | dirty:
+            self.build_cluster(cluster)
+        return bool(dirty)
+
+    def link(self, a, b, cost, path) -> None:
+        self.edges.setdefault(a, {})[b] = cost
+        self.paths[(a, b)] = path
+
+    def unlink(self, a, b) -> None:
+        edges = self.edges.get(a)
+        if edges and b in edges:
+            del edges[b]
+            del self.paths[(a, b)]
+            if not edges:
+                del self.edges[a]
+
+    def build_border(self, border) -> bool:
+        """Places entrances on a border. Returns True if they changed"""
+        old = self.borders.pop(border, [])
+        for a, b in old:
+            self.unlink(a, b)
+            self.unlink(b, a)
+        (ax, ay), (bx, by) = border
+        size = self.size
+        if ax != bx:
+            # vertical border: columns x and x + 1
+            x = bx * size
+            y0 = ay * size
+            y1 = min(y0 + size, self.tilemap.height)
+            open_tiles = self.grid[y0:y1, x - 1] & self.grid[y0:y1, x]
+            pairs = lambda i: ((x - 1, y0 + i), (x, y0 + i))
+        else:
+            # horizontal border: rows y and y + 1
+            y = by * size
+            x0 = ax * size
+            x1 = min(x0 + size, self.tilemap.width)
+            open_tiles = self.grid[y - 1, x0:x1] & self.grid[y, x0:x1]
+            pairs = lambda i: ((x0 + i, y - 1), (x0 + i, y))
+        transitions = []
+        for first, last in runs(open_tiles.tolist()):
+            if last - first + 1 >= self.LONG_ENTRANCE:
+                indices = (first, last)
+            else:
+                indices = ((first + last) // 2,)
+            for i in indices:
+                a, b = pairs(i)
+                transitions.append((a, b))
+                self.link(a, b, 10, [b])
+                self.link(b, a, 10, [a])
+        if transitions:
+            self.borders[border] = transitions
+        return transitions != old
+
+    def build_cluster(self, cluster) -> None:
+        old = self.nodes.pop(cluster, set())
+        for a in old:
+            for b in old:
+                self.unlink(a, b)
+        nodes = {
+            tile
+                for border in self.neighbors(cluster)
+                    for pair in self.borders.get(border, ())
+                        for tile in pair
+                            if self.cluster(*tile) == cluster
+        }
+        self.rebuilds += 1
+        if not nodes:
+            return
+        self.nodes[cluster] = nodes
+        cells = self.cells(cluster)
+        for a in nodes:
+            costs, parents = cluster_search(cells, a)
+            for b in nodes:
+                if b != a and b in costs:
+                    self.link(a, b, costs[b], trace(parents, a, b))
+
+    # -- queries --
+    def find_path(self, start, end, include_start=False, stats=None):
+        """
+            Same path format as astar. Paths found through the abstract
+            graph may be slightly longer than optimal. Falls back to astar
+            over the whole map if the abstract graph has no route.
+        """
+        self.sync()
+        source, goal = (start.x, start.y), (end.x, end.y)
+        expanded = 0
+        path = None
+        if source == goal:
+            path = []
+        elif self.cluster(*source) == self.cluster(*goal):
+            cells = self.cells(self.cluster(*source))
+            path = astar(cells, start, end) or None
+        if path is None:
+            path, expanded = self.abstract_path(source, goal)
+        if path is None:
+            path = astar(self.tilemap.walkable_tiles(), start, end)
+        if stats is not None:
+            stats['expanded'] = expanded
+        if include_start:
+            path.insert(0, source)
+        return path
+
+    def abstract_path(self, source, goal):
+        cluster = self.cluster(*source)
+        cells = self.cells(cluster)
+        if source not in cells:
+            return None, 0
+        start_costs, start_parents = cluster_search(cells, source)
+        goal_cells = self.cells(self.cluster(*goal))
+        if goal not in goal_cells:
+            return None, 0
+        goal_costs, goal_parents = cluster_search(goal_cells, goal)
+        exits = {
+            node: goal_costs[node]
+                for node in self.nodes.get(self.cluster(*goal), ())
+                    if node in goal_costs
+        }
+        starts = {
+            node: start_costs[node]
+                for node in self.nodes.get(cluster, ())
+                    if node in start_costs
+        }
+
+        # source and goal get their own keys since either may also be an
+        # entrance tile with edges of its own
+        START, GOAL = (-1,), (-2,)
+        heap = [(octile_int(source, goal), 0, START)]
+        gs = {START: 0}
+        parents = {}
+        closed = set()
+        expanded = 0
+        while heap:
+            _, g, current = heappop(heap)
+            if current in closed or g > gs[current]:
+                continue
+            if current == GOAL:
+                break
+            closed.add(current)
+            expanded += 1
+            if current == START:
+                neighbors = starts.items()
+            else:
+                neighbors = list(self.edges.get(current, {}).items())
+                if current in exits:
+                    neighbors.append((GOAL, exits[current]))
+            for neighbor, cost in neighbors:
+                new_g = g + cost
+                if new_g < gs.get(neighbor, math.inf):
+                    gs[neighbor] = new_g
+                    parents[neighbor] = current
+                    tile = goal if neighbor == GOAL else neighbor
+                    h = octile_int(tile, goal)
+                    heappush(heap, (new_g + h, new_g, neighbor))
+        else:
+            return None, expanded
+
+        # refine abstract nodes into tile paths
+        route = [GOAL]
+        while route[-1] != START:
+            route.append(parents[route[-1]])
+        route.reverse()
+        path = []
+        for a, b in zip(route, route[1:]):
+            if a == START and b == GOAL:
+                path.extend(trace(start_parents, source, goal))
+            elif a == START:
+                path.extend(trace(start_parents, source, b))
+            elif b == GOAL:
+                path.extend(reversed(trace(goal_parents, goal, a)[:-1]))
+                if a != goal:
+                    path.append(goal)
+            else:
+                path.extend(self.paths[(a, b)])
+        return path, expanded
+
+
+class WorldPlanner:
+    """
+        Keeps one hierarchy per map id and plans across WorldGraph levels.
+        loader(map_id) returns the TileMap of a level, loaded or saved.
+    """
+
+    __slots__ = ['world', 'loader', 'size', 'maps']
+
+    def __init__(self, world, loader, size: int = 16):
+        self.world = world
+        self.loader = loader
+        self.size = size
+        self.maps: dict = {}
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(maps={list(self.maps)})"
+
+    def hierarchy(self, map_id) -> HierarchicalMap:
+        tilemap = self.loader(map_id)
+        hierarchy = self.maps.get(map_id)
+        # a regenerated or reloaded level is a new tilemap object
+        if hierarchy is None or hierarchy.tilemap is not tilemap:
+            hierarchy = self.maps[map_id] = HierarchicalMap(tilemap, self.size)
+        return hierarchy
+
+    def levels(self, start_id, end_id) -> list:
+        """Map ids from start to end following parent/child links"""
+        parents = {start_id: None}
+        queue = [start_id]
+        while queue:
+            current = queue.pop(0)
+            if current == end_id:
+                route = [current]
+                while parents[route[-1]] is not None:
+                    route.append(parents[route[-1]])
+                return route[::-1]
+            node = self.world.get(current)
+            for neighbor in (node.parent_id, node.child_id):
+                if neighbor is not None and neighbor not in parents:
+                    parents[neighbor] = current
+                    queue.append(neighbor)
+        return []
+
+    def plan(self, start_id, start, end_id, end) -> list:
+        """
+            Returns [(map_id, path), ...] legs leading from start on level
+            start_id to end on level end_id. Each leg ends on the stairs
+            leading to the next level and the next leg starts on the
+            matching stairs. Returns an empty list if a leg has no path.
+        """
+        levels = self.levels(start_id, end_id)
+        if not levels:
+            return []
+        legs = []
+        position = Point(start.x, start.y)
+        for current, following in zip(levels, levels[1:] + [None]):
+            hierarchy = self.hierarchy(current)
+            if following is None:
+                target = Point(end.x, end.y)
+            else:
+                going_down = self.world[current].child_id == following
+                stairs = hierarchy.tilemap.find('>' if going_down else '<')
+                if stairs is None:
+                    return []
+                target = Point(*stairs)
+            path = hierarchy.find_path(position, target)
+            if not path and position != target:
+                return []
+            legs.append((current, path))
+            if following is not None:
+                arrival = self.loader(following).find(
+                    '<' if going_down else '>'
+                )
+                if arrival is None:
+                    return []
+                position = Point(*arrival)
+        return legs
@@ -0,0 +1,153 @@
+# levelstore.py
+
+"""
+    Single file store of levels read through a memory map.
+
+    Levels are appended in the RAW_VERSION layout of source.mapfile so the
+    tile arrays of a loaded level are views into a copy on write mmap of
+    the store. Only the pages of the rows that are read (the viewport drawn
+    by LevelPanel, a field of view window) are paged in from disk. Writing
+    to the arrays changes private copies of the pages, never the store.
+
+    The index maps the world graph node ids to where each level is stored
+    along with the parent and child ids of the node, so it also serves as
+    the directory of the world:
+    >>> store = LevelStore('saves/levels.store')
+    >>> world = store.world(start_id=0)
+
+    Layout (little endian):
+        header  magic, version, index offset and index size (see HEADER)
+        levels  encoded maps, each starting 8 byte aligned
+        index   utf-8 json {map_id: [offset, size, parent_id, child_id]}
+    Levels saved again are appended and the index rewritten after every
+    level. The header is updated last so it always points to a complete
+    index. Space held by replaced levels is not reclaimed.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+
+from source.graph import DungeonNode, WorldGraph
+from source.mapfile import (HEADER as MAP_HEADER, RAW_VERSION, MapFileError,
+                            decode, encode)
+
+MAGIC = b'RLVS'
+VERSION = 1
+HEADER = struct.Struct('<4sHxxQQ')
+
+
+class LevelStore:
+    """
+        Levels keyed by map id in one file. The file is opened on first
+        use. new starts an empty store instead of opening an existing one.
+    """
+
+    __slots__ = ['path', 'new', 'file', 'index', 'lock']
+
+    def __init__(self, path: str, new: bool = False):
+        self.path = path
+        self.new = new
+        self.file = None
+        # map_id -> [offset, size, parent_id, child_id]
+        self.index = {}
+        # levels are saved from the map writer thread
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(path={self.path}, "
+                f"levels={len(self)})")
+
+    def __contains__(self, map_id) -> bool:
+        with self.lock:
+            self.open()
+            return map_id in self.index
+
+    def __len__(self) -> int:
+        with self.lock:
+            self.open()
+            return len(self.index)
+
+    def open(self):
+        if self.file:
+            return
+        if self.new or not os.path.exists(self.path):
+            self.file = open(self.path, 'w+b')
+            self.file.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+            self.file.flush()
+            self.new = False
+            return
+        self.file = open(self.path, 'r+b')
+        magic, version, offset, size = HEADER.unpack(
+            self.file.read(HEADER.size)
+        )
+        if magic != MAGIC:
+            raise MapFileError(f"{self.path} is not a level store")
+        if version != VERSION:
+            raise MapFileError(
+                f"{self.path} has unsupported version {version}"
+            )
+        if size:
+            self.file.seek(offset)
+            index = json.loads(self.file.read(size).decode('utf-8'))
+            self.index = {int(key): value for key, value in index.items()}
+
+    def save(self, map_id, data: bytes, parent_id=None, child_id=None):
+        """
+            Appends an encoded level. Levels encoded in the packed layout
+            are converted to RAW_VERSION first.
+        """
+        if MAP_HEADER.unpack_from(data)[1] != RAW_VERSION:
+            data = encode(*decode(data), raw=True)
+        with self.lock:
+            self.open()
+            end = self.file.seek(0, os.SEEK_END)
+            # pad so the level and its arrays stay aligned
+            self.file.write(b'\0' * (-end % 8))
+            offset = self.file.tell()
+            self.file.write(data)
+            self.index[map_id] = [offset, len(data), parent_id, child_id]
+            index = json.dumps(self.index).encode('utf-8')
+            index_offset = self.file.tell()
+            self.file.write(index)
+            self.file.flush()
+            self.file.seek(0)
+            self.file.write(HEADER.pack(
+                MAGIC, VERSION, index_offset, len(index)
+            ))
+            self.file.flush()
+
+    def load(self, map_id) -> tuple:
+        """
+            Returns the tilemap and entities of a stored level. Its tile
+            arrays are read lazily from the mapped store.
+        """
+        with self.lock:
+            self.open()
+            offset, size, *_ = self.index[map_id]
+            # each level gets its own map so changes made to one loaded
+            # level are never seen by the next load. The map stays alive as
+            # long as the arrays viewing it.
+            mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_COPY)
+        return decode(memoryview(mapped)[offset:offset + size], copy=False)
+
+    def world(self, start_id=None) -> WorldGraph:
+        """World graph of the stored levels built from the index"""
+        with self.lock:
+            self.open()
+            graph = {
+                map_id: DungeonNode(map_id, parent_id, child_id)
+                    for map_id, (_, _, parent_id, child_id)
+                        in self.index.items()
+            }
+        if start_id is None:
+            start_id = min(graph, default=None)
+        return WorldGraph(graph, start_id)
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
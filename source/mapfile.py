@@ -0,0 +1,365 @@
+# mapfile.py
+
+"""
+    Versioned binary save format for maps.
+
+    The tile layer is written as packed arrays and read back with
+    numpy.frombuffer so loading a map creates no object per tile. Tiles that
+    are also entities (doors, stairs) follow as fixed size records.
+
+    Layout (little endian):
+        header      magic, version, width, height, generation, meta size and
+                    entity count (see HEADER)
+        meta        utf-8 json: map type, chars, palette, labels, infos
+        chars       u8 index into meta chars per tile (RAW_VERSION: the
+                    '<U1' code point, 4 byte aligned)
+        colors      u8 index into palette per tile
+        names       u8 index into labels per tile
+        visibility  u8 per tile
+        blocks      bits packed with numpy.packbits (RAW_VERSION: bytes)
+        openable    bits packed with numpy.packbits (RAW_VERSION: bytes)
+        entities    ENTITY records. info indexes meta infos, opened is -1 for
+                    tiles that cannot be opened
+
+    >>> dump('saves/map_3.map', tilemap, [(eid, x, y, 'stairs', None)])
+    >>> tilemap, entities = load('saves/map_3.map')
+"""
+
+import json
+import os
+import pickle
+import queue
+import struct
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from source.description import env_char_to_name
+from source.ecs.components import (Information, Openable, Position, Render,
+                                   TileMap, Visibility)
+
+MAGIC = b'RMAP'
+VERSION = 1
+# unpacked layout: chars as 4 byte code points and one byte per flag so each
+# tile array can be mapped without decoding
+RAW_VERSION = 2
+HEADER = struct.Struct('<4sHHHIII')
+# bytes of encoded levels kept in memory by LevelCache
+LEVEL_CACHE_BUDGET = 16 * 1024 * 1024
+ENTITY = np.dtype([
+    ('eid', '<u4'),
+    ('x', '<u2'),
+    ('y', '<u2'),
+    ('info', 'u1'),
+    ('opened', 'i1'),
+])
+
+
+class MapFileError(Exception):
+    pass
+
+
+def encode(tilemap: TileMap, entities: list, raw: bool = False) -> bytes:
+    """
+        Returns tilemap and its tile entities in the map file format.
+        entities holds (eid, x, y, info name, opened) tuples with opened set
+        to None for tiles that cannot be opened. raw writes the RAW_VERSION
+        layout.
+    """
+    infos = sorted({entity[3] for entity in entities})
+    meta = {
+        'map_type': tilemap.map_type,
+        'palette': tilemap.palette,
+        'labels': tilemap.labels,
+        'infos': infos,
+    }
+    if raw:
+        chars = tilemap.chars.astype('<U1').tobytes()
+        bits = [tilemap.blocks.tobytes(), tilemap.openable.tobytes()]
+    else:
+        # unique code points sort much faster than unique strings
+        codes, indices = np.unique(
+            tilemap.chars.view(np.uint32),
+            return_inverse=True
+        )
+        meta['chars'] = ''.join(map(chr, codes.tolist()))
+        chars = indices.astype(np.uint8).tobytes()
+        bits = [np.packbits(tilemap.blocks).tobytes(),
+                np.packbits(tilemap.openable).tobytes()]
+    meta = json.dumps(meta).encode('utf-8')
+    if raw:
+        # pad with json whitespace so chars start 4 byte aligned
+        meta += b' ' * (-(HEADER.size + len(meta)) % 4)
+    records = np.array([
+        (eid, x, y, infos.index(info), -1 if opened is None else opened)
+            for eid, x, y, info, opened in entities
+    ], dtype=ENTITY)
+    return b''.join((
+        HEADER.pack(
+            MAGIC, RAW_VERSION if raw else VERSION,
+            tilemap.width, tilemap.height, tilemap.generation,
+            len(meta), len(records)
+        ),
+        meta,
+        chars,
+        tilemap.colors.tobytes(),
+        tilemap.names.tobytes(),
+        tilemap.visibility.tobytes(),
+        *bits,
+        records.tobytes(),
+    ))
+
+def write(path: str, data: bytes) -> None:
+    """
+        Writes to a temporary file first and renames it over path so a
+        reader never sees a partly written map
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+def dump(path: str, tilemap: TileMap, entities: list) -> None:
+    """Writes tilemap and its tile entities to path. See encode"""
+    write(path, encode(tilemap, entities))
+
+def load(path: str) -> (TileMap, list):
+    """Reads a map written by dump. Returns the tilemap and entity tuples"""
+    with open(path, 'rb') as f:
+        return decode(f.read())
+
+def decode(data: bytes, copy: bool = True) -> (TileMap, list):
+    """
+        Returns the tilemap and entity tuples of an encoded map. Without
+        copy the tile arrays of a RAW_VERSION map are views into data, which
+        must then be a writable buffer such as a copy on write mmap.
+    """
+    if copy:
+        # writable buffer so the arrays below can be views into it
+        data = bytearray(data)
+    if len(data) < HEADER.size:
+        raise MapFileError("data is too short to be a map")
+    magic, version, width, height, generation, size, count = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise MapFileError("data is not a map")
+    if version not in (VERSION, RAW_VERSION):
+        raise MapFileError(f"unsupported map version {version}")
+    offset = HEADER.size
+    meta = json.loads(bytes(data[offset:offset + size]).decode('utf-8'))
+    offset += size
+
+    def read(dtype, count):
+        nonlocal offset
+        array = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += array.nbytes
+        return array
+
+    tiles = width * height
+    shape = (height, width)
+    tilemap = TileMap(width, height, meta['map_type'])
+    if version == RAW_VERSION:
+        tilemap.chars = read('<U1', tiles).reshape(shape)
+    else:
+        chars = np.array(list(meta['chars']), dtype='<U1')
+        tilemap.chars = chars[read(np.uint8, tiles)].reshape(shape)
+    tilemap.colors = read(np.uint8, tiles).reshape(shape)
+    tilemap.names = read(np.uint8, tiles).reshape(shape)
+    tilemap.visibility = read(np.uint8, tiles).reshape(shape)
+    if version == RAW_VERSION:
+        tilemap.blocks = read(bool, tiles).reshape(shape)
+        tilemap.openable = read(bool, tiles).reshape(shape)
+    else:
+        packed = (tiles + 7) // 8
+        tilemap.blocks = np.unpackbits(read(np.uint8, packed), count=tiles) \
+            .view(bool).reshape(shape)
+        tilemap.openable = np.unpackbits(read(np.uint8, packed), count=tiles) \
+            .view(bool).reshape(shape)
+    tilemap.palette = meta['palette']
+    tilemap.labels = meta['labels']
+    tilemap.generation = generation
+    infos = meta['infos']
+    entities = [
+        (eid, x, y, infos[info], None if opened < 0 else bool(opened))
+            for eid, x, y, info, opened in read(ENTITY, count).tolist()
+    ]
+    return tilemap, entities
+
+def convert(source: str, destination: str) -> None:
+    """
+        Converts a map saved by the old pickle format to a map file. Every
+        tile was an entity of [Tile, Position, Render, Information,
+        Visibility, Openable?] and the TileMap only held its size and map
+        type. The tile arrays are rebuilt from the components, which are
+        matched by type. Doors and stairs stay entities, as in MapSystem.
+    """
+    with open(source, 'rb') as f:
+        tilemap = pickle.load(f)
+        tiles = pickle.load(f)
+    tilemap = TileMap(tilemap.width, tilemap.height, tilemap.map_type)
+    entities = []
+    for eid, group in tiles.items():
+        components = {type(component): component for component in group}
+        position = components[Position]
+        render = components[Render]
+        openable = components.get(Openable)
+        visibility = components.get(Visibility)
+        name = components[Information].name
+        if openable:
+            # old saves had the names of open and closed doors swapped
+            name = env_char_to_name[render.char]
+        x, y = position.x, position.y
+        tilemap.set_tile(
+            x, y, render.char, render.color, name,
+            blocks=position.blocks, openable=openable is not None
+        )
+        tilemap.visibility[y, x] = visibility.level if visibility else 0
+        if openable or render.char in '<>':
+            opened = openable.opened if openable else None
+            entities.append((eid, x, y, name, opened))
+    # a fresh map has not changed since it was loaded
+    tilemap.generation = 0
+    dump(destination, tilemap, entities)
+
+
+class MapWriter:
+    """
+        Writes encoded maps on a background thread. save() returns as soon
+        as the bytes are queued. wait() blocks until a key has no writes
+        left and flush() until every queued write is done. A failed write
+        is raised by the next wait() or flush() that covers it.
+        Each write calls write(key, data, *args). By default keys are paths
+        written with write().
+    """
+
+    __slots__ = ['write', 'queue', 'thread', 'pending', 'errors', 'condition']
+
+    def __init__(self, write=write):
+        self.write = write
+        self.queue = queue.Queue()
+        self.thread = None
+        # key -> number of queued writes not yet finished
+        self.pending = {}
+        self.errors = {}
+        self.condition = threading.Condition()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(pending={self.pending})"
+
+    def save(self, key, data: bytes, *args) -> None:
+        with self.condition:
+            self.pending[key] = self.pending.get(key, 0) + 1
+        if not self.thread:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        self.queue.put((key, data, args))
+
+    def run(self):
+        while True:
+            key, data, args = self.queue.get()
+            try:
+                self.write(key, data, *args)
+            except (OSError, MapFileError) as error:
+                with self.condition:
+                    self.errors[key] = error
+            finally:
+                with self.condition:
+                    self.pending[key] -= 1
+                    if not self.pending[key]:
+                        del self.pending[key]
+                    self.condition.notify_all()
+                self.queue.task_done()
+
+    def raise_error(self, keys):
+        with self.condition:
+            for key in keys:
+                if key in self.errors:
+                    raise MapFileError(
+                        f"could not write {key}"
+                    ) from self.errors.pop(key)
+
+    def wait(self, key) -> None:
+        """Blocks until every queued write to key is done"""
+        with self.condition:
+            self.condition.wait_for(lambda: key not in self.pending)
+        self.raise_error([key])
+
+    def flush(self) -> None:
+        """Blocks until every queued write is done"""
+        self.queue.join()
+        self.raise_error(list(self.errors))
+
+
+class LevelCache:
+    """
+        Least recently used cache of encoded levels keyed by map id. Levels
+        are kept in memory until their total size passes budget bytes. put()
+        returns the levels evicted to make room so they can be written to
+        disk.
+    """
+
+    __slots__ = ['budget', 'levels', 'size', 'hits', 'misses', 'evictions']
+
+    def __init__(self, budget: int = LEVEL_CACHE_BUDGET):
+        self.budget = budget
+        self.levels = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(levels={len(self.levels)}, "
+                f"size={self.size}, budget={self.budget}, hits={self.hits}, "
+                f"misses={self.misses}, evictions={self.evictions})")
+
+    def __contains__(self, map_id) -> bool:
+        return map_id in self.levels
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def get(self, map_id) -> bytes:
+        """Returns the encoded level or None if it is not cached"""
+        data = self.levels.get(map_id)
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.levels.move_to_end(map_id)
+        return data
+
+    def put(self, map_id, data: bytes) -> list:
+        """Caches data as the newest level. Returns evicted (map_id, data)"""
+        if map_id in self.levels:
+            self.size -= len(self.levels.pop(map_id))
+        self.levels[map_id] = data
+        self.size += len(data)
+        evicted = []
+        while self.size > self.budget:
+            evicted_id, evicted_data = self.levels.popitem(last=False)
+            self.size -= len(evicted_data)
+            self.evictions += 1
+            evicted.append((evicted_id, evicted_data))
+        return evicted
+
+    def stats(self) -> dict:
+        return {
+            'levels': len(self.levels),
+            'bytes': self.size,
+            'budget': self.budget,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+if __name__ == "__main__":
+    # py -m source.mapfile saves/map_0.pickle [saves/map_0.map]
+    source = sys.argv[1]
+    destination = sys.argv[2] if len(sys.argv) > 2 else \
+        source.rsplit('.', 1)[0] + '.map'
+    convert(source, destination)
+    print(f"converted {source} -> {destination}")
@@ -20,22 +20,45 @@ def octile(a, b, abs=abs):
     else:
         return .4 * dy + dx
 
-def astar(tiles, start, end, paths=squares, include_start=False):
-    heap = []
+def octile_int(a, b, abs=abs):
+    """Octile distance scaled by 10 so path costs add up without rounding"""
+    dx = abs(a[0] - b[0])
+    dy = abs(a[1] - b[1])
+    if dx < dy:
+        return 4 * dx + 10 * dy
+    else:
+        return 4 * dy + 10 * dx
+
+def astar(tiles, start, end, paths=squares, include_start=False, stats=None):
+    """
+        Heap entries are (f, h, g, node). Nodes with a known g score are
+        the open set so membership is a dictionary lookup. Improving a
+        node pushes a new entry instead of updating the heap and entries
+        left behind with a worse g score are skipped when popped.
+        Scores are integers so equal f values tie break on h.
+    """
+    goal = (end.x, end.y)
+    node = (start.x, start.y)
+    h = octile_int(node, goal)
+    heap = [(h, h, 0, node)]
     path = {}
     closed = set()
-    # holds score from current node to neighbor
-    gs = { (start.x, start.y): 0 }
-    # holds score from current node to end node
-    fs = { (start.x, start.y): octile((start.x, start.y), (end.x, end.y)) }
-    
-    heappush(heap, (fs[(start.x, start.y)], (start.x, start.y)))
+    # holds best known score from start node to each node
+    gs = { node: 0 }
+    directions = [
+        (i, j, octile_int((0, 0), (i, j)))
+            for i, j in paths(exclude_center=True)
+    ]
+    expanded = 0
 
     while heap:
-        current = heappop(heap)[1]
-        
+        _, _, g, current = heappop(heap)
+        # lazy deletion of entries with an outdated g score
+        if current in closed or g > gs[current]:
+            continue
+
         # node is found and path is returned in reverse
-        if current == (end.x, end.y):
+        if current == goal:
             data = []
             while current in path:
                 data.append(current)
@@ -43,26 +66,144 @@ def astar(tiles, start, end, paths=squares, include_start=False):
             data.reverse()
             if include_start:
                 data.insert(0, (start.x, start.y))
+            if stats is not None:
+                stats['expanded'] = expanded
             return data
 
         closed.add(current)
-        for i, j in paths(exclude_center=True):
-            neighbor = (current[0] + i, current[1] + j)
-            new_g = gs[current] + octile(current, neighbor)
+        expanded += 1
+        x, y = current
+        for i, j, cost in directions:
+            neighbor = (x + i, y + j)
             # skips blocked positions
             if neighbor not in tiles:
                 continue
-            # skips positions already in heap with a better g score
-            if neighbor in closed and new_g >= gs.get(neighbor, 0):
+            new_g = g + cost
+            # skips positions already reached with a better or equal score
+            if new_g >= gs.get(neighbor, math.inf):
                 continue
-            # update heap with new g score node
-            faster = new_g < gs.get(neighbor, 0)
-            unexplored = neighbor not in [i[1] for i in heap]
-            if faster or unexplored:
-                path[neighbor] = current
-                gs[neighbor] = new_g
-                fs[neighbor] = new_g + octile(neighbor, (end.x, end.y))
-                heappush(heap, (fs[neighbor], neighbor))
+            # a better score reopens a closed node
+            closed.discard(neighbor)
+            path[neighbor] = current
+            gs[neighbor] = new_g
+            h = octile_int(neighbor, goal)
+            heappush(heap, (new_g + h, h, new_g, neighbor))
+    if stats is not None:
+        stats['expanded'] = expanded
+    return []
+
+def jump(tiles, x, y, dx, dy, goal):
+    """
+        Walks from x, y in direction dx, dy and returns the first jump point
+        reached or None if the walk runs into a blocked tile. Diagonal
+        walks look for jump points along both straight components first.
+    """
+    while True:
+        x += dx
+        y += dy
+        if (x, y) not in tiles:
+            return None
+        if (x, y) == goal:
+            return x, y
+        if dx and dy:
+            # forced neighbors around a blocked corner
+            if (((x - dx, y + dy) in tiles and (x - dx, y) not in tiles) or
+                ((x + dx, y - dy) in tiles and (x, y - dy) not in tiles)):
+                return x, y
+            if (jump(tiles, x, y, dx, 0, goal) or
+                jump(tiles, x, y, 0, dy, goal)):
+                return x, y
+        elif dx:
+            if (((x + dx, y + 1) in tiles and (x, y + 1) not in tiles) or
+                ((x + dx, y - 1) in tiles and (x, y - 1) not in tiles)):
+                return x, y
+        else:
+            if (((x + 1, y + dy) in tiles and (x + 1, y) not in tiles) or
+                ((x - 1, y + dy) in tiles and (x - 1, y) not in tiles)):
+                return x, y
+
+def pruned(tiles, node, parent):
+    """Directions worth searching from node given the direction it came"""
+    if parent is None:
+        return list(squares(exclude_center=True))
+    x, y = node
+    dx = (x > parent[0]) - (x < parent[0])
+    dy = (y > parent[1]) - (y < parent[1])
+    directions = []
+    if dx and dy:
+        directions.extend(((0, dy), (dx, 0), (dx, dy)))
+        if (x - dx, y) not in tiles:
+            directions.append((-dx, dy))
+        if (x, y - dy) not in tiles:
+            directions.append((dx, -dy))
+    elif dx:
+        directions.append((dx, 0))
+        if (x, y + 1) not in tiles:
+            directions.append((dx, 1))
+        if (x, y - 1) not in tiles:
+            directions.append((dx, -1))
+    else:
+        directions.append((0, dy))
+        if (x + 1, y) not in tiles:
+            directions.append((1, dy))
+        if (x - 1, y) not in tiles:
+            directions.append((-1, dy))
+    return directions
+
+def jps(tiles, start, end, include_start=False, stats=None):
+    """
+        Jump point search. Same movement rules, costs and path format as
+        astar but only jump points are pushed on the heap. Straight lines
+        between jump points are filled back in when building the path.
+    """
+    goal = (end.x, end.y)
+    node = (start.x, start.y)
+    h = octile_int(node, goal)
+    heap = [(h, h, 0, node)]
+    path = {}
+    closed = set()
+    gs = { node: 0 }
+    expanded = 0
+
+    while heap:
+        _, _, g, current = heappop(heap)
+        if current in closed or g > gs[current]:
+            continue
+
+        if current == goal:
+            data = []
+            while current in path:
+                parent = path[current]
+                dx = (current[0] > parent[0]) - (current[0] < parent[0])
+                dy = (current[1] > parent[1]) - (current[1] < parent[1])
+                x, y = current
+                while (x, y) != parent:
+                    data.append((x, y))
+                    x, y = x - dx, y - dy
+                current = parent
+            data.reverse()
+            if include_start:
+                data.insert(0, (start.x, start.y))
+            if stats is not None:
+                stats['expanded'] = expanded
+            return data
+
+        closed.add(current)
+        expanded += 1
+        for dx, dy in pruned(tiles, current, path.get(current)):
+            point = jump(tiles, current[0], current[1], dx, dy, goal)
+            if point is None:
+                continue
+            new_g = g + octile_int(current, point)
+            if new_g >= gs.get(point, math.inf):
+                continue
+            closed.discard(point)
+            path[point] = current
+            gs[point] = new_g
+            h = octile_int(point, goal)
+            heappush(heap, (new_g + h, h, new_g, point))
+    if stats is not None:
+        stats['expanded'] = expanded
     return []
 
 def astar_gui(tiles, start, end, paths=squares):
@@ -163,11 +304,7 @@ def bresenhams(tiles, start, end):
     return points
 
 def pathfind(engine, start, end, pathfinder=astar):
-    """Wrapper for ecs engine to use astar"""
-    tiles = {
-        (position.x, position.y)
-            for _, position in join_drop_key(engine.tiles, engine.positions)
-                if not position.blocks
-    }
-    path = pathfinder(tiles, start, end)
+    """Wrapper for ecs engine to use astar on the cached walkable tiles"""
+    tilemap = engine.tilemaps.find(engine.world.id)
+    path = pathfinder(tilemap.walkable_tiles(), start, end)
     return path
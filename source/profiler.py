@@ -0,0 +1,195 @@
+# profiler.py
+
+"""
+    Opt-in timing of system calls.
+
+    Profiler wraps the process and update methods of each system instance
+    it is attached to (see System.instrument), so nothing is measured and no
+    wrapper is called unless profiling was asked for:
+    >>> profiler = Profiler(allocations=True)
+    >>> engine.profile(profiler)
+    >>> engine.run()
+    >>> print(profiler.report())
+    >>> profiler.dump_trace('saves/trace.json')
+
+    Each call records its wall time and, when allocations are traced, the
+    change in memory traced by tracemalloc. Times include the time spent in
+    systems called from inside a system, e.g. turn_system.process includes
+    ai_system.process. Per call times are kept in a rolling window used for
+    the percentiles and histograms of the reports. The trace file is in the
+    Chrome trace event format read by chrome://tracing and Perfetto.
+"""
+
+import functools
+import json
+import time
+import tracemalloc
+from collections import deque
+
+# number of most recent calls kept per system method
+WINDOW = 1000
+# upper bounds in microseconds of the histogram buckets
+BUCKETS = (10, 100, 1000, 10000, 100000)
+# calls kept for the trace file
+TRACE_LIMIT = 100000
+
+
+class Record:
+    """Totals and recent call times of one system method"""
+
+    __slots__ = ['name', 'calls', 'time', 'allocated', 'recent']
+
+    def __init__(self, name: str, window: int = WINDOW):
+        self.name = name
+        self.calls = 0
+        self.time = 0.0
+        self.allocated = 0
+        # seconds taken by the most recent calls
+        self.recent = deque(maxlen=window)
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(name={self.name}, "
+                f"calls={self.calls}, time={self.time:.6f})")
+
+    def add(self, elapsed: float, allocated: int) -> None:
+        self.calls += 1
+        self.time += elapsed
+        self.allocated += allocated
+        self.recent.append(elapsed)
+
+    def percentile(self, percent: float) -> float:
+        """Seconds taken by the call at percent of the rolling window"""
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def histogram(self) -> dict:
+        """Counts of the rolling window by bucket upper bound (us)"""
+        counts = {bound: 0 for bound in BUCKETS + (float('inf'),)}
+        for elapsed in self.recent:
+            micros = elapsed * 1e6
+            for bound in counts:
+                if micros <= bound:
+                    counts[bound] += 1
+                    break
+        return counts
+
+
+class Profiler:
+    """
+        Collects a Record per system method. turn_hook, if set, is called
+        with the report of the calls made since the last end_turn().
+    """
+
+    __slots__ = [
+        'allocations', 'window', 'records', 'turn', 'turns', 'events',
+        'start', 'turn_hook'
+    ]
+
+    def __init__(self, allocations: bool = False, window: int = WINDOW):
+        self.allocations = allocations
+        self.window = window
+        self.records = {}
+        # records of the calls made during the current turn
+        self.turn = {}
+        self.turns = 0
+        self.events = deque(maxlen=TRACE_LIMIT)
+        self.start = time.perf_counter()
+        self.turn_hook = None
+        if allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(records={len(self.records)}, "
+                f"turns={self.turns})")
+
+    def wrap(self, name: str, method):
+        """Returns method recording each of its calls under name"""
+        @functools.wraps(method)
+        def profiled(*args, **kwargs):
+            allocated = tracemalloc.get_traced_memory()[0] \
+                if self.allocations else 0
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                if self.allocations:
+                    allocated = tracemalloc.get_traced_memory()[0] - allocated
+                self.record(name, start, end, allocated)
+        return profiled
+
+    def record(self, name: str, start: float, end: float, allocated: int):
+        for records in (self.records, self.turn):
+            record = records.get(name)
+            if record is None:
+                record = records[name] = Record(name, self.window)
+            record.add(end - start, allocated)
+        self.events.append((name, start, end, allocated))
+
+    def end_turn(self) -> None:
+        """Closes the current turn and passes its report to turn_hook"""
+        if not self.turn:
+            return
+        self.turns += 1
+        if self.turn_hook:
+            self.turn_hook(self.report(self.turn))
+        self.turn = {}
+
+    def report(self, records: dict = None) -> str:
+        """
+            Table of the records, slowest total time first, followed by the
+            histograms of their rolling windows
+        """
+        if records is None:
+            records = self.records
+        ordered = sorted(records.values(), key=lambda r: -r.time)
+        lines = [
+            f"{'system':<28}{'calls':>8}{'total ms':>11}{'mean us':>10}"
+            f"{'p50 us':>9}{'p99 us':>9}{'alloc kb':>10}"
+        ]
+        for record in ordered:
+            lines.append(
+                f"{record.name:<28}{record.calls:>8}"
+                f"{record.time * 1e3:>11.3f}"
+                f"{record.time / record.calls * 1e6:>10.1f}"
+                f"{record.percentile(50) * 1e6:>9.1f}"
+                f"{record.percentile(99) * 1e6:>9.1f}"
+                f"{record.allocated / 1024:>10.1f}"
+            )
+        # calls of the rolling window by time taken
+        lines.append('')
+        lines.append(
+            f"{'histogram':<28}"
+            + ''.join(f"{f'<={bound}us':>11}" for bound in BUCKETS)
+            + f"{f'>{BUCKETS[-1]}us':>11}"
+        )
+        for record in ordered:
+            lines.append(f"{record.name:<28}" + ''.join(
+                f"{count:>11}" for count in record.histogram().values()
+            ))
+        return '\n'.join(lines)
+
+    def trace(self) -> dict:
+        """Recorded calls as complete events of the Chrome trace format"""
+        return {
+            'traceEvents': [
+                {
+                    'name': name,
+                    'cat': 'system',
+                    'ph': 'X',
+                    'ts': (start - self.start) * 1e6,
+                    'dur': (end - start) * 1e6,
+                    'pid': 0,
+                    'tid': 0,
+                    'args': {'allocated': allocated},
+                }
+                    for name, start, end, allocated in self.events
+            ],
+            'displayTimeUnit': 'ms',
+        }
+
+    def dump_trace(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.trace(), f)
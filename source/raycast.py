@@ -1,11 +1,23 @@
 # raycast.py
 
 """
-    Uses raycast algorithm to determine visibility
+    Uses raycast or shadowcast algorithms to determine visibility.
+    Both return the set of (x, y) coordinates lit from the player position,
+    which includes the player position and the first blocking tile hit.
+
+    The two do not light the same tiles. raycast steps 361 rounded rays
+    (Bresenham like) out from the viewer, so a ray can graze past the
+    corner of a wall and light a tile that cannot see the viewer back, and
+    its rounded ends reach a little past the radius on the diagonals.
+    shadowcast is symmetric: a floor tile is lit only if the viewer would
+    also be lit from it, and its reach is the radius + 0.5 circle.
 """
 import math
+import textwrap
 import time
 
+import numpy as np
+
 from source.common import j, join, join_drop_key
 from source.tables import costable, sintable
 
@@ -22,31 +34,27 @@ def no_tilemap_error(world_id, components):
 def distance(x, y, a, b, d=10) -> float:
     return math.sqrt((x - a) ** 2 + (y - b) ** 2)
 
-def get_tiles(engine, x0, x1, y0, y1) -> list:
-    tiles = []
-    for v, p in join_drop_key(engine.visibilities, engine.positions):
-        if (p.map_id == engine.world.id and x0 <= p.x < x1 and y0 <= p.y < y1):
-            tiles.append((v, p))
-    return tiles
-    # return [
-    #     (v, p)
-    #         for v, p in join_drop_key(
-    #             engine.visibilities,
-    #             engine.positions
-    #         )
-    #         if p.map_id == engine.world.id
-    #             and x0 <= p.x < x1
-    #             and y0 <= p.y < y1
-    # ]
-
-def get_blocked(tiles) -> set:
-    return {
-        (position.x, position.y)
-            for _, position in tiles
-                if position.blocks
-    }
-
-def raycast(tiles, blocked, width, height, player):
+def get_blocked(tilemap, x0, x1, y0, y1) -> set:
+    """Returns the coordinates of tiles blocking light inside the window"""
+    chars = tilemap.chars[y0:y1, x0:x1]
+    window = tilemap.blocks[y0:y1, x0:x1] & (chars != ' ')
+    return {(x + x0, y + y0) for y, x in np.argwhere(window).tolist()}
+
+def update_visibility(tilemap, lighted, x0, x1, y0, y1) -> None:
+    """
+        All tiles found have their visiblities set to max visibility else
+        their visibility level is set based on their last visibility level
+    """
+    window = tilemap.visibility[y0:y1, x0:x1]
+    np.minimum(window, 1, out=window)
+    height, width = window.shape
+    for x, y in lighted:
+        if 0 <= x - x0 < width and 0 <= y - y0 < height:
+            window[y - y0, x - x0] = 2
+    # cells without a tile are never visible
+    window[tilemap.chars[y0:y1, x0:x1] == ' '] = 0
+
+def raycast(blocked, width, height, player, radius=10):
     # start with player position which is always lighted
     lighted = {(player.x, player.y)}
     integer, r = int, round
@@ -54,7 +62,7 @@ def raycast(tiles, blocked, width, height, player):
         ax, ay = sintable[i], costable[i]
         # pull values out so access is localized
         x, y = player.x, player.y
-        for z in range(10):
+        for z in range(radius):
             x += ax
             y += ay
             if not (0 <= x < width and 0 <= y < height):
@@ -63,24 +71,80 @@ def raycast(tiles, blocked, width, height, player):
             lighted.add((rx, ry))
             if (rx, ry) in blocked:
                 break
+    return lighted
+
+# quadrant transforms of (depth, column) offsets into (x, y) offsets
+QUADRANTS = (
+    (0, -1, 1, 0), # north
+    (0, 1, 1, 0),  # south
+    (1, 0, 0, 1),  # east
+    (-1, 0, 0, 1), # west
+)
+
+def shadowcast(blocked, width, height, player, radius=10):
+    """
+        Symmetric recursive shadowcasting. Each quadrant is scanned row by
+        row, every cell of a row is visited once and rows only recurse into
+        the unshadowed slope ranges. Slopes are kept as integer fractions
+        (numerator, denominator) so column bounds round exactly.
+        Floor tiles are lit if their center lies inside the scanned slopes,
+        which makes sight symmetric. Blocking tiles are lit when reached.
+        Unlike raycast no tile is lit by a ray grazing a wall corner, so on
+        maps with scattered walls the lit sets differ (see module docstring).
+    """
+    ox, oy = player.x, player.y
+    lighted = {(ox, oy)}
+    # radius + 0.5 circle to match the reach of a rounded ray of radius steps
+    rr = radius * (radius + 1)
+
+    def scan(depth, sn, sd, en, ed, rx, ry, cx, cy):
+        if depth > radius:
+            return
+        prev_wall = None
+        min_col = (2 * depth * sn + sd) // (2 * sd)
+        max_col = -((ed - 2 * depth * en) // (2 * ed))
+        for col in range(min_col, max_col + 1):
+            x = ox + depth * rx + col * cx
+            y = oy + depth * ry + col * cy
+            inside = 0 <= x < width and 0 <= y < height
+            wall = not inside or (x, y) in blocked
+            if (inside and col * col + depth * depth <= rr and
+                (wall or (col * sd >= depth * sn and col * ed <= depth * en))):
+                lighted.add((x, y))
+            if prev_wall is False and wall:
+                scan(depth + 1, sn, sd, 2 * col - 1, 2 * depth, rx, ry, cx, cy)
+            elif prev_wall and not wall:
+                sn, sd = 2 * col - 1, 2 * depth
+            prev_wall = wall
+        if prev_wall is False:
+            scan(depth + 1, sn, sd, en, ed, rx, ry, cx, cy)
 
-    # all blocks found have their visiblities set to max visibility else
-    # their visibility level is set based on their last visibility level
-    for visible, position in tiles:
-        if (position.x, position.y) in lighted:
-            visible.level = 2
-        else:
-            visible.level = max(0, min(visible.level, 1))
+    for rx, ry, cx, cy in QUADRANTS:
+        scan(1, -1, 1, 1, 1, rx, ry, cx, cy)
     return lighted
 
 def cast_light(
         engine,
         x0, x1, y0, y1,
-        tilebuilder=get_tiles,
         blockfunc=get_blocked,
-        raycaster=raycast
+        raycaster=shadowcast,
+        entity=None,
+        radius=10
     ):
-    """Wrapper for raycast so that engine is not a parameter to raycast"""
+    """
+        Wrapper for raycast so that engine is not a parameter to raycast.
+        Lights the map from the player, updating the explored map, the
+        tiles in view and the cached field of view, and returns the lit
+        set. Given another entity the lit set from its position is only
+        returned, leaving the player's view untouched.
+    """
+    if entity is not None and entity != engine.player:
+        position = engine.positions.find(entity)
+        tilemap = engine.tilemaps.find(position.map_id)
+        blocked = blockfunc(tilemap, x0, x1, y0, y1)
+        return raycaster(
+            blocked, tilemap.width, tilemap.height, position, radius
+        )
     player = engine.positions.find(engine.player)
     tilemap = engine.tilemaps.find(engine.world.id)
     
@@ -88,15 +152,26 @@ def cast_light(
         no_tilemap_error(engine.world.id, engine.tilemaps.components.keys())
         exit(0)
 
-    tiles = tilebuilder(engine, x0, x1, y0, y1)
-    blocked = get_blocked(tiles)
+    # reuse the last result while the viewer and blockers have not changed
+    key = (
+        player.map_id, player.x, player.y, radius, tilemap.generation,
+        x0, x1, y0, y1, blockfunc, raycaster
+    )
+    if tilemap.fov and tilemap.fov[0] == key:
+        engine.tiles_in_view = tilemap.fov[1]
+        return engine.tiles_in_view
+
+    blocked = blockfunc(tilemap, x0, x1, y0, y1)
     engine.tiles_in_view = raycaster(
-        tiles,
         blocked,
         tilemap.width,
         tilemap.height,
-        player
+        player,
+        radius
     )
+    update_visibility(tilemap, engine.tiles_in_view, x0, x1, y0, y1)
+    tilemap.fov = key, engine.tiles_in_view
+    return engine.tiles_in_view
 
 # TODO: more research on which built-in data struct is better: set, list, dict
 def raycast2(tiles, blocked, width, height, player):
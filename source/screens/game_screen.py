@@ -175,7 +175,7 @@ class GameScreen(Screen):
                     raise
 
     def update_effects(self):
-        self.engine.effects.components.clear()
+        self.engine.effects.clear()
 
     def render_melee_hit_effect(self, x, y, render, effect):
         self.render_char(x, y, effect.char, 0)
@@ -278,7 +278,18 @@ class GameScreen(Screen):
                         previous = positions
 
     def render(self):
-        self.terminal.clear()
+        map_panel, *panels = self.panels
+        if self.engine.full_redraw:
+            self.terminal.clear()
+            map_panel.level_panel.invalidate()
+            self.engine.full_redraw = False
+        else:
+            # the level panel only redraws cells that changed. Text panels
+            # are cleared and drawn again
+            for panel in panels:
+                self.terminal.clear_area(
+                    panel.x, panel.y, panel.width, panel.height
+                )
 
         for panel in self.panels:
             panel.render()
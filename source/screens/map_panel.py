@@ -2,7 +2,7 @@
 
 """Map and Level panels. Map panel is a wrapper class for Level"""
 
-import time
+import numpy as np
 
 from source.common import (GameMode, circle, diamond, join, join_drop_key,
                            scroll)
@@ -13,12 +13,50 @@ from .panel import Panel
 
 
 class LevelPanel(Panel):
-    __slots__ = "terminal engine x y width height cam_x cam_y".split()
+    """
+        Draws the visible part of the current map. Each frame is built as a
+        back buffer of (char, color) cells keyed by panel coordinates and
+        only cells that differ from the previous frame are sent to the
+        terminal. invalidate() forgets the previous frame so the next one is
+        drawn in full, which is needed after the terminal was cleared.
+        stats holds cells written by the last frame and in total, and
+        stats_hook is called with it after every frame if set.
+    """
+    __slots__ = (
+        "terminal engine x y width height cam_x cam_y buffer stats "
+        "stats_hook"
+    ).split()
     def __init__(self, terminal, engine, x, y, width, height):
         super().__init__(terminal, x, y, width, height, None)
         self.engine = engine
         self.cam_x = None
         self.cam_y = None
+        self.buffer = {}
+        self.stats = {'frames': 0, 'full': 0, 'cells': 0, 'total': 0}
+        self.stats_hook = None
+
+    def invalidate(self):
+        self.buffer = {}
+
+    def draw(self, frame):
+        """Writes the cells of frame that changed since the last frame"""
+        full = not self.buffer
+        written = 0
+        for (x, y), cell in frame.items():
+            if self.buffer.get((x, y)) != cell:
+                self.add_string(x, y, *cell)
+                written += 1
+        # cells drawn last frame but not this one are erased
+        for x, y in self.buffer.keys() - frame.keys():
+            self.add_string(x, y, ' ')
+            written += 1
+        self.buffer = frame
+        self.stats['frames'] += 1
+        self.stats['full'] += full
+        self.stats['cells'] = written
+        self.stats['total'] += written
+        if self.stats_hook:
+            self.stats_hook(self.stats)
 
     def render(self):
         player = self.engine.positions.find(self.engine.player)
@@ -34,29 +72,26 @@ class LevelPanel(Panel):
         else:
             self.cam_y = scroll(player.y, self.height, tilemap.height)
         y0, y1 = self.cam_y, self.height + self.cam_y
+        # tile entities are only kept for chunks near the camera
+        self.engine.map_system.stream(player.map_id, x0, x1, y0, y1)
 
         # do line of sight calculations
         cast_light(self.engine, x0, x1, y0, y1)
 
-        start = time.time()
-        # draw map first, then items, then units
-        for visibility, position, render in join_drop_key(
-            self.engine.visibilities,
-            self.engine.positions,
-            self.engine.renders
-        ):
-            if (visibility.level > 0
-                and player.map_id == position.map_id
-                and x0 <= position.x < x1 
-                and y0 <= position.y < y1
-            ):
-                c = render.color if visibility.level > 1 else "darkest grey"
-                self.add_string(
-                    position.x - self.cam_x,
-                    position.y - self.cam_y,
-                    render.char,
-                    c
-                )
+        # build the frame from the map first, then units, then the cursor
+        frame = {}
+        visibility = tilemap.visibility[y0:y1, x0:x1].tolist()
+        chars = tilemap.chars[y0:y1, x0:x1].tolist()
+        colors = tilemap.colors[y0:y1, x0:x1].tolist()
+        palette = tilemap.palette
+        explored = np.argwhere(tilemap.visibility[y0:y1, x0:x1] > 0)
+        for y, x in explored.tolist():
+            if visibility[y][x] > 1:
+                c = palette[colors[y][x]]
+            else:
+                c = "darkest grey"
+            # window coordinates are already relative to the camera
+            frame[(x, y)] = (chars[y][x], c)
 
         self.engine.entities_in_view.clear()
         for eid, (health, position, render, info) in join(
@@ -72,9 +107,7 @@ class LevelPanel(Panel):
             ):
                 if self.engine.player != eid:
                     self.engine.entities_in_view.add(eid)
-                self.add_string(
-                    position.x - self.cam_x,
-                    position.y - self.cam_y,
+                frame[(position.x - self.cam_x, position.y - self.cam_y)] = (
                     render.char,
                     render.color
                 )
@@ -97,10 +130,9 @@ class LevelPanel(Panel):
             # self.render_cursor(visible_tiles, player.map_id, cam_x, cam_y, x0, x1, y0, y1)
             position = self.engine.positions.find(self.engine.cursor)
             if self.engine.mode in (GameMode.LOOKING, GameMode.DEBUG):
-                self.add_string(
-                    position.x - self.cam_x,
-                    position.y - self.cam_y,
-                    'X'
+                frame[(position.x - self.cam_x, position.y - self.cam_y)] = (
+                    'X',
+                    None
                 )
             elif self.engine.mode == GameMode.MAGIC:
                 cursor = self.engine.cursors.find(self.engine.cursor)
@@ -112,13 +144,13 @@ class LevelPanel(Panel):
                         y = position.y + yy
                         if (x, y) not in self.engine.tiles_in_view:
                             continue
-                        self.add_string(
-                            x - cam_x,
-                            y - cam_y,
+                        frame[(x - self.cam_x, y - self.cam_y)] = (
                             render.char,
                             render.color
                         )
 
+        self.draw(frame)
+
 class MapPanel(Panel):
     __slots__ =  "terminal x y width height title level_panel".split()
     def __init__(self, terminal, engine, x, y, width, height, title):
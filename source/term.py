@@ -2,9 +2,17 @@
 
 """Wrapper class for any terminal used (i.e. blt term, curses term, etc...)"""
 
+import enum
+import re
+from collections import deque
+
+from bearlibterminal import terminal as blt
+
+
 class Terms(enum.Enum):
     blt = enum.auto()
     curses = enum.auto()
+    headless = enum.auto()
 
 class Terminal:
     def __init__(self, term, term_type):
@@ -15,3 +23,129 @@ class Terminal:
             raise NotImplementedError("differentiate between curses and blt")
         else:
             raise NotImplementedError("differentiate between curses and blt")
+
+
+# [[ and ]] are escaped brackets, other bracketed text is markup
+MARKUP = re.compile(r"\[\[|\]\]|\[([^\]]*)\]|\n|.", re.S)
+
+
+class HeadlessTerminal:
+    """
+        Stands in for bearlibterminal.terminal without a window. printf
+        writes (char, color) cells into an in-memory grid and read() returns
+        keys from a scripted queue, so full game frames can run on servers
+        and in benchmarks.
+        >>> term = HeadlessTerminal(keys=['ENTER', 'KP_6*20'])
+        >>> engine = ecs_setup(term, dungeons['shadowbarrow'])
+        >>> engine.run()
+
+        Keys are TK_* codes or names without the TK_ prefix, optionally
+        repeated with *N. Once the script runs out read() alternates close
+        and escape, which confirms quitting from every screen, so a run
+        always ends.
+    """
+    def __init__(self, width: int = 80, height: int = 25, keys=()):
+        self.width = width
+        self.height = height
+        self.cells = {}
+        self.keys = deque()
+        self.closing = False
+        self.frames = 0
+        self.writes = 0
+        self.press(*keys)
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(width={self.width}, "
+                f"height={self.height}, keys={len(self.keys)}, "
+                f"frames={self.frames}, writes={self.writes})")
+
+    def press(self, *keys) -> None:
+        """Queues keys for read()"""
+        for key in keys:
+            if isinstance(key, str):
+                key, _, repeat = key.partition('*')
+                code = getattr(blt, f"TK_{key.upper()}")
+                self.keys.extend([code] * int(repeat or 1))
+            else:
+                self.keys.append(key)
+
+    def read(self) -> int:
+        if self.keys:
+            return self.keys.popleft()
+        self.closing = not self.closing
+        return self.TK_CLOSE if self.closing else self.TK_ESCAPE
+
+    def has_input(self) -> bool:
+        return True
+
+    def state(self, code: int) -> int:
+        if code == self.TK_WIDTH:
+            return self.width
+        if code == self.TK_HEIGHT:
+            return self.height
+        return 0
+
+    def printf(self, x: int, y: int, string) -> None:
+        self.writes += 1
+        colors = [None]
+        column = x
+        for match in MARKUP.finditer(str(string)):
+            text, tag = match.group(), match.group(1)
+            if text == '\n':
+                column, y = x, y + 1
+                continue
+            if tag is not None:
+                if tag.startswith('color='):
+                    colors.append(tag[len('color='):])
+                elif tag == '/color' and len(colors) > 1:
+                    colors.pop()
+                elif tag.startswith(('0x', 'U+')):
+                    # glyph codes such as [0xE200+0]
+                    code = tag.replace('U+', '0x').split('+')[0]
+                    self.put(column, y, int(code, 16), colors[-1])
+                    column += 1
+                continue
+            self.put(column, y, text[0], colors[-1])
+            column += 1
+
+    def put(self, x: int, y: int, char, color=None) -> None:
+        if 0 <= x < self.width and 0 <= y < self.height:
+            if isinstance(char, int):
+                char = chr(char)
+            self.cells[(x, y)] = (char, color)
+
+    def clear(self) -> None:
+        self.cells.clear()
+
+    def clear_area(self, x: int, y: int, width: int, height: int) -> None:
+        for i in range(x, x + width):
+            for j in range(y, y + height):
+                self.cells.pop((i, j), None)
+
+    def refresh(self) -> None:
+        self.frames += 1
+
+    def open(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+    def set(self, options: str) -> bool:
+        return True
+
+    def cell(self, x: int, y: int) -> tuple:
+        """(char, color) drawn at x, y"""
+        return self.cells.get((x, y), (' ', None))
+
+    def screen(self) -> str:
+        """Text of the whole grid, one line per row"""
+        return '\n'.join(
+            ''.join(self.cell(x, y)[0] for x in range(self.width)).rstrip()
+                for y in range(self.height)
+        )
+
+# same key and state codes as bearlibterminal
+for name in dir(blt):
+    if name.startswith('TK_'):
+        setattr(HeadlessTerminal, name, getattr(blt, name))
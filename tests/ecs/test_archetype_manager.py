@@ -0,0 +1,66 @@
+# test_archetype_manager.py
+
+"""Testing archetype storage and archetype backed joins"""
+
+from source.common import join, join_drop_key
+from source.ecs import Position, Render, Visibility
+from source.ecs.managers import ArchetypeManager, ComponentManager
+
+
+def setup_managers():
+    archetypes = ArchetypeManager()
+    positions = ComponentManager(Position, archetypes=archetypes)
+    renders = ComponentManager(Render, archetypes=archetypes)
+    visibilities = ComponentManager(Visibility, archetypes=archetypes)
+    return archetypes, positions, renders, visibilities
+
+def test_entities_with_same_components_share_archetype():
+    archetypes, positions, renders, _ = setup_managers()
+    for eid in range(3):
+        positions.add(eid, Position(eid, eid))
+        renders.add(eid, Render())
+    assert len(archetypes.archetypes) == 2
+    table = archetypes.locations[0]
+    assert table is archetypes.locations[2]
+    assert table.entities == [0, 1, 2]
+
+def test_remove_keeps_rows_packed():
+    archetypes, positions, renders, _ = setup_managers()
+    for eid in range(3):
+        positions.add(eid, Position(eid, eid))
+        renders.add(eid, Render())
+    renders.remove(0)
+    table = archetypes.locations[1]
+    assert table.entities == [2, 1]
+    assert table.columns['positions'][0] is positions.find(2)
+    assert archetypes.locations[0].signature == frozenset(('positions',))
+
+def test_join_uses_matching_rows_only():
+    _, positions, renders, visibilities = setup_managers()
+    for eid in range(4):
+        positions.add(eid, Position(eid, eid))
+        renders.add(eid, Render())
+        if eid % 2:
+            visibilities.add(eid, Visibility())
+    found = {
+        eid: (p, v) for eid, (p, v) in join(positions, visibilities)
+    }
+    assert set(found) == {1, 3}
+    assert found[3][0] is positions.find(3)
+    assert len(list(join_drop_key(positions, renders))) == 4
+
+def test_replacing_component_updates_query():
+    _, positions, renders, _ = setup_managers()
+    positions.add(0, Position())
+    renders.add(0, Render('.'))
+    renders.add(0, Render('#'))
+    (_, render), = join_drop_key(positions, renders)
+    assert render.char == '#'
+
+def test_clear_removes_from_archetypes():
+    archetypes, positions, renders, _ = setup_managers()
+    positions.add(0, Position())
+    renders.add(0, Render())
+    renders.clear()
+    assert not list(join(positions, renders))
+    assert archetypes.locations[0].signature == frozenset(('positions',))
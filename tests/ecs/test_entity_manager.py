@@ -5,6 +5,8 @@
 from pytest import raises
 
 from source.ecs.managers import EntityManager
+from source.ecs.managers.entity_manager import (entity_generation, entity_id,
+                                                entity_index)
 
 
 def test_entity_manager_next_id_with_manual_entity_id():
@@ -21,3 +23,47 @@ def test_entity_manager_duplicate_manual_entity_id():
 
     with raises(ValueError):
         em.add(e)
+
+def test_entity_manager_tagged_populations():
+    em = EntityManager()
+    player = em.create('actors')
+    sword = em.create('items')
+    cursor = em.create()
+    goblin = em.create('actors')
+    assert em.tagged('actors') == [player, goblin]
+    assert em.tagged('items') == [sword]
+    assert em.count('tiles') == 0 and em.tagged('unknown') == []
+    em.remove(player)
+    assert em.tagged('actors') == [goblin]
+    # an item picked up by a unit stays a single population member
+    em.tag(sword, 'items')
+    assert em.tagged('items') == [sword] and cursor not in em.tags
+
+def test_entity_manager_add_with_tag():
+    em = EntityManager()
+    em.add(5, 'spells')
+    assert em.tagged('spells') == [5]
+    em.tag(5, 'items')
+    assert em.tagged('spells') == [] and em.tagged('items') == [5]
+
+def test_entity_manager_recycles_slots_with_new_generation():
+    em = EntityManager()
+    first, second = em.create(), em.create()
+    assert (first, second) == (0, 1)
+    em.remove(first)
+    assert not em.alive(first) and em.alive(second)
+    third = em.create('items')
+    # same slot, different id
+    assert entity_index(third) == entity_index(first)
+    assert entity_generation(third) == 1 and third != first
+    assert em.capacity == 2 and len(em) == 2
+    with raises(ValueError):
+        em.remove(first)
+
+def test_entity_manager_add_frees_skipped_slots():
+    em = EntityManager()
+    em.add(entity_id(3, 2))
+    assert em.capacity == 4 and em.alive(entity_id(3, 2))
+    assert [em.create() for _ in range(3)] == [0, 1, 2]
+    em.remove(entity_id(3, 2))
+    assert em.next_id == entity_id(3, 3)
@@ -0,0 +1,67 @@
+# test_map_system.py
+
+"""Testing the tile entities kept while changing levels"""
+
+import random
+
+import numpy as np
+import pytest
+
+from source.__main__ import create_save_folder_if_not_exists, ecs_setup
+from source.ecs.systems.commands.command_stairs import go_down, go_up
+from source.maps import dungeons
+from source.screens import GameScreen
+from source.term import HeadlessTerminal
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    # saves are written to the saves folder of the working directory
+    monkeypatch.chdir(tmp_path)
+    create_save_folder_if_not_exists()
+    random.seed(0)
+    np.random.seed(0)
+    engine = ecs_setup(HeadlessTerminal(), dungeons['ruined'])
+    engine.add_screen(GameScreen)
+    yield engine
+    engine.map_system.shutdown()
+
+def take_stairs(engine, char):
+    """Moves the player onto the stairs, streams their tiles and takes them"""
+    tilemap = engine.tilemaps.find(engine.world.id)
+    x, y = tilemap.find(char)
+    position = engine.positions.find(engine.player)
+    engine.positions.remove(engine.player)
+    position.x, position.y, position.map_id = x, y, engine.world.id
+    engine.positions.add(engine.player, position)
+    engine.map_system.request_around(engine.world.id, x, y, 40)
+    assert (go_down if char == '>' else go_up)(engine, engine.player)
+    position = engine.positions.find(engine.player)
+    engine.map_system.request_around(
+        engine.world.id, position.x, position.y, 40
+    )
+
+def test_map_system_stairs_keep_entity_count(engine):
+    counts = []
+    for _ in range(3):
+        take_stairs(engine, '>')
+        take_stairs(engine, '<')
+        counts.append(len(engine.entities.entity_ids))
+    # the cave and its map entity are only made on the first visit
+    assert counts[0] == counts[1] == counts[2]
+    tiles = engine.entities.tagged('tiles')
+    assert sorted(tiles) == sorted(engine.tiles.components)
+    assert all(engine.entities.alive(tile) for tile in tiles)
+
+def test_map_system_frees_tile_ids_of_left_levels(engine):
+    take_stairs(engine, '>')
+    take_stairs(engine, '>')
+    take_stairs(engine, '<')
+    take_stairs(engine, '<')
+    # only the tiles of the current map and one entity per map are left
+    assert engine.entities.count('tiles') == len(engine.tiles.components)
+    assert engine.entities.count('maps') == 3
+
+
+if __name__ == "__main__":
+    print("Usage: py -m pytest tests\\ecs\\test_map_system.py")
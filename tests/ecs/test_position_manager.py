@@ -0,0 +1,53 @@
+# test_position_manager.py
+
+"""Testing the spatial index kept by the position manager"""
+
+import pickle
+
+from source.ecs import Position
+from source.ecs.managers import PositionManager
+
+
+def setup_positions():
+    positions = PositionManager(Position)
+    positions.add(0, Position(1, 1, map_id=7))
+    positions.add(1, Position(1, 1, map_id=7))
+    positions.add(2, Position(4, 3, map_id=7))
+    positions.add(3, Position(1, 1, map_id=8))
+    return positions
+
+def test_at_returns_entities_on_tile():
+    positions = setup_positions()
+    assert {eid for eid, _ in positions.at(7, 1, 1)} == {0, 1}
+    assert positions.at(7, 2, 2) == []
+
+def test_index_follows_coordinate_mutation():
+    positions = setup_positions()
+    position = positions.find(0)
+    position.x += 1
+    position.y += 1
+    assert [eid for eid, _ in positions.at(7, 2, 2)] == [0]
+    assert {eid for eid, _ in positions.at(7, 1, 1)} == {1}
+
+def test_index_follows_add_and_remove():
+    positions = setup_positions()
+    old = positions.find(2)
+    positions.add(2, Position(5, 5, map_id=7))
+    old.x = 1
+    assert positions.at(7, 4, 3) == []
+    assert {eid for eid, _ in positions.at(7, 1, 1)} == {0, 1}
+    positions.remove(2)
+    assert positions.at(7, 5, 5) == []
+
+def test_in_rect_and_in_radius():
+    positions = setup_positions()
+    assert {eid for eid, _ in positions.in_rect(7, 0, 0, 5, 4)} == {0, 1, 2}
+    assert {eid for eid, _ in positions.in_rect(7, 0, 0, 3, 3)} == {0, 1}
+    assert {eid for eid, _ in positions.in_radius(7, 1, 1, 2)} == {0, 1}
+    assert {eid for eid, _ in positions.in_radius(7, 1, 1, 4)} == {0, 1, 2}
+
+def test_pickled_position_drops_observer():
+    positions = setup_positions()
+    position = pickle.loads(pickle.dumps(positions.find(0)))
+    assert position.observer is None
+    assert (position.x, position.y, position.map_id) == (1, 1, 7)
@@ -0,0 +1,43 @@
+# test_query.py
+
+"""Testing persistent queries kept up to date by component managers"""
+
+from source.ecs import Position, Render
+from source.ecs.managers import ComponentManager, Query
+
+
+def setup_query():
+    positions = ComponentManager(Position)
+    renders = ComponentManager(Render)
+    for eid in range(3):
+        positions.add(eid, Position(eid, eid))
+    renders.add(1, Render())
+    return positions, renders, Query(positions, renders)
+
+def test_query_initial_entities():
+    _, _, query = setup_query()
+    assert set(query.keys()) == {1}
+
+def test_query_tracks_add_and_remove():
+    positions, renders, query = setup_query()
+    renders.add(2, Render())
+    assert 2 in query
+    positions.remove(1)
+    assert set(query.keys()) == {2}
+    assert query.invalidations == 2
+
+def test_query_replacing_component_is_not_an_invalidation():
+    _, renders, query = setup_query()
+    renders.add(1, Render('#'))
+    (_, render), = query.values()
+    assert render.char == '#'
+    assert query.invalidations == 0
+
+def test_query_hit_rate():
+    _, renders, query = setup_query()
+    list(query)
+    list(query)
+    renders.clear()
+    list(query)
+    assert (query.hits, query.misses) == (1, 2)
+    assert len(query) == 0
@@ -0,0 +1,94 @@
+# test_scheduler.py
+
+"""Testing the turn order kept by the scheduler"""
+
+from collections import Counter
+from types import SimpleNamespace
+
+from source.ecs import Input, Turn
+from source.ecs.managers import ComponentManager, Scheduler
+from source.ecs.managers.scheduler import ROUND
+from source.ecs.systems import EnergySystem
+
+
+def play_round(scheduler, delays=None):
+    """Returns the actors of one round in turn order"""
+    order = []
+    while not scheduler.round_over():
+        entity = scheduler.peek()
+        order.append(entity)
+        scheduler.done(entity, (delays or {}).get(entity, ROUND))
+    scheduler.next_round()
+    return order
+
+def setup_scheduler(actors=3):
+    inputs = ComponentManager(Input)
+    for eid in range(actors):
+        inputs.add(eid, Input())
+    return inputs, Scheduler(inputs)
+
+def test_scheduler_rounds_keep_order():
+    _, scheduler = setup_scheduler()
+    assert play_round(scheduler) == [0, 1, 2]
+    assert play_round(scheduler) == [0, 1, 2]
+    assert scheduler.rounds == 2
+
+def test_scheduler_speeds():
+    _, scheduler = setup_scheduler()
+    # 0 is twice as fast and 2 is half as fast
+    delays = {0: ROUND // 2, 2: ROUND * 2}
+    assert play_round(scheduler, delays) == [0, 1, 2, 0]
+    assert play_round(scheduler, delays) == [0, 1, 0]
+    assert play_round(scheduler, delays) == [0, 1, 2, 0]
+
+def test_scheduler_removed_and_added_actors():
+    inputs, scheduler = setup_scheduler()
+    entity = scheduler.peek()
+    scheduler.done(entity)
+    # removed mid round before acting
+    inputs.remove(1)
+    inputs.add(5, Input())
+    assert play_round(scheduler) == [2, 5]
+    assert play_round(scheduler) == [0, 2, 5]
+    assert 1 not in scheduler and len(scheduler) == 3
+
+def test_scheduler_drops_stale_entries():
+    inputs, scheduler = setup_scheduler(40)
+    for eid in range(1, 40):
+        inputs.remove(eid)
+    for _ in range(5):
+        assert play_round(scheduler) == [0]
+    assert len(scheduler.heap) <= 2 * len(scheduler) + 16
+
+def setup_energy(speeds):
+    engine = SimpleNamespace(logger=None, turns=ComponentManager(Turn))
+    for eid, speed in speeds.items():
+        engine.turns.add(eid, Turn(tick_amount=speed))
+    return EnergySystem(engine)
+
+def test_scheduler_energy_speed_ratio():
+    _, scheduler = setup_scheduler(2)
+    # 0 gains energy 1.5 times as fast as 1
+    energy = setup_energy({0: 150, 1: 100})
+    turns = Counter()
+    for _ in range(20):
+        while not scheduler.round_over():
+            entity = scheduler.peek()
+            turns[entity] += 1
+            scheduler.done(entity, energy.delay(entity))
+        scheduler.next_round()
+    assert turns == {0: 30, 1: 20}
+
+def test_scheduler_energy_stalled():
+    energy = setup_energy({0: 0, 1: 100})
+    assert energy.stalled(0) and not energy.stalled(1)
+    assert not energy.stalled(2)
+    assert energy.delay(0) == ROUND
+
+def test_scheduler_empty():
+    _, scheduler = setup_scheduler(0)
+    assert scheduler.peek() is None and scheduler.round_over()
+
+
+if __name__ == "__main__":
+    print("Usage: py -m pytest tests\\ecs\\test_scheduler.py")
@@ -0,0 +1,56 @@
+# test_tilemap.py
+
+"""Testing the numpy tile layer held by tilemaps"""
+
+from source.ecs import TileMap
+
+
+def setup_tilemap():
+    tilemap = TileMap(4, 3)
+    for x in range(4):
+        for y in range(3):
+            tilemap.set_tile(x, y, '.', 'grey', 'floor', blocks=False)
+    tilemap.set_tile(0, 0, '#', 'white', 'wall', blocks=True)
+    tilemap.set_tile(2, 1, '+', 'brown', 'closed door', True, True)
+    tilemap.set_tile(3, 2, '>', 'white', 'down stairs')
+    return tilemap
+
+def test_tilemap_defaults_to_void():
+    tilemap = TileMap(2, 2)
+    assert not tilemap.exists().any()
+    assert not tilemap.floors().any()
+
+def test_tilemap_tile_properties():
+    tilemap = setup_tilemap()
+    assert tilemap.char(2, 1) == '+'
+    assert tilemap.color(0, 0) == 'white'
+    assert tilemap.name(3, 2) == 'down stairs'
+    assert tilemap.openable[1, 2] and tilemap.blocks[1, 2]
+    # palette entries are shared between tiles of the same color
+    assert tilemap.palette == [None, 'grey', 'white', 'brown']
+
+def test_tilemap_floors_and_find():
+    tilemap = setup_tilemap()
+    floors = tilemap.coordinates(tilemap.floors())
+    assert (0, 0) not in floors and (2, 1) not in floors
+    assert (3, 2) in floors
+    assert len(floors) == 10
+    assert tilemap.find('>') == (3, 2)
+    assert tilemap.find('<') is None
+
+def test_tilemap_generation_bumps_on_blocks_change():
+    tilemap = setup_tilemap()
+    generation = tilemap.generation
+    tilemap.set_tile(1, 1, '*', 'crimson', 'bloodied floor')
+    assert tilemap.generation == generation
+    tilemap.set_tile(2, 1, '/', 'brown', 'opened door', blocks=False)
+    assert tilemap.generation == generation + 1
+
+def test_tilemap_walkable_cache_invalidates_on_blocks_change():
+    tilemap = setup_tilemap()
+    tiles = tilemap.walkable_tiles()
+    assert tilemap.walkable_tiles() is tiles
+    assert (2, 1) not in tiles
+    tilemap.set_tile(2, 1, '/', 'brown', 'opened door', blocks=False)
+    assert (2, 1) in tilemap.walkable_tiles()
+    assert tilemap.walkable()[1, 2]
@@ -4,7 +4,7 @@
 
 from collections import namedtuple
 
-from source.pathfind import octile
+from source.pathfind import astar, jps, octile, octile_int
 
 node = namedtuple("Node", "x y")
 
@@ -26,6 +26,54 @@ def test_hueristic_diagonal2():
     b = node(-1, -1)
     assert int(octile(a, b) * 10) == 14
 
+def open_room(width, height):
+    return {(x, y) for x in range(width) for y in range(height)}
+
+def test_astar_straight_path_excludes_start():
+    path = astar(open_room(5, 5), node(0, 0), node(4, 0))
+    assert path == [(1, 0), (2, 0), (3, 0), (4, 0)]
+
+def test_astar_include_start():
+    path = astar(open_room(5, 5), node(0, 0), node(2, 2), include_start=True)
+    assert path == [(0, 0), (1, 1), (2, 2)]
+
+def test_astar_paths_around_wall():
+    tiles = open_room(5, 5) - {(2, 0), (2, 1), (2, 2), (2, 3)}
+    stats = {}
+    path = astar(tiles, node(0, 0), node(4, 0), stats=stats)
+    assert (2, 4) in path
+    assert path[-1] == (4, 0)
+    assert all(p in tiles for p in path)
+    assert stats['expanded'] > 0
+
+def test_astar_no_path():
+    tiles = open_room(5, 5) - {(2, y) for y in range(5)}
+    assert astar(tiles, node(0, 0), node(4, 0)) == []
+
+def path_cost(start, path):
+    points = [start] + path
+    return sum(octile_int(a, b) for a, b in zip(points, points[1:]))
+
+def test_jps_matches_astar_cost_around_walls():
+    tiles = open_room(9, 7) - {(4, y) for y in range(6)} - {(6, 3), (7, 3)}
+    start, end = node(0, 0), node(8, 0)
+    expected = astar(tiles, start, end)
+    path = jps(tiles, start, end)
+    assert path[-1] == (8, 0)
+    assert path_cost((0, 0), path) == path_cost((0, 0), expected)
+    points = [(0, 0)] + path
+    # every step moves to an adjacent walkable tile
+    assert all(
+        max(abs(a[0] - b[0]), abs(a[1] - b[1])) == 1 and b in tiles
+            for a, b in zip(points, points[1:])
+    )
+
+def test_jps_include_start_and_no_path():
+    path = jps(open_room(5, 5), node(0, 0), node(4, 4), include_start=True)
+    assert path == [(0, 0), (1, 1), (2, 2), (3, 3), (4, 4)]
+    tiles = open_room(5, 5) - {(2, y) for y in range(5)}
+    assert jps(tiles, node(0, 0), node(4, 0)) == []
+
 
 if __name__ == "__main__":
     print("Usage: py -m pytest tests\\test_astar.py")
@@ -0,0 +1,52 @@
+# test_chunks.py
+
+"""Testing chunk loading and unloading of large tilemaps"""
+
+from source.chunks import ChunkTracker, chunk_bounds, chunk_of
+
+
+def setup_tracker():
+    tracker = ChunkTracker(7, 100, 70, size=32, margin=0)
+    events = []
+    tracker.subscribe(events.append)
+    return tracker, events
+
+def test_chunk_coordinates():
+    assert chunk_of(31, 32) == (0, 1)
+    assert chunk_bounds((1, 2)) == (32, 64, 64, 96)
+
+def test_chunk_tracker_loads_requested_window():
+    tracker, events = setup_tracker()
+    tracker.request(30, 40, 0, 10)
+    assert tracker.loaded == {(0, 0), (1, 0)}
+    assert [(e.map_id, e.chunk, e.loaded) for e in events] == [
+        (7, (0, 0), True), (7, (1, 0), True)
+    ]
+    # loaded chunks are not loaded again
+    tracker.request(0, 10, 0, 10)
+    assert len(events) == 2
+
+def test_chunk_tracker_margin_and_bounds():
+    tracker = ChunkTracker(0, 100, 70, size=32, margin=1)
+    tracker.request_around(0, 0, 2)
+    assert tracker.loaded == {(0, 0), (1, 0), (0, 1), (1, 1)}
+    # windows past the edge of the map are clipped
+    tracker.request(90, 200, 60, 200)
+    assert (3, 2) in tracker.loaded and (4, 3) not in tracker.loaded
+
+def test_chunk_tracker_sweeps_chunks_not_requested():
+    tracker, events = setup_tracker()
+    tracker.request(0, 10, 0, 10)
+    tracker.sweep()
+    assert tracker.loaded == {(0, 0)}
+    tracker.request(64, 70, 40, 50)
+    tracker.sweep()
+    assert tracker.loaded == {(2, 1)}
+    assert (events[-1].chunk, events[-1].loaded) == ((0, 0), False)
+    tracker.clear()
+    assert not tracker.loaded
+    assert tracker.loads == tracker.unloads == 2
+
+
+if __name__ == "__main__":
+    print("Usage: py -m pytest tests\\test_chunks.py")
@@ -0,0 +1,85 @@
+# test_generate_grid.py
+
+"""Testing the numpy cave pipeline against the list based one"""
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from source.generate import (add_boundry_to_matrix, array_to_matrix,
+                             cell_auto, flood_fill, flood_fill_grid,
+                             generate_cave, generate_poisson_array,
+                             label_grid, replace_cell_with_stairs,
+                             seeded_cave, shuffled_tail)
+
+
+def generate_cave_matrix(width, height, steps=4):
+    matrix = array_to_matrix(
+        generate_poisson_array(width, height),
+        width, height,
+        filter=lambda x: x < 3 or x >= 8
+    )
+    matrix = add_boundry_to_matrix(matrix, bounds=1)
+    for i in range(steps):
+        matrix = cell_auto(matrix, deadlimit=5+(i-5))
+    matrix = flood_fill(matrix)
+    return replace_cell_with_stairs(matrix)
+
+def test_generate_cave_matches_matrix_pipeline():
+    for seed in range(20):
+        np.random.seed(seed)
+        random.seed(seed)
+        expected = generate_cave_matrix(58, 17)
+        state = random.random()
+        np.random.seed(seed)
+        random.seed(seed)
+        assert generate_cave(58, 17).tolist() == expected
+        # stairs are picked with the same random draws
+        assert random.random() == state
+
+def test_flood_fill_grid_keeps_first_of_equal_regions():
+    for seed in range(200):
+        rng = np.random.RandomState(seed)
+        grid = np.where(rng.rand(5, 6) < 0.5, '#', '.')
+        expected = flood_fill(grid.tolist())
+        assert flood_fill_grid(grid).tolist() == expected
+
+def test_label_grid():
+    mask = np.array([
+        [1, 1, 0, 1],
+        [0, 1, 0, 1],
+        [1, 1, 1, 1],
+        [0, 0, 0, 0],
+        [1, 0, 1, 1],
+    ], dtype=bool)
+    labels = label_grid(mask)
+    assert (labels[:3][mask[:3]] == 0).all()
+    assert labels[4, 0] == 16
+    assert labels[4, 2] == labels[4, 3] == 18
+    assert (labels[~mask] == -1).all()
+
+def test_shuffled_tail_matches_shuffle():
+    for length in (2, 3, 4, 17, 64, 65, 1000):
+        for seed in range(20):
+            random.seed(seed)
+            order = list(range(length))
+            random.shuffle(order)
+            expected = (order[-1], order[-2], random.random())
+            random.seed(seed)
+            assert shuffled_tail(length) + (random.random(),) == expected
+
+def test_seeded_cave_matches_worker_process():
+    random.seed(3)
+    state = random.random()
+    random.seed(3)
+    cave = seeded_cave(42, 58, 17)
+    # the global random state is left as it was
+    assert random.random() == state
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(seeded_cave, 42, 58, 17).result() == cave
+    assert seeded_cave(43, 58, 17) != cave
+
+
+if __name__ == "__main__":
+    print("Usage: py -m pytest tests\\test_generate_grid.py")
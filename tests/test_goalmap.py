@@ -0,0 +1,76 @@
+# test_goalmap.py
+
+"""Test dijkstra goal maps"""
+
+import numpy as np
+
+from source.ecs import TileMap
+from source.goalmap import GoalMap, descend, dijkstra, flee
+
+
+def corridor():
+    """5x7 room split by a wall with a gap in the bottom row"""
+    walkable = np.ones((5, 7), dtype=bool)
+    walkable[:4, 3] = False
+    return walkable
+
+def test_dijkstra_costs():
+    field = dijkstra(corridor(), [(0, 0)])
+    assert field[0, 0] == 0
+    assert field[0, 1] == 10 and field[1, 1] == 14
+    assert np.isinf(field[0, 3])
+    # the far side is only reached through the gap
+    assert field[0, 6] > field[4, 3]
+
+def test_dijkstra_multiple_goals():
+    field = dijkstra(corridor(), [(0, 0), (6, 0)])
+    assert field[0, 0] == field[0, 6] == 0
+    assert field[0, 5] == 10
+
+def test_descend_follows_gradient_to_goal():
+    field = dijkstra(corridor(), [(0, 0)])
+    x, y, steps = 6, 0, 0
+    while (x, y) != (0, 0):
+        dx, dy = descend(field, x, y)
+        x, y, steps = x + dx, y + dy, steps + 1
+    assert steps == 8
+    assert descend(field, 0, 0) is None
+
+def test_flee_moves_away_from_goal():
+    walkable = corridor()
+    field = dijkstra(walkable, [(0, 0)])
+    away = flee(field, walkable)
+    dx, dy = descend(away, 1, 1)
+    assert field[1 + dy, 1 + dx] > field[1, 1]
+
+def test_goal_map_rebuilds_only_on_change():
+    tilemap = TileMap(7, 5)
+    tilemap.chars[:] = '.'
+    tilemap.blocks[:] = False
+    goal_map = GoalMap()
+    goal_map.update(0, tilemap, [(0, 0)])
+    goal_map.update(0, tilemap, [(0, 0)])
+    assert goal_map.builds == 1
+    tilemap.set_tile(3, 3, '#', None, 'wall', blocks=True)
+    goal_map.update(0, tilemap, [(0, 0)])
+    goal_map.update(0, tilemap, [(1, 0)])
+    assert goal_map.builds == 3
+    assert goal_map.step(2, 0) == (-1, 0)
+
+def test_goal_map_lazy_steps_match_full_field():
+    tilemap = TileMap(7, 5)
+    tilemap.chars[:] = '.'
+    tilemap.blocks[:] = ~corridor()
+    field = dijkstra(corridor(), [(0, 0)])
+    away = flee(field, corridor())
+    for inverted, full in ((False, field), (True, away)):
+        goal_map = GoalMap(inverted=inverted)
+        goal_map.update(0, tilemap, [(0, 0)])
+        # nearest tile first so the search has only expanded a little
+        assert goal_map.step(1, 0) == descend(full, 1, 0)
+        for y, x in np.argwhere(corridor()).tolist():
+            assert goal_map.step(x, y) == descend(full, x, y)
+
+
+if __name__ == "__main__":
+    print("Usage: py -m pytest tests\\test_goalmap.py")
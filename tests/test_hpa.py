@@ -0,0 +1,74 @@
+# test_hpa.py
+
+"""Test hierarchical pathfinding over tilemaps and world levels"""
+
+from collections import namedtuple
+
+from source.ecs import TileMap
+from source.graph import DungeonNode, WorldGraph
+from source.hpa import HierarchicalMap, WorldPlanner
+
+node = namedtuple("Node", "x y")
+
+def room(width, height, walls=()):
+    tilemap = TileMap(width, height)
+    tilemap.chars[:] = '.'
+    tilemap.blocks[:] = False
+    for x, y in walls:
+        tilemap.chars[y, x] = '#'
+        tilemap.blocks[y, x] = True
+    return tilemap
+
+def is_walk(tilemap, start, path):
+    points = [start] + path
+    return all(
+        max(abs(a[0] - b[0]), abs(a[1] - b[1])) == 1
+            and tilemap.walkable()[b[1], b[0]]
+                for a, b in zip(points, points[1:])
+    )
+
+def test_path_crosses_clusters():
+    tilemap = room(24, 12, walls=[(11, y) for y in range(11)])
+    hierarchy = HierarchicalMap(tilemap, size=4)
+    path = hierarchy.find_path(node(0, 0), node(23, 0))
+    assert path[-1] == (23, 0)
+    assert (11, 11) in path
+    assert is_walk(tilemap, (0, 0), path)
+
+def test_include_start_and_same_tile():
+    hierarchy = HierarchicalMap(room(8, 8), size=4)
+    assert hierarchy.find_path(node(1, 1), node(1, 1)) == []
+    path = hierarchy.find_path(node(1, 1), node(6, 6), include_start=True)
+    assert path[0] == (1, 1) and path[-1] == (6, 6)
+
+def test_door_change_rebuilds_only_nearby_clusters():
+    walls = [(11, y) for y in range(12)]
+    tilemap = room(24, 12, walls=walls)
+    hierarchy = HierarchicalMap(tilemap, size=4)
+    assert hierarchy.find_path(node(0, 0), node(23, 0)) == []
+    rebuilds = hierarchy.rebuilds
+    tilemap.set_tile(11, 5, '/', None, 'opened door', blocks=False)
+    path = hierarchy.find_path(node(0, 0), node(23, 0))
+    assert (11, 5) in path
+    assert hierarchy.rebuilds - rebuilds < len(hierarchy.nodes)
+    assert hierarchy.edges == HierarchicalMap(tilemap, size=4).edges
+
+def test_world_planner_follows_stairs():
+    upper = room(10, 10)
+    upper.chars[8, 8] = '>'
+    lower = room(10, 10)
+    lower.chars[1, 1] = '<'
+    world = WorldGraph({
+        0: DungeonNode(0, child_id=1),
+        1: DungeonNode(1, parent_id=0),
+    }, 0)
+    planner = WorldPlanner(world, {0: upper, 1: lower}.get, size=4)
+    legs = planner.plan(0, node(0, 0), 1, node(5, 1))
+    assert [map_id for map_id, _ in legs] == [0, 1]
+    assert legs[0][1][-1] == (8, 8)
+    assert legs[1][1] == [(2, 1), (3, 1), (4, 1), (5, 1)]
+    assert planner.plan(1, node(1, 1), 0, node(0, 0))[-1][1][-1] == (0, 0)
+
+
+if __name__ == "__main__":
+    print("Usage: py -m pytest tests\\test_hpa.py")
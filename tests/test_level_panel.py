@@ -0,0 +1,41 @@
+# test_level_panel.py
+
+"""Testing the frame diff of the level panel back buffer"""
+
+from source.screens.map_panel import LevelPanel
+
+
+class Terminal:
+    def __init__(self):
+        self.writes = []
+    def printf(self, x, y, string):
+        self.writes.append((x, y, string))
+
+def test_level_panel_draws_only_changed_cells():
+    terminal = Terminal()
+    panel = LevelPanel(terminal, None, 2, 1, 10, 5)
+    frames = []
+    panel.stats_hook = lambda stats: frames.append(stats['cells'])
+    panel.draw({(0, 0): ('#', None), (1, 0): ('.', None), (2, 0): ('@', None)})
+    assert len(terminal.writes) == 3
+    terminal.writes.clear()
+    # the unit moved from (2, 0) to (1, 0)
+    panel.draw({(0, 0): ('#', None), (1, 0): ('@', None)})
+    assert sorted(terminal.writes) == [(3, 1, '@'), (4, 1, ' ')]
+    assert frames == [3, 2]
+    assert panel.stats['total'] == 5 and panel.stats['full'] == 1
+
+def test_level_panel_invalidate_redraws_everything():
+    terminal = Terminal()
+    panel = LevelPanel(terminal, None, 0, 0, 10, 5)
+    frame = {(0, 0): ('#', None), (1, 0): ('.', None)}
+    panel.draw(frame)
+    panel.draw(dict(frame))
+    assert panel.stats['cells'] == 0
+    panel.invalidate()
+    panel.draw(dict(frame))
+    assert panel.stats['cells'] == 2 and panel.stats['full'] == 2
+
+
+if __name__ == "__main__":
+    print("Usage: py -m pytest tests\\test_level_panel.py")
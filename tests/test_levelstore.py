@@ -0,0 +1,60 @@
+# test_levelstore.py
+
+"""Testing the memory mapped level store"""
+
+import numpy as np
+
+from source.ecs.components import TileMap
+from source.levelstore import LevelStore
+from source.mapfile import encode
+
+
+def setup_tilemap(char='.'):
+    tilemap = TileMap(6, 4, 'cave')
+    for x in range(6):
+        for y in range(4):
+            tilemap.set_tile(x, y, char, 'grey', 'floor', blocks=False)
+    tilemap.set_tile(0, 0, '#', 'white', 'wall', blocks=True)
+    tilemap.set_tile(3, 2, '+', 'brown', 'closed door', True, True)
+    return tilemap
+
+def test_level_store_round_trip(tmp_path):
+    path = str(tmp_path / 'levels.store')
+    store = LevelStore(path)
+    tilemap = setup_tilemap()
+    entities = [(9, 3, 2, 'closed door', False)]
+    store.save(0, encode(tilemap, entities), None, 5)
+    store.save(5, encode(setup_tilemap("'"), []), 0, None)
+    loaded, loaded_entities = store.load(0)
+    assert loaded_entities == entities
+    for name in ('chars', 'blocks', 'colors', 'openable', 'names'):
+        assert np.array_equal(getattr(loaded, name), getattr(tilemap, name))
+    # arrays are views into the mapped store
+    assert not loaded.chars.flags.owndata
+    # and changing them does not change the store
+    loaded.set_tile(3, 2, '/', 'brown', 'opened door', blocks=False)
+    assert store.load(0)[0].char(3, 2) == '+'
+    assert store.load(5)[0].char(1, 1) == "'"
+    store.close()
+
+def test_level_store_index_is_world_directory(tmp_path):
+    path = str(tmp_path / 'levels.store')
+    store = LevelStore(path)
+    store.save(0, encode(setup_tilemap(), []), None, 5)
+    store.save(5, encode(setup_tilemap(), []), 0, None)
+    # saving again replaces the level
+    store.save(0, encode(setup_tilemap("'"), []), None, 5)
+    store.close()
+    reopened = LevelStore(path)
+    assert len(reopened) == 2
+    assert reopened.load(0)[0].char(1, 1) == "'"
+    world = reopened.world()
+    assert world.id == 0
+    assert world.go_down() and world.id == 5
+    assert world.node.parent_id == 0
+    reopened.close()
+    assert len(LevelStore(path, new=True)) == 0
+
+
+if __name__ == "__main__":
+    print("Usage: py -m pytest tests\\test_levelstore.py")
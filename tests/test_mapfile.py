@@ -0,0 +1,158 @@
+# test_mapfile.py
+
+"""Testing the binary map save format"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from source.ecs.components import (Information, Openable, Position, Render,
+                                   Tile, TileMap, Visibility)
+from source.mapfile import (LevelCache, MapFileError, MapWriter, convert,
+                            decode, dump, encode, load)
+
+
+def setup_tilemap():
+    tilemap = TileMap(5, 3, 'cave')
+    for x in range(5):
+        for y in range(3):
+            tilemap.set_tile(x, y, '.', 'grey', 'floor', blocks=False)
+    tilemap.set_tile(0, 0, '#', 'white', 'wall', blocks=True)
+    tilemap.set_tile(2, 1, '+', 'brown', 'closed door', True, True)
+    tilemap.set_tile(4, 2, '>', 'white', 'stairs down')
+    tilemap.visibility[1, :] = 1
+    return tilemap
+
+def assert_same_tilemap(tilemap, loaded):
+    for name in ('chars', 'blocks', 'colors', 'visibility', 'openable', 'names'):
+        assert np.array_equal(getattr(tilemap, name), getattr(loaded, name))
+        assert getattr(loaded, name).dtype == getattr(tilemap, name).dtype
+    assert loaded.palette == tilemap.palette
+    assert loaded.labels == tilemap.labels
+    assert loaded.map_type == tilemap.map_type
+    assert loaded.generation == tilemap.generation
+
+def test_mapfile_round_trip(tmp_path):
+    tilemap = setup_tilemap()
+    entities = [(7, 2, 1, 'closed door', False), (8, 4, 2, 'stairs down', None)]
+    path = str(tmp_path / 'map_0.map')
+    dump(path, tilemap, entities)
+    loaded, loaded_entities = load(path)
+    assert_same_tilemap(tilemap, loaded)
+    assert loaded_entities == entities
+    # loaded arrays can still be written to
+    loaded.set_tile(2, 1, '/', 'brown', 'opened door', blocks=False)
+    assert loaded.char(2, 1) == '/' and not loaded.blocks[1, 2]
+
+def baseline_tilemap(width, height, map_type):
+    """A TileMap as pickled before the tile arrays existed"""
+    tilemap = TileMap.__new__(TileMap)
+    tilemap.width, tilemap.height, tilemap.map_type = width, height, map_type
+    return tilemap
+
+def test_mapfile_converts_pickle(tmp_path):
+    rows = ['#./', '.+>']
+    tiles = {}
+    for y, row in enumerate(rows):
+        for x, char in enumerate(row):
+            # door names as the old saves had them, swapped
+            name = {'#': 'wall', '.': 'floor', '+': 'opened door',
+                    '/': 'closed door', '>': 'down stairs'}[char]
+            group = [
+                Tile(),
+                Position(x, y, map_id=0, blocks=char in '#+'),
+                Render(char, 'grey' if char == '#' else 'white'),
+                Information(name),
+                Visibility(2 if y else 1),
+            ]
+            if char in '+/':
+                group.append(Openable(opened=char == '/'))
+            tiles[10 + y * 3 + x] = group
+    source = str(tmp_path / 'map_0.pickle')
+    with open(source, 'wb') as f:
+        pickle.dump(baseline_tilemap(3, 2, 'town'), f, pickle.HIGHEST_PROTOCOL)
+        pickle.dump(tiles, f, pickle.HIGHEST_PROTOCOL)
+    destination = str(tmp_path / 'map_0.map')
+    convert(source, destination)
+    loaded, entities = load(destination)
+    assert (loaded.width, loaded.height, loaded.map_type) == (3, 2, 'town')
+    assert [''.join(row) for row in loaded.chars] == rows
+    assert loaded.blocks.tolist() == [[True, False, False],
+                                      [False, True, False]]
+    assert loaded.openable.tolist() == [[False, False, True],
+                                        [False, True, False]]
+    assert loaded.visibility.tolist() == [[1, 1, 1], [2, 2, 2]]
+    assert loaded.color(0, 0) == 'grey'
+    assert loaded.name(1, 1) == 'closed door'
+    assert loaded.name(2, 0) == 'opened door'
+    # only doors and stairs stay entities
+    assert entities == [
+        (12, 2, 0, 'opened door', True),
+        (14, 1, 1, 'closed door', False),
+        (15, 2, 1, 'down stairs', None)
+    ]
+
+def test_position_loads_baseline_pickle_state():
+    # positions were pickled as (None, slots) before x and y became
+    # properties
+    position = Position.__new__(Position)
+    position.__setstate__((None, {
+        'x': 3, 'y': 4, 'map_id': 0, 'blocks': True,
+        'movement_type': Position.MovementType.NONE,
+    }))
+    assert (position.x, position.y, position.map_id) == (3, 4, 0)
+    assert position.blocks and position.observer is None
+
+def test_mapfile_rejects_other_files(tmp_path):
+    path = tmp_path / 'map_0.map'
+    path.write_bytes(b'not a map file at all')
+    with pytest.raises(MapFileError):
+        load(str(path))
+
+def test_map_writer_saves_snapshot(tmp_path):
+    tilemap = setup_tilemap()
+    writer = MapWriter()
+    path = str(tmp_path / 'map_0.map')
+    writer.save(path, encode(tilemap, []))
+    # changes after saving are not part of the snapshot
+    tilemap.set_tile(1, 1, '#', 'white', 'wall', blocks=True)
+    writer.wait(path)
+    loaded, _ = load(path)
+    assert loaded.char(1, 1) == '.'
+    assert not (tmp_path / 'map_0.map.tmp').exists()
+    writer.save(path, encode(tilemap, []))
+    writer.flush()
+    assert load(path)[0].char(1, 1) == '#'
+
+def test_map_writer_raises_failed_writes(tmp_path):
+    writer = MapWriter()
+    path = str(tmp_path / 'missing' / 'map_0.map')
+    writer.save(path, encode(setup_tilemap(), []))
+    with pytest.raises(MapFileError):
+        writer.wait(path)
+    # the error is only raised once
+    writer.flush()
+
+def test_level_cache_evicts_least_recently_used():
+    tilemap = setup_tilemap()
+    data = encode(tilemap, [])
+    cache = LevelCache(budget=len(data) * 2)
+    assert cache.put(0, data) == []
+    assert cache.put(1, data) == []
+    # touching level 0 makes level 1 the oldest
+    assert decode(cache.get(0))[0].char(2, 1) == '+'
+    assert cache.put(2, data) == [(1, data)]
+    assert 1 not in cache and cache.get(1) is None
+    assert cache.stats() == {
+        'levels': 2,
+        'bytes': len(data) * 2,
+        'budget': len(data) * 2,
+        'hits': 1,
+        'misses': 1,
+        'evictions': 1,
+    }
+
+
+if __name__ == "__main__":
+    print("Usage: py -m pytest tests\\test_mapfile.py")
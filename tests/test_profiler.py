@@ -0,0 +1,73 @@
+# test_profiler.py
+
+"""Testing the timing of system calls"""
+
+import tracemalloc
+
+import pytest
+
+from source.ecs.systems import System
+from source.profiler import BUCKETS, Profiler, Record
+
+
+class Engine:
+    logger = None
+
+def test_profiler_records_calls():
+    profiler = Profiler()
+    add = profiler.wrap('add', lambda a, b: a + b)
+    assert add(1, 2) == 3
+    add(3, 4)
+    record = profiler.records['add']
+    assert record.calls == 2 and len(record.recent) == 2
+    assert record.time >= record.percentile(99) >= record.percentile(50) > 0
+    assert sum(record.histogram().values()) == 2
+    assert list(record.histogram())[:-1] == list(BUCKETS)
+
+def test_profiler_turn_reports():
+    profiler = Profiler()
+    reports = []
+    profiler.turn_hook = reports.append
+    noop = profiler.wrap('noop', lambda: None)
+    noop()
+    noop()
+    profiler.end_turn()
+    # turns without calls are not reported
+    profiler.end_turn()
+    noop()
+    profiler.end_turn()
+    assert profiler.turns == 2 and len(reports) == 2
+    assert reports[0].splitlines()[1].split()[:2] == ['noop', '2']
+    assert reports[1].splitlines()[1].split()[:2] == ['noop', '1']
+    assert profiler.records['noop'].calls == 3
+
+def test_profiler_report_histograms():
+    profiler = Profiler(window=4)
+    record = profiler.records['ai'] = Record('ai', window=4)
+    # seconds. The first call drops out of the rolling window
+    for elapsed in (1.0, 5e-6, 5e-6, 5e-4, 0.2):
+        record.add(elapsed, 0)
+    assert list(record.histogram().values()) == [2, 0, 1, 0, 0, 1]
+    lines = profiler.report().splitlines()
+    header = lines.index('') + 1
+    assert lines[header].split() == ['histogram'] + [
+        f'<={bound}us' for bound in BUCKETS
+    ] + [f'>{BUCKETS[-1]}us']
+    assert lines[header + 1].split() == ['ai', '2', '0', '1', '0', '0', '1']
+
+def test_profiler_instruments_systems():
+    profiler = Profiler(allocations=True)
+    system = System(Engine())
+    system.instrument(profiler)
+    # failed calls are still recorded
+    with pytest.raises(NotImplementedError):
+        system.process()
+    assert profiler.records['_system.process'].calls == 1
+    events = profiler.trace()['traceEvents']
+    assert [event['name'] for event in events] == ['_system.process']
+    assert events[0]['ph'] == 'X' and events[0]['dur'] >= 0
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    print("Usage: py -m pytest tests\\test_profiler.py")
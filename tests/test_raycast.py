@@ -0,0 +1,99 @@
+# test_raycast.py
+
+"""Test field of view algorithms"""
+
+from collections import namedtuple
+from types import SimpleNamespace
+
+from source.ecs import Position, TileMap
+from source.ecs.managers import ComponentManager
+from source.raycast import cast_light, raycast, shadowcast
+
+node = namedtuple("Node", "x y")
+
+def test_shadowcast_lights_open_room_within_radius():
+    lighted = shadowcast(set(), 21, 21, node(10, 10), radius=5)
+    assert (10, 10) in lighted
+    assert (15, 10) in lighted and (10, 5) in lighted
+    assert (16, 10) not in lighted
+    assert all(0 <= x < 21 and 0 <= y < 21 for x, y in lighted)
+
+def test_shadowcast_lights_wall_but_not_behind_it():
+    blocked = {(12, 10)}
+    lighted = shadowcast(blocked, 21, 21, node(10, 10))
+    assert (12, 10) in lighted
+    assert (13, 10) not in lighted
+
+def test_shadowcast_is_symmetric():
+    blocked = {(3, 2), (5, 5), (6, 1), (2, 6), (7, 4)}
+    start = node(4, 4)
+    for x, y in shadowcast(blocked, 10, 10, start):
+        if (x, y) not in blocked:
+            assert (start.x, start.y) in shadowcast(blocked, 10, 10, node(x, y))
+
+def test_shadowcast_and_raycast_differ_at_wall_corners():
+    # a ray from (5, 5) grazes the wall at (1, 4) and lights (0, 4), but
+    # (0, 4) cannot see (5, 5) back. shadowcast lights neither.
+    blocked = {(1, 4)}
+    viewer, other = node(5, 5), node(0, 4)
+    assert (0, 4) in raycast(blocked, 11, 11, viewer)
+    assert (5, 5) not in raycast(blocked, 11, 11, other)
+    assert (0, 4) not in shadowcast(blocked, 11, 11, viewer)
+    assert (5, 5) not in shadowcast(blocked, 11, 11, other)
+
+def test_shadowcast_reach_is_inside_raycast_reach():
+    player = node(20, 20)
+    lighted = shadowcast(set(), 41, 41, player)
+    rays = raycast(set(), 41, 41, player)
+    # rounded rays only overshoot the radius + 0.5 circle on the diagonals
+    assert lighted < rays
+    assert all(
+        (x - 20) ** 2 + (y - 20) ** 2 > 10 * 11 for x, y in rays - lighted
+    )
+
+def setup_engine():
+    tilemap = TileMap(9, 9)
+    tilemap.chars[:] = '.'
+    tilemap.blocks[:] = False
+    engine = SimpleNamespace(
+        player=0,
+        world=SimpleNamespace(id=1),
+        positions=ComponentManager(Position),
+        tilemaps=ComponentManager(TileMap),
+        tiles_in_view=set()
+    )
+    engine.positions.add(0, Position(4, 4, map_id=1))
+    engine.tilemaps.add(1, tilemap)
+    return engine, tilemap
+
+def test_cast_light_reuses_result_until_blockers_change():
+    engine, tilemap = setup_engine()
+    casts = []
+    def caster(*args):
+        casts.append(args)
+        return shadowcast(*args)
+    cast_light(engine, 0, 9, 0, 9, raycaster=caster)
+    cast_light(engine, 0, 9, 0, 9, raycaster=caster)
+    assert len(casts) == 1
+    tilemap.set_tile(5, 4, '+', None, 'closed door', blocks=True)
+    cast_light(engine, 0, 9, 0, 9, raycaster=caster)
+    assert len(casts) == 2
+    assert (6, 4) not in engine.tiles_in_view
+    engine.positions.find(0).x = 3
+    cast_light(engine, 0, 9, 0, 9, raycaster=caster)
+    assert len(casts) == 3
+
+def test_cast_light_from_other_entity_has_no_side_effects():
+    engine, tilemap = setup_engine()
+    player_view = cast_light(engine, 0, 9, 0, 9)
+    visibility, fov = tilemap.visibility.copy(), tilemap.fov
+    engine.positions.add(5, Position(0, 0, map_id=1))
+    lighted = cast_light(engine, 0, 9, 0, 9, entity=5, radius=2)
+    assert (0, 0) in lighted and (4, 4) not in lighted
+    assert engine.tiles_in_view is player_view
+    assert tilemap.fov is fov
+    assert (tilemap.visibility == visibility).all()
+
+
+if __name__ == "__main__":
+    print("Usage: py -m pytest tests\\test_raycast.py")
@@ -0,0 +1,48 @@
+# test_term.py
+
+"""Testing the headless terminal used for benchmarks and CI runs"""
+
+from bearlibterminal import terminal as blt
+
+from source.term import HeadlessTerminal
+
+
+def test_headless_printf_reads_markup():
+    term = HeadlessTerminal(width=10, height=3)
+    term.printf(1, 0, "[c=red][color=red]@[/color].[[x]]")
+    assert term.cell(1, 0) == ('@', 'red')
+    assert term.cell(2, 0) == ('.', None)
+    assert term.screen().splitlines()[0] == ' @.[x]'
+    term.printf(0, 1, "ab\ncd")
+    assert term.cell(0, 2) == ('c', None)
+    term.printf(8, 0, "overflow")
+    assert term.cell(9, 0) == ('v', None)
+    assert term.writes == 3
+
+def test_headless_clear_area():
+    term = HeadlessTerminal(width=4, height=2)
+    term.printf(0, 0, "abcd\nefgh")
+    term.clear_area(1, 0, 2, 2)
+    assert term.screen() == 'a  d\ne  h'
+    term.clear()
+    assert not term.cells
+
+def test_headless_read_scripted_keys():
+    term = HeadlessTerminal(keys=['ENTER', 'KP_6*2', blt.TK_Y])
+    assert [term.read() for _ in range(4)] == [
+        blt.TK_ENTER, blt.TK_KP_6, blt.TK_KP_6, blt.TK_Y
+    ]
+    # out of keys: close and escape so every screen can quit
+    assert [term.read() for _ in range(3)] == [
+        blt.TK_CLOSE, blt.TK_ESCAPE, blt.TK_CLOSE
+    ]
+
+def test_headless_state():
+    term = HeadlessTerminal(width=100, height=40)
+    assert term.state(term.TK_WIDTH) == 100
+    assert term.state(term.TK_HEIGHT) == 40
+    assert term.state(term.TK_SHIFT) == 0
+
+
+if __name__ == "__main__":
+    print("Usage: py -m pytest tests\\test_term.py")